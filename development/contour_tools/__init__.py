@@ -34,15 +34,57 @@ else:
     print("Imported multifiles")
 '''
 import bpy
-from mathutils import Vector
+import numpy as np
+from mathutils import Vector, Quaternion
 import contour_utilities
 from contour_classes import ContourCutLine
+from contour_spatial import ScreenHashGrid, stroke_cut_lines
+from contour_draw import BatchedOverlay, pack_cut_lines, pack_loops
+from contour_slice import MeshSlicer, SliceWorker, slice_cut_plane
+from contour_loft import loft_loops
+from contour_project import ViewProjector, target_surface, forget_surfaces, mesh_signature
+from contour_proxy import target_proxy, forget_proxies
+from contour_session import SessionHistory, restore, save_session, load_session
+from concurrent.futures import ThreadPoolExecutor
+from contour_silhouette import SilhouetteExtractor
 
 
 def retopo_draw_callback(self,context):
     if self.cut_lines:
+        if self.draw_dirty:
+            segments, handles = pack_cut_lines(self.cut_lines)
+            self.overlay.set_coords('cut_lines', segments)
+            self.overlay.set_coords('handles', handles)
+            self.draw_dirty = False
+    if self.cut_lines or self.stroke:
+        if self.stroke_dirty:
+            self.overlay.set_coords('stroke', pack_loops([self.stroke], [False]) if self.stroke else [])
+            self.stroke_dirty = False
+        self.overlay.draw(2)
+
+def retopo_draw_callback_3d(self,context):
+    #view matrices are read once per redraw (POST_VIEW comes first), projections in between reuse them
+    self.projector.capture(context.region, context.space_data.region_3d)
+    
+    if self.show_silhouette:
+        lines = self.silhouette_lines()
+        if lines is not self.drawn_silhouette:
+            self.overlay.set_coords('silhouette', pack_loops([p for p, c in lines], [c for p, c in lines]))
+            self.drawn_silhouette = lines
+    elif self.drawn_silhouette is not None:
+        self.overlay.set_coords('silhouette', [])
+        self.drawn_silhouette = None
+    
+    if self.contours_dirty:
+        loops = []
+        cyclic = []
         for c_cut in self.cut_lines:
-            c_cut.draw(context)
+            for points, closed in c_cut.contours:
+                loops.append(points)
+                cyclic.append(closed)
+        self.overlay.set_coords('contours', pack_loops(loops, cyclic))
+        self.contours_dirty = False
+    self.overlay.draw(3)
     
 
         #event value press
@@ -74,12 +116,186 @@ class CGCOOKIE_OT_retopo_contour(bpy.types.Operator):
     bl_idname = "cgcookie.retop_contour"
     bl_label = "Contour Retopologize"    
     
+    hover_radius = bpy.props.IntProperty(name = "Hover Radius", default = 10, min = 1, max = 100, description = "Distance in pixels at which handles and lines are picked")
+    ring_points = bpy.props.IntProperty(name = "Ring Points", default = 16, min = 3, max = 512, description = "Vertices in every ring of the retopo mesh")
+    stroke_lines = bpy.props.IntProperty(name = "Stroke Lines", default = 10, min = 2, max = 200, description = "Cut lines generated along a shift+drag stroke")
+    use_proxy = bpy.props.BoolProperty(name = "Use Proxy", default = True, description = "Slice and pick against a decimated proxy while placing lines, the full mesh is sliced on confirm (P toggles)")
+    proxy_resolution = bpy.props.IntProperty(name = "Proxy Resolution", default = 128, min = 8, max = 1024, description = "Voxel cells along the longest side of the target for the proxy")
+    resume_session = bpy.props.BoolProperty(name = "Resume Session", default = True, description = "Pick up the cut lines left on this target the last time")
+    show_silhouette = bpy.props.BoolProperty(name = "Silhouette", default = False, description = "Draw the target's silhouette for the current view (S toggles)")
+    feature_lines = bpy.props.BoolProperty(name = "Feature Lines", default = False, description = "Also draw edges sharper than the feature angle")
+    feature_angle = bpy.props.FloatProperty(name = "Feature Angle", default = 1.0472, min = 0, max = 3.14159, subtype = 'ANGLE', description = "Dihedral angle off flat above which an edge is a feature line")
+    stroke_width = bpy.props.IntProperty(name = "Stroke Width", default = 120, min = 10, max = 2000, description = "Length in pixels of the cut lines generated across a stroke")
+    
+    
+    def slice_line(self, context, c_cut):
+        #only re-slice when the plane really moved, the worker drops any older request for this line
+        if not c_cut.update_plane(context, distance = self.slice_distance):
+            return
+        if c_cut.plane is None:
+            self.slice_worker.cancel(c_cut)
+            self.contours_dirty = True
+            return
+        self.slice_worker.request(c_cut, slice_cut_plane, self.slicer, c_cut.plane, self.matrix_world)
+    
+    def set_live_mesh(self):
+        '''
+        point slicing and picking at the proxy or the full mesh.  the proxy
+        and both bvh trees are cached per target, so toggling is cheap
+        '''
+        verts, tris = self.target_arrays
+        if self.use_proxy:
+            verts, tris = target_proxy(self.target.name, verts, tris, self.proxy_resolution, self.target_signature)
+        self.slicer = MeshSlicer(verts, tris)
+        self.surface = target_surface(self.target.name, self.use_proxy)
+        self.surface.update(verts, tris, self.target.matrix_world)
+    
+    def toggle_proxy(self):
+        #every placed line is sliced and projected again against the new live mesh
+        self.use_proxy = not self.use_proxy
+        self.set_live_mesh()
+        for c_cut in self.cut_lines:
+            if c_cut.plane is not None:
+                self.slice_worker.request(c_cut, slice_cut_plane, self.slicer, c_cut.plane, self.matrix_world)
+        if self.cut_lines:
+            self.project_lines(self.cut_lines)
+        self.draw_dirty = True
+    
+    def project_lines(self, cut_lines):
+        #every head and tail onto the target surface in one batch
+        points = [p for c_cut in cut_lines for p in (c_cut.head, c_cut.tail)]
+        origins, directions = self.projector.rays([(p.x, p.y) for p in points])
+        locations, hit = self.surface.ray_cast(origins, directions)
+        for point, location, on_surface in zip(points, locations, hit):
+            point.world_position = Vector(location) if on_surface else None
+    
+    def project_line(self, c_cut):
+        self.project_lines([c_cut])
+    
+    def add_stroke_lines(self, context):
+        '''
+        turn the finished stroke into evenly spaced cut lines across it,
+        appended together and handed to the slice pool in one go
+        '''
+        heads, tails = stroke_cut_lines(self.stroke, self.stroke_lines, self.stroke_width)
+        view = context.space_data.region_3d.view_rotation * Vector((0,0,1))
+        new_lines = [self.new_cut_line(head, tail, view) for head, tail in zip(heads, tails)]
+        self.cut_lines.extend(new_lines)
+        self.refresh_lines(context, new_lines, new_lines)
+    
+    def new_cut_line(self, head, tail, view):
+        c_cut = ContourCutLine(head[0], head[1], view)
+        c_cut.tail.x, c_cut.tail.y = tail[0], tail[1]
+        c_cut.head.mouse_rad = self.hover_radius
+        c_cut.tail.mouse_rad = self.hover_radius
+        return c_cut
+    
+    def refresh_lines(self, context, changed, added = ()):
+        #re-bucket, re-slice and re-project lines that were added or moved in bulk
+        for c_cut in changed:
+            if c_cut in added:
+                self.hit_grid.insert(c_cut)
+            else:
+                self.hit_grid.update(c_cut)
+            self.slice_line(context, c_cut)
+        if changed:
+            self.project_lines(changed)
+        self.draw_dirty = True
+    
+    def step_history(self, context, redo = False):
+        state = self.history.redo() if redo else self.history.undo()
+        if state is None:
+            return
+        in_state, changed, removed = restore(state, self.cut_lines)
+        for c_cut in removed:
+            self.hit_grid.remove(c_cut)
+            self.slice_worker.cancel(c_cut)
+        #lines a redo brings back still hold their contours, they only need bucketing again
+        added = [c_cut for c_cut in in_state if c_cut not in self.cut_lines]
+        self.cut_lines = in_state
+        for c_cut in added:
+            self.hit_grid.insert(c_cut)
+        self.refresh_lines(context, changed)
+        self.hover_target = None
+        self.contours_dirty = True
+    
+    def resume(self, context):
+        #lines come back in the view they were drawn in, they are sliced once that view has been drawn
+        session = load_session(context.scene, self.target.name)
+        if session is None:
+            return []
+        lines, view = session
+        rv3d = context.space_data.region_3d
+        rv3d.view_location = Vector(view['view_location'])
+        rv3d.view_rotation = Quaternion(view['view_rotation'])
+        rv3d.view_distance = view['view_distance']
+        rv3d.view_perspective = view['perspective']
+        
+        new_lines = [self.new_cut_line(row[0:2], row[2:4], Vector(row[4:7])) for row in lines]
+        self.cut_lines.extend(new_lines)
+        for c_cut in new_lines:
+            self.hit_grid.insert(c_cut)
+        return new_lines
+    
+    def silhouette_lines(self):
+        #extractor is built on first use, its results are cached per view and mesh version
+        if self.silhouettes is None:
+            verts, tris = self.target_arrays
+            self.silhouettes = SilhouetteExtractor(verts, tris, version = self.target_signature)
+        angle = self.feature_angle if self.feature_lines else None
+        return self.silhouettes.lines(self.projector.view_matrix, self.projector.is_perspective, self.matrix_world, angle)
+    
+    def precise_slices(self):
+        #final slice of every line against the full resolution mesh, all lines in parallel
+        verts, tris = self.target_arrays
+        slicer = MeshSlicer(verts, tris)
+        lines = [c_cut for c_cut in self.cut_lines if c_cut.plane is not None]
+        with ThreadPoolExecutor(max_workers = self.slice_threads) as pool:
+            results = list(pool.map(lambda c_cut: slice_cut_plane(slicer, c_cut.plane, self.matrix_world), lines))
+        for c_cut, contours in zip(lines, results):
+            c_cut.contours = contours
+        self.contours_dirty = True
+    
+    def collect_slices(self):
+        for c_cut, (contours, error) in self.slice_worker.collect().items():
+            if error:
+                self.report({'WARNING'}, "Slicing failed: " + str(error))
+                continue
+            c_cut.contours = contours
+            self.contours_dirty = True
+    
+    def cleanup(self, context):
+        #clean up callbacks to prevent crash
+        contour_utilities.callback_cleanup(self,context)
+        bpy.types.SpaceView3D.draw_handler_remove(self._handle_3d, 'WINDOW')
+        context.window_manager.event_timer_remove(self._timer)
+        self.slice_worker.stop()
+        self.overlay.free()
+        save_session(context.scene, self.target.name, self.cut_lines, context.space_data.region_3d)
     
     def modal(self, context, event):
         context.area.tag_redraw()
         
+        #pick up slices finished in the background, the timer keeps this going while the mouse rests
+        self.collect_slices()
+        if self.resumed_lines:
+            self.refresh_lines(context, self.resumed_lines)
+            self.resumed_lines = []
+        if event.type == 'TIMER':
+            return {'RUNNING_MODAL'}
+        
+        if event.type == 'Z' and event.value == 'PRESS' and event.ctrl:
+            if not self.drag and self.stroke is None:
+                self.step_history(context, redo = event.shift)
+            return {'RUNNING_MODAL'}
+        
         if event.type == 'MOUSEMOVE':
             
+            if self.stroke is not None:
+                self.stroke.append((event.mouse_region_x, event.mouse_region_y))
+                self.stroke_dirty = True
+                return {'RUNNING_MODAL'}
+            
             if self.drag and self.drag_target:
             
                 if hasattr(self.drag_target,"head"): #then it's a  line, we need to move both?
@@ -93,34 +309,55 @@ class CGCOOKIE_OT_retopo_contour(bpy.types.Operator):
                     self.drag_target.x = event.mouse_region_x
                     self.drag_target.y = event.mouse_region_y
                 
+                for c_cut in self.cut_lines:
+                    if self.drag_target in (c_cut, c_cut.head, c_cut.tail):
+                        self.slice_line(context, c_cut)
+                        self.project_line(c_cut)
+                        break
+                
+                self.draw_dirty = True
                 return {'RUNNING_MODAL'}
                 
             #else detect proximity to items around
             else:
-                #identify hover target for highlighting
+                #identify hover target for highlighting, only lines in the grid cell under the mouse are tested
                 if self.cut_lines:
-                    new_target = False
-                    for c_cut in self.cut_lines:
-                        h_target = c_cut.active_element(context,event.mouse_region_x,event.mouse_region_y)
-                        if h_target:
-                            new_target = True
-                            self.hover_target = h_target
-                    
-                    if not new_target:
-                        self.hover_target = None
-                                
+                    self.hover_target = self.hit_grid.hit(context,event.mouse_region_x,event.mouse_region_y)
                     return {'RUNNING_MODAL'}
                 return {'RUNNING_MODAL'}
         
+        if event.type == 'S' and event.value == 'PRESS':
+            self.show_silhouette = not self.show_silhouette
+            return {'RUNNING_MODAL'}
+        
+        if event.type == 'P' and event.value == 'PRESS':
+            if not self.drag and self.stroke is None:
+                self.toggle_proxy()
+            return {'RUNNING_MODAL'}
+        
+        #enter builds the retopo mesh from the current contours, the session carries on if it can't
+        if event.type == 'RET' and event.value == 'PRESS':
+            ret_val = self.execute(context)
+            if 'FINISHED' not in ret_val:
+                return {'RUNNING_MODAL'}
+            self.cleanup(context)
+            return ret_val
+        
         #even right click or escape
         if event.type in ('RIGHTMOUSE', 'ESC'):
-            #clean up callbacks to prevent crash
-            contour_utilities.callback_cleanup(self,context)
+            self.cleanup(context)
             return {'CANCELLED'}  
     
         #event click
         elif event.type == 'LEFTMOUSE':
             if event.value == 'RELEASE':
+                if self.stroke is not None:
+                    self.add_stroke_lines(context)
+                    self.stroke = None
+                    self.stroke_dirty = True
+                    self.history.record(self.cut_lines)
+                    return {'RUNNING_MODAL'}
+                
                 if self.drag and self.drag_target:
                     if hasattr(self.drag_target,"head"): #then it's a  line
                         delta =Vector((event.mouse_region_x,event.mouse_region_y)) -  Vector((self.initial_location_mouse)) 
@@ -128,10 +365,21 @@ class CGCOOKIE_OT_retopo_contour(bpy.types.Operator):
                         self.drag_target.head.y = self.initial_location_head[1] + delta[1]
                         self.drag_target.tail.x = self.initial_location_tail[0] + delta[0]
                         self.drag_target.tail.y = self.initial_location_tail[1] + delta[1]
-                else:
+                elif self.drag_target:
                     self.drag_target.x = event.mouse_region_x
                     self.drag_target.y = event.mouse_region_y
                 
+                #the dragged line (or the line owning the dragged handle) moved, re-bucket and re-slice it
+                for c_cut in self.cut_lines:
+                    if self.drag_target in (c_cut, c_cut.head, c_cut.tail):
+                        self.hit_grid.update(c_cut)
+                        self.slice_line(context, c_cut)
+                        self.project_line(c_cut)
+                        break
+                
+                self.draw_dirty = True
+                self.history.record(self.cut_lines)
+                
                 #clear the drag and hover
                 self.drag = False
                 self.hover_target = None
@@ -139,6 +387,12 @@ class CGCOOKIE_OT_retopo_contour(bpy.types.Operator):
                 return {'RUNNING_MODAL'}
         
             if event.value == 'PRESS':
+                #shift+drag in empty space draws a stroke to generate lines along
+                if event.shift and not self.hover_target:
+                    self.stroke = [(event.mouse_region_x, event.mouse_region_y)]
+                    self.stroke_dirty = True
+                    return {'RUNNING_MODAL'}
+                
                 self.drag = True
                 self.drag_target = self.hover_target #presume them ose cant move w/o making it through modal?
                 if hasattr(self.drag_target,"head"):
@@ -151,7 +405,11 @@ class CGCOOKIE_OT_retopo_contour(bpy.types.Operator):
                     region = v3d.region_3d 
                     view = region.view_rotation * Vector((0,0,1))
                     self.cut_lines.append(ContourCutLine(event.mouse_region_x, event.mouse_region_y, view))
+                    self.cut_lines[-1].head.mouse_rad = self.hover_radius
+                    self.cut_lines[-1].tail.mouse_rad = self.hover_radius
                     self.drag_target = self.cut_lines[-1].tail
+                    self.project_line(self.cut_lines[-1])
+                    self.draw_dirty = True
             
                     return {'RUNNING_MODAL'}
                 return {'RUNNING_MODAL'}
@@ -164,7 +422,32 @@ class CGCOOKIE_OT_retopo_contour(bpy.types.Operator):
     
     def invoke(self, context, event):
         
+        if not context.active_object or context.active_object.type != 'MESH':
+            self.report({'ERROR'}, "Active object must be a mesh to retopologize")
+            return {'CANCELLED'}
+        
+        #edge topology is built once here, every cut line slice reuses it
+        #with the proxy on, interactive slicing and picking use the decimated mesh
+        #the proxy and the bvh survive between runs and are only rebuilt when the target's mesh changed
+        self.target = context.active_object
+        forget_surfaces(bpy.data.objects.keys())
+        forget_proxies(bpy.data.objects.keys())
+        verts, tris = contour_utilities.mesh_arrays(self.target, context.scene)
+        self.target_arrays = (verts, tris)
+        self.target_signature = mesh_signature(verts, tris)
+        self.matrix_world = np.array(self.target.matrix_world)
+        self.set_live_mesh()
+        self.slice_distance = 1e-5 * max(self.target.dimensions)
+        self.slice_threads = min(4, os.cpu_count() or 1)
+        self.slice_worker = SliceWorker(threads = self.slice_threads)
+        
+        self.projector = ViewProjector()
+        self.projector.capture(context.region, context.space_data.region_3d)
+        self.silhouettes = None
+        self.drawn_silhouette = None
+        
         self._handle = bpy.types.SpaceView3D.draw_handler_add(retopo_draw_callback, (self, context), 'WINDOW', 'POST_PIXEL')
+        self._handle_3d = bpy.types.SpaceView3D.draw_handler_add(retopo_draw_callback_3d, (self, context), 'WINDOW', 'POST_VIEW')
 
         self.drag = False
         self.cut_lines = []
@@ -173,13 +456,49 @@ class CGCOOKIE_OT_retopo_contour(bpy.types.Operator):
         self.initial_location_head = None
         self.initial_location_tail = None
         self.initial_location_mouse = None
+        self.overlay = BatchedOverlay()
+        self.overlay.add_style('cut_lines', (0,.5,1,1), 1, 'LINES', stipple = True)
+        self.overlay.add_style('handles', (1,0,.2,1), 5, 'POINTS')
+        self.overlay.add_style('contours', (1,1,.1,1), 2, 'LINES', dims = 3)
+        self.overlay.add_style('stroke', (1,1,1,.6), 1, 'LINES')
+        self.overlay.add_style('silhouette', (.2,1,.4,1), 1, 'LINES', dims = 3)
+        self.stroke = None
+        self.stroke_dirty = False
+        self.draw_dirty = True
+        self.contours_dirty = False
+        self.hit_grid = ScreenHashGrid(cell_size = max(32, 2 * self.hover_radius), radius = self.hover_radius)
+        self.resumed_lines = self.resume(context) if self.resume_session else []
+        self.history = SessionHistory()
+        self.history.record(self.cut_lines)
         
+        self._timer = context.window_manager.event_timer_add(0.05, context.window)
         context.window_manager.modal_handler_add(self)
         return {'RUNNING_MODAL'}
     
     def execute(self,context):
-        for line in self.cut_lines:
-            print(line.view_dir)
+        if self.use_proxy:
+            self.precise_slices()
+        
+        #one ring per cut line, the longest loop it picked up
+        loops = []
+        cyclic = True
+        for c_cut in self.cut_lines:
+            if c_cut.contours:
+                points, closed = max(c_cut.contours, key = lambda contour: len(contour[0]))
+                loops.append(points)
+                cyclic = cyclic and closed
+        
+        if len(loops) < 2:
+            self.report({'WARNING'}, "Need at least two contours to build a mesh")
+            return {'CANCELLED'}
+        
+        verts, faces = loft_loops(loops, self.ring_points, cyclic)
+        me = contour_utilities.mesh_from_arrays(self.target.name + "_retopo", verts, faces)
+        ob = bpy.data.objects.new(me.name, me)
+        context.scene.objects.link(ob)
+        
+        self.report({'INFO'}, "Built %i rings of %i points" % (len(loops), self.ring_points))
+        return {'FINISHED'}
 
 #resgistration
 def register():
@@ -8,37 +8,44 @@ Created on Apr 23, 2013
 
 import bpy
 import math
+import numpy as np
 from mathutils import Vector
-from mathutils.geometry import intersect_point_line
 import contour_utilities
+from contour_spatial import point_segment_dist_sq
+from contour_slice import plane_changed
 
 class ContourControlPoint(object):
     
+    #there can be hundreds of these, keep them small
+    __slots__ = ('x', 'y', 'world_position', 'color', 'size', 'mouse_rad')
+    
     def __init__(self, x, y, color = (1,0,0,1), size = 2, mouse_radius=10):
         self.x = x
         self.y = y
-        self.world_position = Vector((0,0,0)) #to be updated later
+        self.world_position = None #point on the target under x,y, None when off the surface
         self.color = color
         self.size = size
         self.mouse_rad = mouse_radius
         
-    def mouse_over(self,x,y):
+    def mouse_over(self,x,y, radius = None):
+        if radius is None:
+            radius = self.mouse_rad
         dist = (self.x -x)**2 + (self.y - y)**2
-        print(dist < 100)
-        if dist < 100:
-            return True
-        else:
-            return False
+        return dist < radius**2
 
     
 class ContourCutLine(object): 
     
+    __slots__ = ('head', 'tail', 'view_dir', 'target', 'depth', 'plane', 'contours')
+    
     def __init__(self, x, y, view_dir):
         self.head = ContourControlPoint(x,y, color = (1,0,0,1))
         self.tail = ContourControlPoint(x,y, color = (0,1,0,1))
         self.view_dir = view_dir  #this is imporatnt...no reason contours cant bend
         self.target = None
         self.depth = None #perhaps we need a depth value? 
+        self.plane = None #(origin_head, ray_head, origin_tail, ray_tail, normal) of the last slice
+        self.contours = [] #[(world points (N,3), cyclic), ...]
         
     def draw(self,context):
         
@@ -49,38 +56,52 @@ class ContourCutLine(object):
         contour_utilities.draw_points(context, points, (1,0,.2,1), 5)
         #draw contour points? later
     
-    def active_element(self,context,x,y):
-        active_head = self.head.mouse_over(x, y)
-        active_tail = self.tail.mouse_over(x, y)
-        
-        mouse_loc = Vector((x,y,0))
-        head_loc = Vector((self.head.x, self.head.y, 0))
-        tail_loc = Vector((self.tail.x, self.tail.y, 0))
-        intersect = intersect_point_line(mouse_loc, head_loc, tail_loc)
+    def active_element(self,context,x,y, radius = None):
+        '''
+        which part of the line (head, tail, or the line itself) is under x,y
+        radius is the hover sensitivity in pixels, defaults to the handle's mouse radius
+        '''
+        if radius is None:
+            radius = self.head.mouse_rad
+            
+        active_head = self.head.mouse_over(x, y, radius)
+        active_tail = self.tail.mouse_over(x, y, radius)
         
-        dist = (intersect[0] - mouse_loc).length_squared
-        bound = intersect[1]
-        active_self = (dist < 100) and (bound < 1) and (bound > 0) #TODO:  make this a sensitivity setting
+        dist, bound = point_segment_dist_sq(x, y, self.head.x, self.head.y, self.tail.x, self.tail.y)
+        active_self = (dist < radius**2) and (bound < 1) and (bound > 0)
         
         if active_head and active_tail and active_self: #they are all clustered together
-            print('returning head but tail too')
             return self.head
         
         elif active_tail:
-            print('returning tail')
             return self.tail
         
         elif active_head:
-            print('returning head')
             return self.head
         
         elif active_self:
-            print('returning line')
             return self
         
         else:
-            print('returning None')
             return None
+    
+    def update_plane(self, context, angle = 1e-4, distance = 1e-4):
+        '''
+        recompute the plane this line sweeps through the view, kept only if it
+        moved past the tolerances (see contour_slice.plane_changed)
+        return:  True when self.contours are out of date and need a new slice
+        '''
+        plane = contour_utilities.cut_line_plane(context, self.head, self.tail)
+        if plane is not None:
+            plane = tuple(np.array(v, dtype=np.float64) for v in plane)
+        
+        if not plane_changed(self.plane, plane, angle, distance):
+            return False
+        
+        self.plane = plane
+        if plane is None:
+            self.contours = []
+        return True
 #cut line, a user interactive 2d line which represents a plane in 3d splace
     #head (type conrol point)
     #tail (type control points)
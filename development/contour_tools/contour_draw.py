@@ -0,0 +1,126 @@
+####batched overlay drawing####
+
+import bgl
+
+PRIMITIVES = {'LINES': bgl.GL_LINES,
+              'POINTS': bgl.GL_POINTS}
+
+
+class BatchedOverlay(object):
+    '''
+    draws every element of one style (all cut lines, all handles, all
+    contour loops...) with a single call.  each style is compiled into an
+    OpenGL display list holding its state changes and all of its vertices,
+    and the list is only recompiled when that style's coordinates change.
+    '''
+
+    def __init__(self):
+        self.styles = {}
+        self.order = []
+        self.coords = {}
+        self.lists = {}
+        self.dirty = set()
+
+    def add_style(self, name, color, width = 1, primitive = 'LINES', stipple = False, dims = 2):
+        '''
+        args:
+            color: tuple (r,g,b,a)
+            width: line width or point size
+            primitive: 'LINES' (coords taken in pairs) or 'POINTS'
+            stipple: draw lines dashed
+            dims: 2 for screen space coords (POST_PIXEL), 3 for world space (POST_VIEW)
+        '''
+        self.styles[name] = {'color': color, 'width': width, 'primitive': primitive,
+                             'stipple': stipple, 'dims': dims}
+        if name not in self.order:
+            self.order.append(name)
+        self.coords.setdefault(name, [])
+        self.dirty.add(name)
+
+    def set_coords(self, name, coords):
+        '''
+        replace all coordinates of a style, a flat list of 2d or 3d tuples
+        for 'LINES' every consecutive pair is one segment
+        '''
+        self.coords[name] = coords
+        self.dirty.add(name)
+
+    def _compile(self, name):
+        style = self.styles[name]
+        if name not in self.lists:
+            self.lists[name] = bgl.glGenLists(1)
+
+        bgl.glNewList(self.lists[name], bgl.GL_COMPILE)
+        if style['stipple']:
+            bgl.glLineStipple(4, 0x5555)
+            bgl.glEnable(bgl.GL_LINE_STIPPLE)
+
+        bgl.glColor4f(*style['color'])
+        if style['primitive'] == 'POINTS':
+            bgl.glPointSize(style['width'])
+        else:
+            bgl.glLineWidth(style['width'])
+
+        bgl.glBegin(PRIMITIVES[style['primitive']])
+        if style['dims'] == 3:
+            for coord in self.coords[name]:
+                bgl.glVertex3f(*coord)
+        else:
+            for coord in self.coords[name]:
+                bgl.glVertex2f(*coord)
+        bgl.glEnd()
+
+        if style['stipple']:
+            bgl.glDisable(bgl.GL_LINE_STIPPLE)
+        bgl.glEndList()
+
+    def draw(self, dims = 2):
+        for name in self.order:
+            if self.styles[name]['dims'] != dims or not self.coords[name]:
+                continue
+            if name in self.dirty:
+                self._compile(name)
+                self.dirty.discard(name)
+            bgl.glCallList(self.lists[name])
+
+        bgl.glLineWidth(1)
+        bgl.glPointSize(1)
+
+    def free(self):
+        for list_id in self.lists.values():
+            bgl.glDeleteLists(list_id, 1)
+        self.lists = {}
+        self.dirty = set(self.order)
+
+
+def pack_cut_lines(cut_lines):
+    '''
+    flatten cut lines into one segment list and one handle point list
+    return:  (segments, handles)
+    '''
+    segments = []
+    handles = []
+    for c_cut in cut_lines:
+        head = (c_cut.head.x, c_cut.head.y)
+        tail = (c_cut.tail.x, c_cut.tail.y)
+        segments.append(head)
+        segments.append(tail)
+        handles.append(head)
+        handles.append(tail)
+    return segments, handles
+
+
+def pack_loops(loops, cyclic = None):
+    '''
+    flatten a list of (N,3) point loops into a single segment list
+    args:
+        cyclic: optional list of bools, False leaves that loop open
+    '''
+    segments = []
+    for n, loop in enumerate(loops):
+        points = [tuple(p) for p in loop]
+        closed = cyclic[n] if cyclic is not None else True
+        for i in range(0 if closed else 1, len(points)):
+            segments.append(points[i - 1])
+            segments.append(points[i])
+    return segments
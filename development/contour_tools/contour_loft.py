@@ -0,0 +1,113 @@
+####contour loops -> retopo quad mesh####
+
+import numpy as np
+
+
+def resample_loop(points, n, cyclic = True):
+    '''
+    n points evenly spaced by arc length along a polyline
+    args:
+        points: (M,3) polyline
+        cyclic: the polyline closes back on its first point
+    return:  (n,3) float64, open polylines keep both end points
+    '''
+    points = np.asarray(points, dtype=np.float64)
+    path = np.vstack((points, points[:1])) if cyclic else points
+    seg = np.sqrt((np.diff(path, axis=0)**2).sum(axis=1))
+    arc = np.concatenate(([0.0], np.cumsum(seg)))
+    if len(seg) == 0 or arc[-1] == 0:
+        return np.repeat(points[:1], n, axis=0)
+
+    targets = np.linspace(0, arc[-1], n, endpoint = not cyclic)
+    i = np.clip(np.searchsorted(arc, targets, side='right') - 1, 0, len(seg) - 1)
+    t = (targets - arc[i]) / np.where(seg[i] > 0, seg[i], 1.0)
+    return path[i] + t[:,None] * (path[i+1] - path[i])
+
+
+def align_rings(rings, cyclic = True):
+    '''
+    shift the start and/or reverse every ring so it lines up with the one
+    before it, which keeps the quads bridging them from twisting.  rings are
+    compared about their own centroids.
+
+    the best shift of each ring against its raw neighbour is found for all
+    rings at once with an fft cross correlation (forward and reversed), and
+    since reindexing both rings the same way doesn't change the match, those
+    relative index maps just compose down the chain
+    args:
+        rings: (R,N,3) resampled loops, already in order
+    return:  (R,N,3) aligned copy
+    '''
+    rings = np.asarray(rings)
+    r, n = rings.shape[:2]
+    if r < 2:
+        return rings.copy()
+
+    rel = rings - rings.mean(axis=1, keepdims=True)
+    prev = rel[:-1]
+    cur = rel[1:]
+    j = np.arange(n)
+
+    if cyclic:
+        #score[k] = sum_j cur[j+k] . prev[j], higher is a closer match
+        prev_f = np.conj(np.fft.rfft(prev, axis=1))
+        forward = np.fft.irfft(np.fft.rfft(cur, axis=1) * prev_f, n, axis=1).sum(axis=2)
+        backward = np.fft.irfft(np.fft.rfft(cur[:,::-1], axis=1) * prev_f, n, axis=1).sum(axis=2)
+        k_f = forward.argmax(axis=1)
+        k_b = backward.argmax(axis=1)
+        flip = backward[np.arange(r-1), k_b] > forward[np.arange(r-1), k_f]
+        shift = np.where(flip, k_b, k_f)
+        rolled = (j[None,:] + shift[:,None]) % n
+        maps = np.where(flip[:,None], n - 1 - rolled, rolled)
+    else:
+        forward = (cur * prev).sum(axis=(1,2))
+        backward = (cur[:,::-1] * prev).sum(axis=(1,2))
+        maps = np.where((backward > forward)[:,None], n - 1 - j, j)
+
+    index = [j]
+    for relative in maps:
+        index.append(relative[index[-1]])
+    return rings[np.arange(r)[:,None], np.array(index)]
+
+
+def order_loops(loops):
+    '''
+    order loops along the main axis of their centroids, so rings are bridged
+    in space order rather than the order they were drawn in
+    return:  index list
+    '''
+    centers = np.array([np.asarray(loop).mean(axis=0) for loop in loops])
+    if len(centers) < 3:
+        return list(range(len(centers)))
+    rel = centers - centers.mean(axis=0)
+    axis = np.linalg.svd(rel, full_matrices=False)[2][0]
+    return list(np.argsort(rel @ axis))
+
+
+def bridge_loops(rings, cyclic = True):
+    '''
+    quads between consecutive rings of equal point count
+    args:
+        rings: (R,N,3)
+    return:  (verts (R*N,3), faces (F,4) int32 vertex indices)
+    '''
+    rings = np.asarray(rings)
+    r, n = rings.shape[:2]
+    i = np.arange(r - 1)[:,None]
+    j = np.arange(n if cyclic else n - 1)[None,:]
+    j1 = (j + 1) % n
+    faces = np.stack(np.broadcast_arrays(i*n + j, i*n + j1, (i+1)*n + j1, (i+1)*n + j), axis=-1)
+    return rings.reshape(-1,3), faces.reshape(-1,4).astype(np.int32)
+
+
+def loft_loops(loops, n, cyclic = True):
+    '''
+    the whole mesh building stage: resample every loop to n points, order
+    and align them, bridge neighbours with quads
+    args:
+        loops: list of (M,3) polylines, one ring each
+        cyclic: rings are closed
+    return:  (verts (R*N,3), faces (F,4))
+    '''
+    rings = np.array([resample_loop(loops[i], n, cyclic) for i in order_loops(loops)])
+    return bridge_loops(align_rings(rings, cyclic), cyclic)
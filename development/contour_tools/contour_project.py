@@ -0,0 +1,160 @@
+####batched screen <-> surface projection####
+
+import zlib
+import numpy as np
+from contour_slice import transform_points
+
+try:
+    from mathutils.bvhtree import BVHTree
+except ImportError:
+    #older builds have no bvhtree, projection is simply unavailable there
+    BVHTree = None
+
+
+class ViewProjector(object):
+    '''
+    screen <-> world for whole arrays of points.  the region's matrices are
+    read once per redraw (capture), every call after that is numpy only
+    '''
+
+    def __init__(self):
+        self.inverse = None
+
+    def capture(self, region, rv3d):
+        self.width = region.width
+        self.height = region.height
+        self.is_perspective = rv3d.is_perspective
+        self.perspective_matrix = np.array(rv3d.perspective_matrix, dtype=np.float64)
+        self.view_matrix = np.array(rv3d.view_matrix, dtype=np.float64)
+        self.inverse = np.linalg.inv(self.perspective_matrix)
+
+    def _unproject(self, points, depth):
+        ndc = np.empty((len(points),4))
+        ndc[:,0] = 2.0 * points[:,0] / self.width - 1.0
+        ndc[:,1] = 2.0 * points[:,1] / self.height - 1.0
+        ndc[:,2] = depth
+        ndc[:,3] = 1.0
+        world = ndc @ self.inverse.T
+        return world[:,:3] / world[:,3:]
+
+    def rays(self, points):
+        '''
+        args:
+            points: (N,2) region coordinates
+        return:  (origins (N,3), unit directions (N,3)) world space, origins on the near clip plane
+        '''
+        points = np.asarray(points, dtype=np.float64).reshape(-1,2)
+        near = self._unproject(points, -1.0)
+        far = self._unproject(points, 1.0)
+        direction = far - near
+        direction /= np.sqrt((direction**2).sum(axis=1))[:,None]
+        return near, direction
+
+    def project(self, points):
+        '''
+        world (N,3) -> region (N,2), points behind the view come back as nan
+        '''
+        world = np.c_[np.asarray(points, dtype=np.float64).reshape(-1,3), np.ones(len(points))]
+        clip = world @ self.perspective_matrix.T
+        w = np.where(clip[:,3] > 0, clip[:,3], np.nan)
+        return np.c_[(clip[:,0] / w + 1.0) * 0.5 * self.width, (clip[:,1] / w + 1.0) * 0.5 * self.height]
+
+
+def mesh_signature(verts, tris):
+    '''
+    cheap content key of mesh arrays, changes whenever the geometry does
+    '''
+    return (len(verts), len(tris), zlib.crc32(np.ascontiguousarray(verts).view(np.uint8)),
+            zlib.crc32(np.ascontiguousarray(tris).view(np.uint8)))
+
+
+class SurfaceBVH(object):
+    '''
+    a bvhtree of the evaluated target in its local space.  update() only
+    rebuilds the tree when the mesh arrays actually changed, moving the
+    object just swaps the matrices
+    '''
+
+    def __init__(self):
+        self.key = None
+        self.tree = None
+        self.bounds = None
+        self.matrix = np.identity(4)
+        self.inverse = np.identity(4)
+
+    @property
+    def available(self):
+        return self.tree is not None
+
+    def update(self, verts, tris, matrix_world):
+        '''
+        return:  True when the tree was rebuilt
+        '''
+        self.matrix = np.array(matrix_world, dtype=np.float64)
+        self.inverse = np.linalg.inv(self.matrix)
+        if BVHTree is None:
+            return False
+
+        key = mesh_signature(verts, tris)
+        if key == self.key:
+            return False
+        self.tree = BVHTree.FromPolygons(np.asarray(verts).tolist(), np.asarray(tris).tolist())
+        self.bounds = (np.min(verts, axis=0), np.max(verts, axis=0)) if len(verts) else None
+        self.key = key
+        return True
+
+    def ray_cast(self, origins, directions):
+        '''
+        first hit of every world space ray
+        return:  (locations (N,3) world, hit mask (N,)) missed rays have nan locations
+        '''
+        origins = transform_points(origins, self.inverse)
+        directions = np.asarray(directions) @ self.inverse[:3,:3].T
+        locations = np.full((len(origins),3), np.nan)
+        if self.tree is None or self.bounds is None:
+            return locations, np.zeros(len(origins), dtype=bool)
+
+        #rays that miss the mesh's box are dropped in bulk, bvhtree has no batched cast for the rest
+        rays = np.nonzero(ray_box_hits(origins, directions, *self.bounds))[0]
+        cast = self.tree.ray_cast
+        found = [cast(origin, direction)[0] for origin, direction in zip(origins[rays].tolist(), directions[rays].tolist())]
+        on_surface = [i for i, location in enumerate(found) if location is not None]
+        if on_surface:
+            locations[rays[on_surface]] = [tuple(found[i]) for i in on_surface]
+
+        hit = ~np.isnan(locations[:,0])
+        locations[hit] = transform_points(locations[hit], self.matrix)
+        return locations, hit
+
+
+def ray_box_hits(origins, directions, low, high):
+    '''
+    slab test of (N,3) rays against one axis aligned box
+    return:  (N,) bool, True where the ray (t >= 0) touches the box
+    '''
+    with np.errstate(divide='ignore', invalid='ignore'):
+        inverse = 1.0 / directions
+        t0 = (low - origins) * inverse
+        t1 = (high - origins) * inverse
+    #a ray parallel to a slab gives nan there when it starts on the boundary, that axis doesn't limit it
+    near = np.nanmax(np.minimum(t0, t1), axis=1)
+    far = np.nanmin(np.maximum(t0, t1), axis=1)
+    return far >= np.maximum(near, 0.0)
+
+
+#one tree per target object and mesh (full or proxy), kept between runs of the operator
+SURFACES = {}
+
+def target_surface(name, proxy = False):
+    return SURFACES.setdefault((name, proxy), SurfaceBVH())
+
+
+def forget_surfaces(names):
+    '''
+    drop the trees of objects that are gone (deleted or renamed)
+    args:
+        names: names of the objects that still exist
+    '''
+    names = set(names)
+    for key in [key for key in SURFACES if key[0] not in names]:
+        del SURFACES[key]
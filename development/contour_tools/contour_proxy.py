@@ -0,0 +1,108 @@
+####decimated proxy of the target for interactive slicing####
+
+import time
+import numpy as np
+from contour_slice import MeshSlicer, fan_triangulate
+
+
+def cluster_decimate(verts, tris, resolution = 128):
+    '''
+    vertex clustering on a voxel grid.  every vertex moves to the mean of
+    the vertices in its cell, triangles that collapse to an edge or a point
+    drop out and duplicates are merged.  orientation of what is left is kept
+    args:
+        resolution: cells along the longest side of the bounding box
+    return:  (verts (M,3) float32, tris (S,3) int32)
+    '''
+    verts = np.asarray(verts, dtype=np.float32).reshape(-1,3)
+    tris = np.asarray(tris, dtype=np.int32).reshape(-1,3)
+    if len(verts) == 0:
+        return verts, tris
+
+    low = verts.min(axis=0)
+    cell = max(float((verts.max(axis=0) - low).max()), 1e-9) / resolution
+    q = ((verts - low) / cell).astype(np.int64)
+    dims = q.max(axis=0) + 1
+    keys = q[:,0] + dims[0] * (q[:,1] + dims[1] * q[:,2])
+    cells, cluster = np.unique(keys, return_inverse=True)
+
+    counts = np.bincount(cluster, minlength=len(cells)).astype(np.float64)
+    proxy_verts = np.empty((len(cells),3), dtype=np.float32)
+    for axis in range(3):
+        proxy_verts[:,axis] = np.bincount(cluster, weights=verts[:,axis], minlength=len(cells)) / counts
+
+    t = cluster[tris]
+    keep = (t[:,0] != t[:,1]) & (t[:,1] != t[:,2]) & (t[:,2] != t[:,0])
+    t = t[keep]
+    ordered = np.sort(t, axis=1)
+    n = len(cells)
+    first = np.unique((ordered[:,0] * n + ordered[:,1]) * n + ordered[:,2], return_index=True)[1]
+    return proxy_verts, t[np.sort(first)].astype(np.int32)
+
+
+#one proxy per target object, kept between runs of the operator
+PROXIES = {}
+
+def target_proxy(name, verts, tris, resolution, signature):
+    '''
+    decimated proxy of a target, only rebuilt when its mesh or the resolution changed
+    args:
+        signature: content key of verts and tris (contour_project.mesh_signature)
+    return:  (verts, tris) of the proxy
+    '''
+    key = (signature, resolution)
+    cached = PROXIES.get(name)
+    if cached is None or cached[0] != key:
+        cached = (key, cluster_decimate(verts, tris, resolution))
+        PROXIES[name] = cached
+    return cached[1]
+
+
+def forget_proxies(names):
+    '''
+    drop the proxies of objects that are gone (deleted or renamed)
+    args:
+        names: names of the objects that still exist
+    '''
+    names = set(names)
+    for name in [name for name in PROXIES if name not in names]:
+        del PROXIES[name]
+
+
+def benchmark(verts, tris, planes, resolution = 128):
+    '''
+    time slicing the full mesh against its proxy for the same planes
+    args:
+        planes: list of (point, normal) local space
+    return:  dict of timings in seconds and triangle counts
+    '''
+    start = time.time()
+    proxy = cluster_decimate(verts, tris, resolution)
+    decimate = time.time() - start
+
+    report = {'decimate': decimate, 'full_tris': len(tris), 'proxy_tris': len(proxy[1])}
+    for name, (v, t) in (('full', (verts, tris)), ('proxy', proxy)):
+        start = time.time()
+        slicer = MeshSlicer(v, t)
+        report[name + '_build'] = time.time() - start
+        start = time.time()
+        for point, normal in planes:
+            slicer.slice(point, normal)
+        report[name + '_slice'] = (time.time() - start) / max(len(planes), 1)
+    return report
+
+
+if __name__ == '__main__':
+    #headless benchmark on a 2M triangle torus: python contour_proxy.py
+    nu, nv = 1000, 1000
+    u, v = np.meshgrid(np.linspace(0, 2*np.pi, nu, endpoint=False), np.linspace(0, 2*np.pi, nv, endpoint=False), indexing='ij')
+    verts = np.stack(((2 + .5*np.cos(v))*np.cos(u), (2 + .5*np.cos(v))*np.sin(u), .5*np.sin(v)), axis=-1).reshape(-1,3)
+    i = np.arange(nu)[:,None]
+    j = np.arange(nv)[None,:]
+    quads = np.stack((i*nv + j, (i+1)%nu*nv + j, (i+1)%nu*nv + (j+1)%nv, i*nv + (j+1)%nv), axis=-1).reshape(-1,4)
+    tris = fan_triangulate(np.arange(len(quads))*4, np.full(len(quads), 4), quads.ravel())
+
+    angles = np.linspace(0, np.pi, 50)
+    planes = [(np.zeros(3), np.array([np.sin(a), np.cos(a), 0.2])) for a in angles]
+    for key, value in sorted(benchmark(verts, tris, planes).items()):
+        print('%-12s %s' % (key, value))
@@ -0,0 +1,131 @@
+####cut line session state, undo and persistence####
+
+import numpy as np
+
+#one row per cut line:  head x, head y, tail x, tail y, view dir x, y, z
+LINE_FIELDS = 7
+SESSION_PROP = 'contour_session'
+
+
+def line_record(c_cut):
+    '''
+    immutable state of one cut line, everything else is derived from it
+    '''
+    v = c_cut.view_dir
+    return (c_cut.head.x, c_cut.head.y, c_cut.tail.x, c_cut.tail.y, v[0], v[1], v[2])
+
+
+def apply_record(c_cut, record):
+    c_cut.head.x, c_cut.head.y, c_cut.tail.x, c_cut.tail.y = record[:4]
+
+
+def snapshot(cut_lines, previous = None):
+    '''
+    the state of all cut lines as a tuple of (line, record) pairs.  lines
+    that didn't change since previous reuse its record object, so a snapshot
+    only holds references and a new tuple for what actually moved
+    '''
+    old = dict(previous or ())
+    pairs = []
+    for c_cut in cut_lines:
+        record = line_record(c_cut)
+        if old.get(c_cut) == record:
+            record = old[c_cut]
+        pairs.append((c_cut, record))
+    return tuple(pairs)
+
+
+class SessionHistory(object):
+    '''
+    unlimited undo / redo over snapshots for the life of the modal
+    '''
+
+    def __init__(self):
+        self.undo_stack = []
+        self.redo_stack = []
+
+    @property
+    def current(self):
+        return self.undo_stack[-1] if self.undo_stack else ()
+
+    def record(self, cut_lines):
+        '''
+        snapshot the lines after an edit, nothing is stored if nothing changed
+        return:  True if a new step was added
+        '''
+        state = snapshot(cut_lines, self.current)
+        if self.undo_stack and state == self.current:
+            return False
+        self.undo_stack.append(state)
+        self.redo_stack = []
+        return True
+
+    def undo(self):
+        if len(self.undo_stack) < 2:
+            return None
+        self.redo_stack.append(self.undo_stack.pop())
+        return self.current
+
+    def redo(self):
+        if not self.redo_stack:
+            return None
+        self.undo_stack.append(self.redo_stack.pop())
+        return self.current
+
+
+def restore(state, cut_lines):
+    '''
+    put the lines back the way a snapshot has them
+    return:  (lines in the snapshot, lines whose record changed, lines no longer in it)
+    '''
+    in_state = [c_cut for c_cut, record in state]
+    kept = set(in_state)
+    removed = [c_cut for c_cut in cut_lines if c_cut not in kept]
+    changed = []
+    for c_cut, record in state:
+        if line_record(c_cut) != record:
+            apply_record(c_cut, record)
+            changed.append(c_cut)
+    return in_state, changed, removed
+
+
+def pack_lines(cut_lines):
+    '''
+    return:  (N, LINE_FIELDS) float64 array of the lines' records
+    '''
+    return np.array([line_record(c_cut) for c_cut in cut_lines], dtype=np.float64).reshape(-1, LINE_FIELDS)
+
+
+def save_session(scene, target_name, cut_lines, rv3d):
+    '''
+    store the lines and the view they were drawn in on the scene, so the
+    session can be picked up again after the modal ends or the file reloads.
+    no lines clears the target's session
+    '''
+    if SESSION_PROP not in scene:
+        scene[SESSION_PROP] = {}
+    sessions = scene[SESSION_PROP]
+    if not cut_lines:
+        if target_name in sessions:
+            del sessions[target_name]
+        return
+    
+    sessions[target_name] = {
+        'lines': pack_lines(cut_lines).ravel().tolist(),
+        'view_location': list(rv3d.view_location),
+        'view_rotation': list(rv3d.view_rotation),
+        'view_distance': rv3d.view_distance,
+        'perspective': rv3d.view_perspective}
+
+
+def load_session(scene, target_name):
+    '''
+    return:  (lines (N, LINE_FIELDS) array, view dict) or None when there is no session
+    '''
+    sessions = scene.get(SESSION_PROP)
+    if not sessions or target_name not in sessions:
+        return None
+    session = sessions[target_name]
+    lines = np.array(session['lines'], dtype=np.float64).reshape(-1, LINE_FIELDS)
+    view = dict((key, session[key]) for key in ('view_location', 'view_rotation', 'view_distance', 'perspective'))
+    return lines, view
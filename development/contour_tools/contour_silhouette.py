@@ -0,0 +1,119 @@
+####silhouette and feature lines####
+
+from collections import OrderedDict
+import numpy as np
+from contour_slice import chain_segments, transform_points
+
+
+class SilhouetteExtractor(object):
+    '''
+    view dependent silhouettes (edges between a face turned towards the
+    view and one turned away) and view independent feature edges (sharp
+    dihedral angle) of a triangle mesh, chained into polylines.
+    face normals and the face pair of every manifold edge are built once,
+    a new view is then one dot product per face and one compare per edge.
+    results are kept for the last few (mesh version, view) keys so orbiting
+    back and forth doesn't recompute
+    '''
+
+    def __init__(self, verts, tris, version = None, cache_size = 8):
+        self.verts = np.ascontiguousarray(verts, dtype=np.float32).reshape(-1,3)
+        tris = np.asarray(tris, dtype=np.int32).reshape(-1,3)
+        self.version = version
+        self.cache_size = cache_size
+        self.cache = OrderedDict()
+        self.feature_cache = {}
+
+        v0 = self.verts[tris[:,0]]
+        v1 = self.verts[tris[:,1]]
+        v2 = self.verts[tris[:,2]]
+        self.normals = np.cross(v1 - v0, v2 - v0)
+        #n . (eye - center) is then normals @ eye - offsets
+        self.offsets = (self.normals * ((v0 + v1 + v2) / 3)).sum(axis=1)
+
+        #edges with exactly two faces and those two faces
+        tri_edges = np.stack((tris[:,[0,1]], tris[:,[1,2]], tris[:,[2,0]]), axis=1).reshape(-1,2)
+        tri_edges.sort(axis=1)
+        keys = tri_edges[:,0].astype(np.int64) * (len(self.verts) + 1) + tri_edges[:,1]
+        order = np.argsort(keys, kind='stable')
+        keys = keys[order]
+        starts = np.concatenate(([0], np.nonzero(np.diff(keys))[0] + 1))
+        counts = np.diff(np.concatenate((starts, [len(keys)])))
+        manifold = starts[counts == 2]
+        faces = order // 3
+        self.edges = tri_edges[order[manifold]]
+        self.face_a = faces[manifold]
+        self.face_b = faces[manifold + 1]
+
+    def facing(self, eye = None, direction = None):
+        '''
+        bool per face, True when it faces the viewer
+        args:
+            eye: view position (perspective), local space
+            direction: view direction (ortho), local space
+        '''
+        if eye is not None:
+            return self.normals @ np.asarray(eye, dtype=np.float32) - self.offsets > 0
+        return self.normals @ -np.asarray(direction, dtype=np.float32) > 0
+
+    def silhouette_edges(self, eye = None, direction = None):
+        front = self.facing(eye, direction)
+        return self.edges[front[self.face_a] != front[self.face_b]]
+
+    def feature_edges(self, angle):
+        '''
+        edges whose faces meet at more than angle (radians) off flat
+        '''
+        if angle not in self.feature_cache:
+            n0 = self.normals[self.face_a]
+            n1 = self.normals[self.face_b]
+            dot = (n0 * n1).sum(axis=1)
+            lengths = np.sqrt((n0 * n0).sum(axis=1) * (n1 * n1).sum(axis=1))
+            self.feature_cache[angle] = self.edges[dot < np.cos(angle) * lengths]
+        return self.feature_cache[angle]
+
+    def polylines(self, edges):
+        '''
+        chain vertex index pairs into polylines
+        return:  list of (local points (N,3), cyclic)
+        '''
+        if len(edges) == 0:
+            return []
+        keys = edges[:,0].astype(np.int64) * (len(self.verts) + 1) + edges[:,1]
+        edges = edges[np.unique(keys, return_index=True)[1]]
+        used, segs = np.unique(edges, return_inverse=True)
+        points = self.verts[used]
+        return [(points[chain], cyclic) for chain, cyclic in chain_segments(segs.reshape(-1,2), len(used))]
+
+    def lines(self, view_matrix, perspective, matrix_world, feature_angle = None):
+        '''
+        silhouette (and optionally feature) polylines for a view, world space
+        args:
+            view_matrix: the region's 4x4 view matrix as an array
+            perspective: the view is a perspective one
+            matrix_world: the mesh object's world matrix as an array
+            feature_angle: also return feature edges sharper than this, None for none
+        return:  list of (world points (N,3), cyclic)
+        '''
+        view_matrix = np.asarray(view_matrix, dtype=np.float64)
+        matrix_world = np.asarray(matrix_world, dtype=np.float64)
+        key = (self.version, perspective, feature_angle,
+               np.round(view_matrix, 6).tobytes(), np.round(matrix_world, 6).tobytes())
+        if key in self.cache:
+            self.cache.move_to_end(key)
+            return self.cache[key]
+
+        #camera into the mesh's local space
+        to_local = np.linalg.inv(matrix_world) @ np.linalg.inv(view_matrix)
+        if perspective:
+            edges = self.silhouette_edges(eye = to_local[:3,3])
+        else:
+            edges = self.silhouette_edges(direction = -to_local[:3,2])
+        if feature_angle is not None:
+            edges = np.concatenate((edges, self.feature_edges(feature_angle)))
+
+        result = [(transform_points(points, matrix_world), cyclic) for points, cyclic in self.polylines(edges)]
+        self.cache[key] = result
+        if len(self.cache) > self.cache_size:
+            self.cache.popitem(last=False)
+        return result
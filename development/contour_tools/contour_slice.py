@@ -0,0 +1,350 @@
+####vectorized mesh / plane slicing####
+
+import threading
+import numpy as np
+
+#triangles per culling chunk, see MeshSlicer
+CHUNK_SIZE = 512
+
+
+def fan_triangulate(loop_start, loop_total, loop_verts):
+    '''
+    triangulate polygons as fans, all polygons at once
+    args:
+        loop_start, loop_total: per polygon arrays (as in Mesh.polygons)
+        loop_verts: vertex index of every loop (as in Mesh.loops)
+    return:  (T,3) int32 array of vertex indices
+    '''
+    loop_start = np.asarray(loop_start, dtype=np.int64)
+    tri_count = np.maximum(np.asarray(loop_total, dtype=np.int64) - 2, 0)
+    total = int(tri_count.sum())
+    if total == 0:
+        return np.zeros((0,3), dtype=np.int32)
+
+    first = np.repeat(loop_start, tri_count)
+    k = np.arange(total) - np.repeat(np.cumsum(tri_count) - tri_count, tri_count)
+    loop_verts = np.asarray(loop_verts)
+    tris = np.empty((total,3), dtype=np.int32)
+    tris[:,0] = loop_verts[first]
+    tris[:,1] = loop_verts[first + k + 1]
+    tris[:,2] = loop_verts[first + k + 2]
+    return tris
+
+
+def transform_points(points, matrix):
+    '''
+    apply a 4x4 matrix (anything numpy can read as 4x4) to (N,3) points
+    '''
+    mx = np.asarray(matrix, dtype=np.float64).reshape(4,4)
+    return np.asarray(points) @ mx[:3,:3].T + mx[:3,3]
+
+
+def plane_to_local(point, normal, matrix):
+    '''
+    bring a world space plane into an object's local space
+    args:
+        matrix: the object's 4x4 world matrix
+    '''
+    mx = np.asarray(matrix, dtype=np.float64).reshape(4,4)
+    imx = np.linalg.inv(mx)
+    local_point = imx[:3,:3] @ np.asarray(point, dtype=np.float64) + imx[:3,3]
+    #normals go world -> local by the inverse transpose of the inverse, ie the transposed world matrix
+    local_normal = mx[:3,:3].T @ np.asarray(normal, dtype=np.float64)
+    length = np.linalg.norm(local_normal)
+    return local_point, local_normal / (length if length else 1.0)
+
+
+def between_rays(points, origin_a, dir_a, origin_b, dir_b, normal):
+    '''
+    mask of points inside the wedge (perspective) or slab (ortho) swept from
+    ray a to ray b around normal, ie the part of the slicing plane the user's
+    cut line actually covers
+    '''
+    points = np.asarray(points)
+    side_a = (points - origin_a) @ np.cross(normal, dir_a)
+    side_b = (points - origin_b) @ np.cross(dir_b, normal)
+    return (side_a >= 0) & (side_b >= 0)
+
+
+def morton_codes(points):
+    '''
+    10 bit per axis z order curve key of every point inside the points' bounding box
+    '''
+    points = np.asarray(points, dtype=np.float64)
+    if len(points) == 0:
+        return np.zeros(0, dtype=np.int64)
+    low = points.min(axis=0)
+    size = (points.max(axis=0) - low).max() or 1.0
+    q = ((points - low) / size * 1023).astype(np.int64)
+    #spread the bits of each axis two apart, then interleave
+    for shift, mask in ((16, 0x30000FF), (8, 0x300F00F), (4, 0x30C30C3), (2, 0x9249249)):
+        q = (q | (q << shift)) & mask
+    return q[:,0] | (q[:,1] << 1) | (q[:,2] << 2)
+
+
+def plane_changed(old, new, angle = 1e-4, distance = 1e-4):
+    '''
+    whether a cut line plane moved enough to need a new slice
+    args:
+        old, new: (origin_head, ray_head, origin_tail, ray_tail, normal) or None
+        angle: tolerance on the unit vectors (normal and both rays)
+        distance: tolerance on the origins, world units
+    '''
+    if old is None or new is None:
+        return old is not new
+    for a, b, tolerance in zip(old, new, (distance, angle, distance, angle, angle)):
+        if np.abs(np.asarray(a) - np.asarray(b)).max() > tolerance:
+            return True
+    return False
+
+
+def slice_cut_plane(slicer, plane, matrix_world):
+    '''
+    the loops a cut line picks out of the target.  pure numpy, so it can run
+    away from the main thread
+    args:
+        plane: (origin_head, ray_head, origin_tail, ray_tail, normal) world space
+        matrix_world: the target's 4x4 world matrix as an array
+    return:  list of (world points (N,3), cyclic)
+    '''
+    origin_head, ray_head, origin_tail, ray_tail, normal = plane
+    local_point, local_normal = plane_to_local(origin_head, normal, matrix_world)
+
+    contours = []
+    for points, cyclic in slicer.slice(local_point, local_normal):
+        world = transform_points(points, matrix_world)
+        if between_rays(world, origin_head, ray_head, origin_tail, ray_tail, normal).any():
+            contours.append((world, cyclic))
+    return contours
+
+
+class MeshSlicer(object):
+    '''
+    slices one triangle mesh with arbitrary planes.  the edge topology is
+    built once, every slice after that is a handful of array operations:
+        signed distance of every vertex to the plane
+        edges whose end points change sign
+        triangles with two crossing edges each contribute one segment
+    segments are chained into loops through an edge -> segment table, each
+    crossing edge is shared by (at most) two segments in a manifold mesh
+
+    triangles are stored in morton order of their centroids and grouped into
+    CHUNK_SIZE runs with one bounding box each, a flat one level bvh.  a
+    culled slice only looks at the chunks whose box the plane passes through
+    '''
+
+    def __init__(self, verts, tris):
+        self.verts = np.ascontiguousarray(verts, dtype=np.float32).reshape(-1,3)
+        tris = np.asarray(tris, dtype=np.int32).reshape(-1,3)
+        corners = self.verts[tris]
+        self.tris = np.ascontiguousarray(tris[np.argsort(morton_codes(corners.mean(axis=1)), kind='stable')])
+        corners = self.verts[self.tris]
+        starts = np.arange(0, len(self.tris), CHUNK_SIZE)
+        if len(starts):
+            self.chunk_min = np.minimum.reduceat(corners.min(axis=1), starts, axis=0)
+            self.chunk_max = np.maximum.reduceat(corners.max(axis=1), starts, axis=0)
+        else:
+            self.chunk_min = self.chunk_max = np.zeros((0,3), dtype=np.float32)
+
+        #unique undirected edges and the three edge ids of every triangle
+        t = self.tris
+        tri_edges = np.stack((t[:,[0,1]], t[:,[1,2]], t[:,[2,0]]), axis=1).reshape(-1,2)
+        tri_edges.sort(axis=1)
+        keys = tri_edges[:,0].astype(np.int64) * (len(self.verts) + 1) + tri_edges[:,1]
+        unique_keys, first, inverse = np.unique(keys, return_index=True, return_inverse=True)
+        self.edges = tri_edges[first]
+        self.edge_a = np.ascontiguousarray(self.edges[:,0])
+        self.edge_b = np.ascontiguousarray(self.edges[:,1])
+        self.tri_edges = inverse.reshape(-1,3).astype(np.int32)
+
+    def signed_distance(self, points, point, normal):
+        return points @ np.asarray(normal, dtype=np.float32) - np.float32(np.dot(point, normal))
+
+    def cull(self, point, normal):
+        '''
+        indices of the triangles in every chunk whose box the plane passes through
+        '''
+        normal = np.asarray(normal, dtype=np.float32)
+        center = (self.chunk_min + self.chunk_max) * 0.5
+        extent = (self.chunk_max - self.chunk_min) * 0.5
+        dist = np.abs(self.signed_distance(center, point, normal))
+        chunks = np.nonzero(dist <= extent @ np.abs(normal))[0]
+        tris = (chunks[:,None] * CHUNK_SIZE + np.arange(CHUNK_SIZE)).ravel()
+        return tris[tris < len(self.tris)]
+
+    def segments(self, point, normal, subset = None):
+        '''
+        raw slice result
+        args:
+            subset: optional triangle indices (or bool mask) to test, None tests all
+        return:  (points (K,3), segments (S,2)) segments index into points
+        '''
+        #vertices exactly on the plane count as in front, so every edge is either crossed or not
+        if subset is None:
+            side = self.signed_distance(self.verts, point, normal) >= 0
+            tri_edges = self.tri_edges
+            tri_cross = (side[self.edge_a] != side[self.edge_b])[tri_edges]
+        else:
+            #per corner, only the vertices of the subset are touched
+            side = self.signed_distance(self.verts[self.tris[subset]], point, normal) >= 0
+            tri_edges = self.tri_edges[subset]
+            tri_cross = side != side[:,[1,2,0]]
+        #a triangle has either none or two crossing edges, so two columns decide it
+        hit = tri_cross[:,0] | tri_cross[:,1]
+        tri_edges = tri_edges[hit]
+        tri_cross = tri_cross[hit]
+
+        #the two crossing edges of each hit triangle, in triangle order
+        pair = tri_edges[tri_cross].reshape(-1,2)
+
+        #intersection point on every crossing edge that is used
+        used = np.unique(pair)
+        e0 = self.edge_a[used]
+        e1 = self.edge_b[used]
+        d0 = self.signed_distance(self.verts[e0], point, normal)
+        d1 = self.signed_distance(self.verts[e1], point, normal)
+        #the culled path decides sides from per corner distances, which can round differently
+        #than these for points right on the plane, so guard the division and stay on the edge
+        denom = d0 - d1
+        t = np.clip(d0 / np.where(denom != 0, denom, 1), 0, 1)[:,None]
+        points = self.verts[e0] + t * (self.verts[e1] - self.verts[e0])
+
+        segs = np.searchsorted(used, pair).astype(np.int32)
+        return points, segs
+
+    def slice(self, point, normal, cull = True):
+        '''
+        slice the mesh with the plane through point with normal
+        args:
+            cull: only test the triangles of chunks the plane passes through
+        return:  list of (loop points (N,3) float32, cyclic bool)
+        '''
+        points, segs = self.segments(point, normal, self.cull(point, normal) if cull else None)
+        return [(points[chain], cyclic) for chain, cyclic in chain_segments(segs, len(points))]
+
+
+def chain_segments(segs, n_points):
+    '''
+    order segments sharing end points into chains
+    return:  list of (point index array, cyclic bool)
+    '''
+    if len(segs) == 0:
+        return []
+
+    #edge -> segment table, two slots per point
+    nbr = np.full((n_points,2), -1, dtype=np.int64)
+    ends = segs.ravel()
+    other = segs[:,::-1].ravel()
+    order = np.argsort(ends, kind='stable')
+    ends = ends[order]
+    other = other[order]
+    first = np.searchsorted(ends, ends, side='left')
+    slot = np.arange(len(ends)) - first
+    keep = slot < 2 #non manifold points keep their first two neighbours
+    nbr[ends[keep], slot[keep]] = other[keep]
+
+    degree = (nbr >= 0).sum(axis=1)
+    visited = np.zeros(n_points, dtype=bool)
+    nbr_list = nbr.tolist()
+    chains = []
+
+    #open chains start at their loose ends, whatever is left over is cyclic
+    starts = list(np.nonzero(degree == 1)[0]) + list(np.nonzero(degree == 2)[0])
+    for start in starts:
+        if visited[start]:
+            continue
+        chain = [start]
+        visited[start] = True
+        cur = start
+        while True:
+            a, b = nbr_list[cur]
+            if a >= 0 and not visited[a]:
+                nxt = a
+            elif b >= 0 and not visited[b]:
+                nxt = b
+            else:
+                break
+            visited[nxt] = True
+            chain.append(nxt)
+            cur = nxt
+
+        cyclic = len(chain) > 2 and start in nbr_list[cur]
+        chains.append((np.array(chain, dtype=np.int64), cyclic))
+
+    return chains
+
+
+class SliceWorker(object):
+    '''
+    runs slices on a small pool of background threads.  every request
+    carries a key (one per cut line), a newer request for a key replaces its
+    pending one and makes any result still in flight for it stale, so only
+    the latest position of a dragged line is ever delivered.  numpy releases
+    the GIL in the heavy parts, so the modal keeps handling events while
+    slices run and a batch of new lines is sliced in parallel.
+    nothing passed in may touch bpy.
+    '''
+
+    def __init__(self, threads = 1):
+        self.lock = threading.Condition()
+        self.pending = {}  #key -> (generation, func, args)
+        self.latest = {}   #key -> newest generation requested
+        self.done = {}     #key -> (result, exception)
+        self.generation = 0
+        self.alive = True
+        self.threads = []
+        for n in range(max(1, threads)):
+            thread = threading.Thread(target = self._run)
+            thread.daemon = True
+            thread.start()
+            self.threads.append(thread)
+
+    def request(self, key, func, *args):
+        with self.lock:
+            self.generation += 1
+            self.latest[key] = self.generation
+            self.pending[key] = (self.generation, func, args)
+            self.done.pop(key, None)
+            self.lock.notify()
+
+    def cancel(self, key):
+        with self.lock:
+            self.pending.pop(key, None)
+            self.latest.pop(key, None)
+            self.done.pop(key, None)
+
+    def collect(self):
+        '''
+        finished results since the last call
+        return:  {key: (result, exception)}
+        '''
+        with self.lock:
+            done = self.done
+            self.done = {}
+        return done
+
+    def stop(self):
+        with self.lock:
+            self.alive = False
+            self.pending = {}
+            self.lock.notify_all()
+
+    def _run(self):
+        while True:
+            with self.lock:
+                while self.alive and not self.pending:
+                    self.lock.wait()
+                if not self.alive:
+                    return
+                #oldest request first so no line starves
+                key = min(self.pending, key = lambda k: self.pending[k][0])
+                generation, func, args = self.pending.pop(key)
+
+            try:
+                result = (func(*args), None)
+            except Exception as e:
+                result = (None, e)
+
+            with self.lock:
+                if self.latest.get(key) == generation:
+                    self.done[key] = result
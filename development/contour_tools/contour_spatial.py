@@ -0,0 +1,146 @@
+####screen space lookup structures####
+
+import math
+import numpy as np
+
+
+def point_segment_dist_sq(x, y, x0, y0, x1, y1):
+    '''
+    squared distance from (x,y) to the segment (x0,y0)-(x1,y1) and the
+    parametric position of the closest point along it
+    return:  (dist_sq, t)
+    '''
+    dx = x1 - x0
+    dy = y1 - y0
+    len_sq = dx*dx + dy*dy
+    if len_sq == 0:
+        return (x - x0)**2 + (y - y0)**2, 0
+
+    t = ((x - x0)*dx + (y - y0)*dy) / len_sq
+    px = x0 + t*dx
+    py = y0 + t*dy
+    return (x - px)**2 + (y - py)**2, t
+
+
+def stroke_cut_lines(points, count, length):
+    '''
+    count cut lines evenly spaced by arc length along a screen space stroke,
+    each one perpendicular to the stroke and centered on it
+    args:
+        points: (N,2) stroke in region coordinates
+        length: length of every cut line in pixels
+    return:  (heads (K,2), tails (K,2)), empty for a stroke with no length
+    '''
+    points = np.asarray(points, dtype=np.float64).reshape(-1,2)
+    seg = np.sqrt((np.diff(points, axis=0)**2).sum(axis=1))
+    keep = np.concatenate(([True], seg > 0))
+    points = points[keep]
+    seg = seg[seg > 0]
+    if len(seg) == 0 or count < 1:
+        return np.zeros((0,2)), np.zeros((0,2))
+    
+    arc = np.concatenate(([0.0], np.cumsum(seg)))
+    
+    def along(targets):
+        i = np.clip(np.searchsorted(arc, targets, side='right') - 1, 0, len(seg) - 1)
+        t = (targets - arc[i]) / seg[i]
+        return points[i] + t[:,None] * (points[i+1] - points[i])
+    
+    #line centers in the middle of equal arc length spans, tangents over a
+    #span wide window so a shaky stroke doesn't tilt the lines
+    spacing = arc[-1] / count
+    targets = (np.arange(count) + 0.5) * spacing
+    centers = along(targets)
+    tangent = along(np.minimum(targets + spacing/2, arc[-1])) - along(np.maximum(targets - spacing/2, 0))
+    tangent /= np.maximum(np.sqrt((tangent**2).sum(axis=1)), 1e-9)[:,None]
+    half = np.c_[-tangent[:,1], tangent[:,0]] * (length * 0.5)
+    return centers - half, centers + half
+
+
+class ScreenHashGrid(object):
+    '''
+    uniform screen space grid over the handles and segments of cut lines.
+    every line is bucketed into all the cells within the hover radius of it,
+    so a hover query only looks at the one cell under the mouse.  lines are
+    re-bucketed only when they move (update), never on plain mouse moves.
+    '''
+
+    def __init__(self, cell_size = 32, radius = 10):
+        self.cell_size = float(cell_size)
+        self.radius = radius
+        self.cells = {}       #(i,j) -> set of cut lines
+        self.line_cells = {}  #id(cut line) -> cells it is in
+
+    def _key(self, x, y):
+        return (int(math.floor(x / self.cell_size)), int(math.floor(y / self.cell_size)))
+
+    def _segment_cells(self, x0, y0, x1, y1):
+        '''
+        every cell within radius of the segment, found by stepping along it
+        in cell sized increments and taking the radius box around each step
+        '''
+        r = self.radius
+        steps = int(math.hypot(x1 - x0, y1 - y0) / self.cell_size) + 1
+        keys = set()
+        for n in range(steps + 1):
+            t = n / steps
+            x = x0 + (x1 - x0) * t
+            y = y0 + (y1 - y0) * t
+            i0, j0 = self._key(x - r, y - r)
+            i1, j1 = self._key(x + r, y + r)
+            for i in range(i0, i1 + 1):
+                for j in range(j0, j1 + 1):
+                    keys.add((i,j))
+        return keys
+
+    def insert(self, cut_line):
+        keys = self._segment_cells(cut_line.head.x, cut_line.head.y, cut_line.tail.x, cut_line.tail.y)
+        for key in keys:
+            self.cells.setdefault(key, set()).add(cut_line)
+        self.line_cells[id(cut_line)] = keys
+
+    def remove(self, cut_line):
+        for key in self.line_cells.pop(id(cut_line), ()):
+            bucket = self.cells.get(key)
+            if bucket:
+                bucket.discard(cut_line)
+                if not bucket:
+                    del self.cells[key]
+
+    def update(self, cut_line):
+        self.remove(cut_line)
+        self.insert(cut_line)
+
+    def rebuild(self, cut_lines):
+        self.cells = {}
+        self.line_cells = {}
+        for cut_line in cut_lines:
+            self.insert(cut_line)
+
+    def set_radius(self, radius):
+        self.radius = radius
+        lines = set()
+        for bucket in self.cells.values():
+            lines |= bucket
+        self.rebuild(lines)
+
+    def candidates(self, x, y):
+        return self.cells.get(self._key(x, y), ())
+
+    def hit(self, context, x, y):
+        '''
+        the hovered element (control point or cut line) nearest to x,y or None
+        '''
+        best = None
+        best_dist = None
+        for cut_line in self.candidates(x, y):
+            element = cut_line.active_element(context, x, y, self.radius)
+            if not element:
+                continue
+
+            dist = point_segment_dist_sq(x, y, cut_line.head.x, cut_line.head.y, cut_line.tail.x, cut_line.tail.y)[0]
+            if best_dist is None or dist < best_dist:
+                best = element
+                best_dist = dist
+
+        return best
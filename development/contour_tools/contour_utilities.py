@@ -9,7 +9,9 @@ Open sourceness?
 import bpy
 import bgl
 import blf
+import numpy as np
 from bpy_extras import view3d_utils 
+from contour_slice import fan_triangulate
 
 def callback_register(self, context):
         if str(bpy.app.build_revision)[2:7] == "unkno" or eval(str(bpy.app.build_revision)[2:7]) >= 53207:
@@ -69,4 +71,73 @@ def draw_polyline_from_points(context, points, color, thickness, LINE_TYPE):
         bgl.glDisable(bgl.GL_LINE_STIPPLE)  
         bgl.glEnable(bgl.GL_BLEND)  # back to uninterupted lines  
       
-    return
\ No newline at end of file
+    return
+
+def mesh_arrays(ob, scene, apply_modifiers = True):
+    '''
+    vertex coordinates and triangles of a mesh object as arrays, local space
+    args:
+        apply_modifiers: use the evaluated (PREVIEW) mesh rather than the base mesh
+    return:  (verts (N,3) float32, tris (T,3) int32)
+    '''
+    me = ob.to_mesh(scene, apply_modifiers, 'PREVIEW')
+    
+    verts = np.empty(len(me.vertices) * 3, dtype=np.float32)
+    me.vertices.foreach_get('co', verts)
+    loop_start = np.empty(len(me.polygons), dtype=np.int32)
+    loop_total = np.empty(len(me.polygons), dtype=np.int32)
+    me.polygons.foreach_get('loop_start', loop_start)
+    me.polygons.foreach_get('loop_total', loop_total)
+    loop_verts = np.empty(len(me.loops), dtype=np.int32)
+    me.loops.foreach_get('vertex_index', loop_verts)
+    
+    bpy.data.meshes.remove(me)
+    return verts.reshape(-1,3), fan_triangulate(loop_start, loop_total, loop_verts)
+
+def mesh_from_arrays(name, verts, faces):
+    '''
+    a new mesh datablock written in one foreach_set per attribute
+    args:
+        verts: (N,3) coordinates
+        faces: (F,K) vertex indices, every face has K corners
+    '''
+    faces = np.asarray(faces, dtype=np.int32)
+    corners = faces.shape[1] if faces.size else 0
+    
+    me = bpy.data.meshes.new(name)
+    me.vertices.add(len(verts))
+    me.vertices.foreach_set('co', np.asarray(verts, dtype=np.float32).ravel())
+    me.loops.add(faces.size)
+    me.loops.foreach_set('vertex_index', faces.ravel())
+    me.polygons.add(len(faces))
+    me.polygons.foreach_set('loop_start', np.arange(0, faces.size, max(corners, 1), dtype=np.int32))
+    me.polygons.foreach_set('loop_total', np.full(len(faces), corners, dtype=np.int32))
+    me.update(calc_edges = True)
+    return me
+
+def cut_line_plane(context, head, tail):
+    '''
+    the world space plane a screen space line sweeps through the view
+    args:
+        head, tail: anything with .x, .y in region coordinates
+    return:  (origin_head, ray_head, origin_tail, ray_tail, normal) or None for a degenerate line
+    '''
+    region = context.region
+    rv3d = context.space_data.region_3d
+    
+    ray_head = view3d_utils.region_2d_to_vector_3d(region, rv3d, (head.x, head.y))
+    ray_tail = view3d_utils.region_2d_to_vector_3d(region, rv3d, (tail.x, tail.y))
+    origin_head = view3d_utils.region_2d_to_origin_3d(region, rv3d, (head.x, head.y))
+    origin_tail = view3d_utils.region_2d_to_origin_3d(region, rv3d, (tail.x, tail.y))
+    
+    if rv3d.is_perspective:
+        #both rays leave the eye, the plane holds them both
+        normal = ray_head.cross(ray_tail)
+    else:
+        #parallel rays, the plane holds the line and the view direction
+        normal = ray_head.cross(origin_tail - origin_head)
+    
+    if normal.length < 1e-9:
+        return None
+    normal.normalize()
+    return origin_head, ray_head, origin_tail, ray_tail, normal
@@ -0,0 +1,106 @@
+#script by Alex Telford | CG Cookie | www.blendercookie.com
+#Description:
+#This script will export a text file for use in pro builder for unity
+#Usage:
+#Load as an addon, it will appear in the 3D view tool shelf as a single button. Exports the active object, or every selected mesh with Selected Objects.
+#version 1.1 - added support for triangles and ngons
+#automatically creates quads and tris from nGons
+#version 1.2 - selected objects are exported in parallel, optional binary output
+bl_info = {
+    "name": "Export Mesh Data for Pro Builder",
+    "author": "Alex Telford",
+    "version": (1, 2),
+    "blender": (2, 6, 4),
+    "api": 51026,
+    "location": "View3D > Tool Shelf",
+    "description": "Exports mesh data for Pro Builder",
+    "warning": "",
+    "wiki_url": "",
+    "tracker_url": "",
+    "category": "Import-Export"}
+#import data modules
+import os
+import multiprocessing, multiprocessing.spawn
+import bpy
+import numpy as np
+from . import probuilder_mesh
+#copy the arrays of a mesh out in one go per attribute
+def meshArrays(me):
+    co = np.empty(len(me.vertices) * 3, dtype=np.float32)
+    me.vertices.foreach_get('co', co)
+    loopStart = np.empty(len(me.polygons), dtype=np.int32)
+    me.polygons.foreach_get('loop_start', loopStart)
+    loopTotal = np.empty(len(me.polygons), dtype=np.int32)
+    me.polygons.foreach_get('loop_total', loopTotal)
+    loopVerts = np.empty(len(me.loops), dtype=np.int32)
+    me.loops.foreach_get('vertex_index', loopVerts)
+    return co.reshape(-1, 3), loopStart, loopTotal, loopVerts
+#create data for panel
+class exportData(bpy.types.Operator):
+    bl_idname = "export.export_data"
+    bl_label = "Export Data"
+    #user specified file path for file output
+    filepath = bpy.props.StringProperty(subtype="FILE_PATH")
+    #export options
+    batch = bpy.props.BoolProperty(name="Selected Objects", description="Export every selected mesh to its own file, named after the object", default=False)
+    binary = bpy.props.BoolProperty(name="Binary", description="Write a 16 byte header and float32 corners instead of text", default=False)
+    #actual code for functions
+    def execute(self, context):
+        #meshes to export
+        if self.batch:
+            objects = [ob for ob in context.selected_objects if ob.type == 'MESH']
+        else:
+            objects = [context.active_object] if context.active_object and context.active_object.type == 'MESH' else []
+        if not objects:
+            self.report({'WARNING'}, "No mesh to export")
+            return {'CANCELLED'}
+        #snapshot the arrays here, the rest runs on copies
+        jobs = []
+        for obj in objects:
+            #pick up edits still in edit mode without leaving it
+            if obj.mode == 'EDIT':
+                obj.update_from_editmode()
+            #store vertex and face data as arrays
+            co, loopStart, loopTotal, loopVerts = meshArrays(obj.data)
+            jobs.append((co, loopStart, loopTotal, loopVerts, self.outputPath(obj), self.binary))
+        #turn nGons into quads and tris, gather every face's corners in pro builder order and write them out
+        if len(jobs) > 1:
+            #spawned workers have to start blender's python, not blender, only for this export
+            executable = multiprocessing.spawn.get_executable()
+            if hasattr(bpy.app, "binary_path_python"):
+                multiprocessing.set_executable(bpy.app.binary_path_python)
+            try:
+                results = probuilder_mesh.exportJobs(jobs)
+            finally:
+                multiprocessing.set_executable(executable)
+        else:
+            results = [probuilder_mesh.exportJob(jobs[0])]
+        self.report({'INFO'}, "Exported %d object(s), %d corners" % (len(results), sum(count for path, count in results)))
+        return {'FINISHED'}
+    #the chosen path for one object, or one file per object next to it in a batch
+    def outputPath(self, obj):
+        if not self.batch:
+            return self.filepath
+        base, ext = os.path.splitext(self.filepath)
+        return base + "_" + bpy.path.clean_name(obj.name) + (ext or (".bin" if self.binary else ".txt"))
+    #the rest of this stuff is just initiating the panel.
+    def invoke(self, context, event):
+        context.window_manager.fileselect_add(self)
+        return {'RUNNING_MODAL'}
+
+
+class exportDataPanel(bpy.types.Panel):
+    bl_idname = "Export_Data"
+    bl_label = "Export Data"
+    bl_space_type = "VIEW_3D"
+    bl_region_type = "TOOLS"
+    bl_context = "objectmode"
+    
+    def draw(self, context):
+        layout = self.layout
+        layout.operator("export.export_data", text="Export Data")
+def register():
+    bpy.utils.register_module(__name__)
+
+def unregister():
+    bpy.utils.unregister_module(__name__)
\ No newline at end of file
@@ -0,0 +1,218 @@
+#script by Alex Telford | CG Cookie | www.blendercookie.com
+#Description:
+#Array side of the pro builder exporter: polygon cleanup, corner ordering and the text and binary writers.
+#Nothing here imports bpy so export workers can run it in a plain python process.
+import os, sys, site, importlib.util
+import numpy as np
+#corner order pro builder wants, indexed by face corner count - 3
+REORDER = np.array([[1, 0, 2, 1],
+                    [3, 0, 2, 1]])
+#corners formatted per write
+CHUNK = 65536
+#normal angle limit for joining ngon triangles into quads, same as the old tris_convert_to_quads limit
+JOIN_LIMIT = 0.698132
+#fan indices of polygons as (tris, 3) loop indices
+def fanTriangles(loopStart, loopTotal):
+    fans = loopTotal - 2
+    first = np.repeat(loopStart, fans)
+    k = np.arange(fans.sum()) - np.repeat(np.cumsum(fans) - fans, fans)
+    return np.stack((first, first + k + 1, first + k + 2), axis=-1)
+#newell normal of every polygon
+def polygonNormals(co, loopStart, loopTotal, loopVerts):
+    face = np.repeat(np.arange(len(loopTotal)), loopTotal)
+    corner = np.arange(len(face))
+    nxt = np.where(corner + 1 == loopStart[face] + loopTotal[face], loopStart[face], corner + 1)
+    a = co[loopVerts[corner]].astype(np.float64)
+    b = co[loopVerts[nxt]].astype(np.float64)
+    products = np.cross(a, b)
+    return np.stack([np.bincount(face, products[:, axis], len(loopTotal)) for axis in range(3)], axis=-1)
+#per polygon, True when no corner turns against the normal
+def convexPolygons(co, loopStart, loopTotal, loopVerts, normals):
+    face = np.repeat(np.arange(len(loopTotal)), loopTotal)
+    corner = np.arange(len(face))
+    end = loopStart[face] + loopTotal[face]
+    nxt = np.where(corner + 1 == end, loopStart[face], corner + 1)
+    prev = np.where(corner == loopStart[face], end - 1, corner - 1)
+    p = co[loopVerts[prev]].astype(np.float64)
+    c = co[loopVerts[corner]].astype(np.float64)
+    n = co[loopVerts[nxt]].astype(np.float64)
+    turn = (np.cross(c - p, n - c) * normals[face]).sum(axis=1)
+    concave = np.zeros(len(loopTotal), dtype=bool)
+    concave[face[turn < 0]] = True
+    return ~concave
+#ear clip one polygon given its corner positions and normal, returns (tris, 3) indices into the corners
+def earClip(points, normal):
+    #flatten onto the plane the normal is most along, flipped so the polygon winds counter clockwise
+    axis = np.argmax(np.abs(normal))
+    x, y = [(1, 2), (2, 0), (0, 1)][axis]
+    flat = points[:, [x, y]] if normal[axis] > 0 else points[:, [y, x]]
+    def cross(o, a, b):
+        return (a[0] - o[0]) * (b[1] - o[1]) - (a[1] - o[1]) * (b[0] - o[0])
+    ring = list(range(len(points)))
+    tris = []
+    while len(ring) > 3:
+        for i in range(len(ring)):
+            a, b, c = ring[i - 1], ring[i], ring[(i + 1) % len(ring)]
+            if cross(flat[a], flat[b], flat[c]) <= 0:
+                continue
+            #no other corner may sit inside the ear
+            if any(cross(flat[a], flat[b], flat[o]) >= 0 and cross(flat[b], flat[c], flat[o]) >= 0 and
+                   cross(flat[c], flat[a], flat[o]) >= 0 for o in ring if o not in (a, b, c)):
+                continue
+            tris.append((a, b, c))
+            ring.pop(i)
+            break
+        else:
+            #degenerate leftovers, fan them rather than loop forever
+            break
+    tris.extend((ring[0], ring[k], ring[k + 1]) for k in range(1, len(ring) - 1))
+    return np.array(tris)
+#triangulate ngons, fans for convex ones and ear clipping for the rest, returns ((tris, 3) vertex indices, source face)
+def triangulateNgons(co, loopStart, loopTotal, loopVerts, faces):
+    normals = polygonNormals(co, loopStart, loopTotal, loopVerts)[faces]
+    convex = convexPolygons(co, loopStart[faces], loopTotal[faces], loopVerts, normals)
+    fanned = faces[convex]
+    tris = [loopVerts[fanTriangles(loopStart[fanned], loopTotal[fanned])]]
+    source = [np.repeat(fanned, loopTotal[fanned] - 2)]
+    for face, normal in zip(faces[~convex], normals[~convex]):
+        corners = loopVerts[loopStart[face]:loopStart[face] + loopTotal[face]]
+        tris.append(corners[earClip(co[corners].astype(np.float64), normal)])
+        source.append(np.full(loopTotal[face] - 2, face))
+    return np.concatenate(tris).reshape(-1, 3), np.concatenate(source)
+#join triangles of the same ngon into quads across their shared edges, returns (quads (Q, 4), leftover tris (T, 3))
+def pairTriangles(co, tris, source, limit=JOIN_LIMIT):
+    if not len(tris):
+        return np.empty((0, 4), dtype=tris.dtype), tris
+    #every directed edge, the pair of a shared edge comes out next to it once sorted by (ngon, low, high)
+    count = len(tris)
+    edge = np.arange(count * 3)
+    tri = edge // 3
+    k = edge % 3
+    a = tris[tri, k]
+    b = tris[tri, (k + 1) % 3]
+    keys = np.stack((source[tri], np.minimum(a, b), np.maximum(a, b)), axis=-1)
+    order = np.lexsort(keys.T[::-1])
+    same = np.all(keys[order[1:]] == keys[order[:-1]], axis=1)
+    first = order[:-1][same]
+    second = order[1:][same]
+    triA = tri[first]
+    triB = tri[second]
+    #quad p, u, q, v from tri a (p, u, v) and tri b, opposite corners p and q
+    p = tris[triA, (k[first] + 2) % 3]
+    u = a[first]
+    v = b[first]
+    q = tris[triB, (k[second] + 2) % 3]
+    quads = np.stack((p, u, q, v), axis=-1)
+
+    #score each join by how far the triangles bend and how far the quad is from square, lower is better
+    corners = co[quads].astype(np.float64)
+    normalA = np.cross(corners[:, 1] - corners[:, 0], corners[:, 3] - corners[:, 0])
+    normalB = np.cross(corners[:, 3] - corners[:, 2], corners[:, 1] - corners[:, 2])
+    lengths = np.sqrt((normalA ** 2).sum(axis=1) * (normalB ** 2).sum(axis=1))
+    bend = np.arccos(np.clip((normalA * normalB).sum(axis=1) / np.where(lengths > 0, lengths, 1), -1, 1))
+    into = np.roll(corners, 1, axis=1) - corners
+    out = np.roll(corners, -1, axis=1) - corners
+    cosine = (into * out).sum(axis=2) / np.maximum(np.sqrt((into ** 2).sum(axis=2) * (out ** 2).sum(axis=2)), 1e-30)
+    square = np.abs(np.arccos(np.clip(cosine, -1, 1)) - np.pi / 2).mean(axis=1)
+    #a join must also leave a convex quad
+    turn = (np.cross(corners - np.roll(corners, 1, axis=1), np.roll(corners, -1, axis=1) - corners) *
+            (normalA + normalB)[:, None]).sum(axis=2)
+    score = bend + square
+    alive = (bend <= limit) & (turn > 0).all(axis=1) & (lengths > 0)
+
+    #every round each triangle points at its best join, joins both triangles point at are taken.
+    #joins to a triangle with no other choice go first, the triangles of an ngon form a tree and
+    #matching its leaves first leaves the fewest triangles over
+    taken = np.zeros(count, dtype=bool)
+    joined = np.zeros(len(quads), dtype=bool)
+    while alive.any():
+        degree = np.bincount(triA[alive], minlength=count) + np.bincount(triB[alive], minlength=count)
+        leaf = (degree[triA] == 1) | (degree[triB] == 1)
+        rank = np.empty(len(score), dtype=np.int64)
+        rank[np.lexsort((score, ~leaf))] = np.arange(len(score))
+        best = np.full(count, len(score))
+        np.minimum.at(best, triA[alive], rank[alive])
+        np.minimum.at(best, triB[alive], rank[alive])
+        mutual = alive & (best[triA] == rank) & (best[triB] == rank)
+        joined |= mutual
+        taken[triA[mutual]] = True
+        taken[triB[mutual]] = True
+        alive &= ~taken[triA] & ~taken[triB]
+    return quads[joined], tris[~taken]
+#export only polygons: tris and quads as they are, ngons triangulated and joined back into quads where they are flat enough.
+#works on copies of the arrays, the mesh itself is never touched
+def exportPolygons(co, loopStart, loopTotal, loopVerts):
+    ngons = np.nonzero(loopTotal > 4)[0]
+    kept = np.nonzero(loopTotal <= 4)[0]
+    kept = kept[loopTotal[kept] >= 3]
+    tris, source = triangulateNgons(co, loopStart, loopTotal, loopVerts, ngons)
+    quads, tris = pairTriangles(co, tris, source)
+    #loop indices of the kept faces, in order
+    offsets = np.cumsum(loopTotal[kept]) - loopTotal[kept]
+    keptLoops = np.repeat(loopStart[kept] - offsets, loopTotal[kept]) + np.arange(loopTotal[kept].sum())
+    newTotal = np.concatenate((loopTotal[kept], np.full(len(quads), 4), np.full(len(tris), 3))).astype(np.int32)
+    newVerts = np.concatenate((loopVerts[keptLoops], quads.ravel(), tris.ravel())).astype(np.int32)
+    return (np.cumsum(newTotal) - newTotal).astype(np.int32), newTotal, newVerts
+#every face's corners in pro builder order as one (faces * 4, 3) array, faces must be tris or quads
+def cornerCoordinates(co, loopStart, loopTotal, loopVerts):
+    corners = loopStart[:, None] + REORDER[loopTotal - 3]
+    return co[loopVerts[corners.ravel()]]
+#write x,y,z lines, each chunk is formatted by one % on a prebuilt format string
+def writeCorners(filepath, corners, chunk=CHUNK):
+    with open(filepath, 'w', buffering=1 << 20) as file:
+        for start in range(0, len(corners), chunk):
+            block = corners[start:start + chunk]
+            file.write(("%.9g,%.9g,%.9g\n" * len(block)) % tuple(block.ravel().tolist()))
+#binary files: 16 byte header then the corners as little endian float32 x, y, z
+BINARY_HEADER = np.dtype([('magic', 'S4'), ('version', '<u4'), ('corners', '<u8')])
+BINARY_MAGIC = b'PBMD'
+BINARY_VERSION = 1
+#write the header and map the corner block straight onto the file
+def writeBinary(filepath, corners):
+    header = np.memmap(filepath, dtype=BINARY_HEADER, mode='w+', shape=(1,))
+    header[0] = (BINARY_MAGIC, BINARY_VERSION, len(corners))
+    header.flush()
+    del header
+    if len(corners):
+        block = np.memmap(filepath, dtype='<f4', mode='r+', offset=BINARY_HEADER.itemsize, shape=(len(corners), 3))
+        block[:] = corners
+        block.flush()
+        del block
+#read a binary export back, the corners stay memory mapped
+def readBinary(filepath):
+    header = np.fromfile(filepath, dtype=BINARY_HEADER, count=1)[0]
+    if header['magic'] != BINARY_MAGIC:
+        raise ValueError("%s is not a pro builder binary export" % filepath)
+    if not header['corners']:
+        return np.empty((0, 3), dtype='<f4')
+    return np.memmap(filepath, dtype='<f4', mode='r', offset=BINARY_HEADER.itemsize, shape=(int(header['corners']), 3))
+#one whole export from snapshot arrays: (co, loopStart, loopTotal, loopVerts, filepath, binary) -> (filepath, corner count)
+def exportJob(job):
+    co, loopStart, loopTotal, loopVerts, filepath, binary = job
+    loopStart, loopTotal, loopVerts = exportPolygons(co, loopStart, loopTotal, loopVerts)
+    corners = cornerCoordinates(co, loopStart, loopTotal, loopVerts)
+    if binary:
+        writeBinary(filepath, corners)
+    else:
+        writeCorners(filepath, corners)
+    return filepath, len(corners)
+#this file loaded under its plain name, so jobs pickle as probuilder_mesh.exportJob instead of through the addon package (which needs bpy)
+def workerModule():
+    module = sys.modules.get("probuilder_mesh")
+    if module is None:
+        spec = importlib.util.spec_from_file_location("probuilder_mesh", os.path.abspath(__file__))
+        module = importlib.util.module_from_spec(spec)
+        sys.modules["probuilder_mesh"] = module
+        spec.loader.exec_module(module)
+    return module
+#run export jobs over a pool of worker processes, biggest meshes first so the pool finishes together
+#workers are given this directory to import from, nothing is added to the parent's sys.path
+def exportJobs(jobs, processes=None):
+    from concurrent.futures import ProcessPoolExecutor
+    order = sorted(range(len(jobs)), key=lambda i: -len(jobs[i][3]))
+    results = [None] * len(jobs)
+    directory = os.path.dirname(os.path.abspath(__file__))
+    with ProcessPoolExecutor(processes, initializer=site.addsitedir, initargs=(directory,)) as pool:
+        for i, result in zip(order, pool.map(workerModule().exportJob, [jobs[i] for i in order])):
+            results[i] = result
+    return results
@@ -22,9 +22,14 @@ if "bpy" in locals():
     imp.reload(tools_sculpt)
     imp.reload(tools_materials)
     imp.reload(tools_cleanup)
+    imp.reload(snapshot_angles)
+    imp.reload(snapshot_turntable)
+    imp.reload(snapshot_sheets)
+    imp.reload(snapshot_budget)
     imp.reload(tools_render)
     print("Reloaded multifiles")
 else:
+    from . import snapshot_angles, snapshot_turntable, snapshot_sheets, snapshot_budget
     from . import tools_display, tools_relationship, tools_names, tools_mesh, tools_sculpt, tools_materials, tools_cleanup, tools_render
                   
     print("Imported multifiles")
@@ -489,7 +494,17 @@ class OBJECT_PT_sceneToolboxPanel(bpy.types.Panel):
                             reset.angleN = i
                             remove = box_row.operator("render.ss_angle_remove","",icon="X")
                             remove.angleN = i
-                        
+                    
+                    box_col = box.column(align=True)
+                    box_row = box_col.row(align=True)
+                    box_row.operator('render.ss_angle_generate','Generate',icon="MESH_CIRCLE")
+                    box_row.operator('render.ss_angle_import','Import',icon="IMPORT")
+                    box_row.operator('render.ss_angle_export','Export',icon="EXPORT")
+                    split = box_col.split(percentage=0.65,align=True)
+                    split.prop_search(ktScn, 'ssAngleSource', bpy.data, 'scenes', '')
+                    split.operator('render.ss_angle_copy_scene','Copy',icon="COPYDOWN")
+                    
+                    if len(scn.ss_camAngles) > 0:
                         box_col = box.column(align=True)
                         split = box_col.split(percentage=0.35,align=True)
                         split.operator('render.ss_set_scaler','Scaler')
@@ -504,6 +519,17 @@ class OBJECT_PT_sceneToolboxPanel(bpy.types.Panel):
                         if ktScn.ssRenType == "Engine":
                             box_row.prop(ktScn,"ssRelative","Relative")
                             box_row.prop(ktScn,"ssGround","Ground")
+                            
+                            if kt.ren_type == 'Cycles':
+                                box_col = box.column(align=True)
+                                split = box_col.split(percentage=0.5,align=True)
+                                split.prop(ktScn,"ssBudget","Budget")
+                                split.prop(ktScn,"ssBudgetSeconds","Sec")
+                                if ktScn.ssBudget == True:
+                                    box_row = box_col.row(align=True)
+                                    box_row.prop(ktScn,"ssBudgetMinSamples","Min")
+                                    box_row.prop(ktScn,"ssBudgetMaxSamples","Max")
+                                    box_col.prop(ktScn,"ssBudgetFallback","OpenGL Fallback")
                         
                         box_col = box.column(align=True)
                         box_row = box_col.row(align=True)
@@ -520,6 +546,17 @@ class OBJECT_PT_sceneToolboxPanel(bpy.types.Panel):
                         square = box_row.operator("render.ss_frame_ratio",'Square',icon=icnS)
                         square.ratio = 'SQUARE'
                         box_col.prop(ktScn,"ssAnimRange","Range")
+                        box_row = box_col.row(align=True)
+                        box_row.prop(ktScn,"ssTurnMode", expand=True) #Movie or Frames turntables
+                        
+                        if ktScn.ssTurnMode == "FRAMES":
+                            box_row = box_col.row(align=True)
+                            box_row.prop(ktScn,"ssTurnFormat","")
+                            box_row.prop(ktScn,"ssTurnSymmetry","Sym")
+                            box_row = box_col.row(align=True)
+                            box_row.prop(ktScn,"ssTurnChunk","Chunk")
+                            box_row.prop(ktScn,"ssTurnWorkers","Workers")
+                            box_col.prop(ktScn,"ssEncoder","")
                         
                         box_col = box.column(align=True)
                         split = box_col.split(percentage=0.35,align=True)
@@ -529,6 +566,16 @@ class OBJECT_PT_sceneToolboxPanel(bpy.types.Panel):
                         split.operator('render.ss_guess_version', 'Version')
                         split.prop(ktScn,"ssAssetVersion",'')
                         box_col.prop(ktScn,"ssDeviation")
+                        
+                        box_col = box.column(align=True)
+                        split = box_col.split(percentage=0.8,align=True)
+                        split.prop(ktScn,"ssContactSheet")
+                        split.operator('render.ss_contact_sheet','',icon="IMAGE_COL")
+                        if ktScn.ssContactSheet == True:
+                            box_row = box_col.row(align=True)
+                            box_row.prop(ktScn,"ssSheetColumns","Cols")
+                            box_row.prop(ktScn,"ssSheetCell","Cell")
+                            box_row.prop(ktScn,"ssThumbSize","Thumb")
                         box_col = box.column(align=False)
                         box_col.scale_y = 2
                         box_col.operator('render.ss_do_render',icon="FILE_TICK")   
@@ -679,12 +726,14 @@ class ssCamAnglesPG(bpy.types.PropertyGroup):
     angleName = bpy.props.StringProperty(name="Angle Name",description="Name of the chosen camera angle",default="Angle.000")
     toggle_still = bpy.props.BoolProperty(name="Still",description="Render still frame based on angle",default=False)
     toggle_turn = bpy.props.BoolProperty(name="Turn",description="Render turntable based on angle",default=False)
-    camLoc = bpy.props.StringProperty()
-    camRot = bpy.props.StringProperty()
-    camFL = bpy.props.IntProperty()
+    camLoc = bpy.props.FloatVectorProperty(name="Location",size=3,subtype='TRANSLATION')
+    camRot = bpy.props.FloatVectorProperty(name="Rotation",size=3,subtype='EULER')
+    camFL = bpy.props.FloatProperty(name="Focal Length",default=35,min=1)
     
 class ktSceneProps(bpy.types.PropertyGroup):
     ssRenTypes = [('Engine','Engine','Render snapshot with the render engine'),('OpenGL','OpenGL','Render snapshot with OpenGL shading')]   
+    ssTurnModes = [('MOVIE','Movie','Render turntables straight to a QuickTime movie'),('FRAMES','Frames','Render turntables to a resumable frame sequence, then encode')]
+    ssTurnFormats = [('PNG','PNG','Turntable frame format'),('OPEN_EXR','OpenEXR','Turntable frame format')]
     
     ssAnimRange = bpy.props.IntProperty(name='Frame Range', default=100, min=4, description='Frame range for rendering turntables')
     ssAssetName = bpy.props.StringProperty(name='Asset Name', default='myModel', description='Name of the Asset')
@@ -695,6 +744,22 @@ class ktSceneProps(bpy.types.PropertyGroup):
     ssRenType = bpy.props.EnumProperty(name='SS Type',items=ssRenTypes)
     ssRelative = bpy.props.BoolProperty(name='Relative Lights', default=True, description="Keep the lights' position relative to camera angle")
     ssGround = bpy.props.BoolProperty(name='Ground Plane', default=True, description="Render ground plane")
+    ssTurnMode = bpy.props.EnumProperty(name='Turntable Mode',items=ssTurnModes)
+    ssTurnFormat = bpy.props.EnumProperty(name='Frame Format',items=ssTurnFormats)
+    ssTurnChunk = bpy.props.IntProperty(name='Chunk Size', default=10, min=1, description='Frames rendered per chunk; finished chunks are kept if a render is interrupted')
+    ssTurnWorkers = bpy.props.IntProperty(name='Workers', default=1, min=1, max=64, description='Background Blender processes rendering chunks in parallel (Engine renders only)')
+    ssTurnSymmetry = bpy.props.IntProperty(name='Symmetry', default=1, min=1, max=64, description='How many times the spinner silhouette repeats per turn; repeated frames are copied instead of rendered')
+    ssEncoder = bpy.props.StringProperty(name='Encoder', default='ffmpeg', description='ffmpeg executable used to encode turntable frames; Blender encodes them if it is not found')
+    ssBudget = bpy.props.BoolProperty(name='Time Budget', default=False, description="Calibrate and pick Cycles samples so each angle renders in the target time")
+    ssBudgetSeconds = bpy.props.FloatProperty(name='Seconds per Frame', default=30, min=0.1, description='Target render time per angle (and per turntable frame)')
+    ssBudgetMinSamples = bpy.props.IntProperty(name='Min Samples', default=16, min=1, description='Never render with fewer samples than this')
+    ssBudgetMaxSamples = bpy.props.IntProperty(name='Max Samples', default=1024, min=1, description='Never render with more samples than this')
+    ssBudgetFallback = bpy.props.BoolProperty(name='OpenGL Fallback', default=False, description="Render with OpenGL when even the minimum samples exceed the budget")
+    ssContactSheet = bpy.props.BoolProperty(name='Contact Sheet', default=False, description="Build a labeled contact sheet and web thumbnails from the rendered stills")
+    ssSheetColumns = bpy.props.IntProperty(name='Columns', default=6, min=1, max=32, description='Contact sheet columns')
+    ssSheetCell = bpy.props.IntProperty(name='Cell Size', default=320, min=32, max=2048, description='Contact sheet cell size in pixels')
+    ssThumbSize = bpy.props.IntProperty(name='Thumbnail Size', default=480, min=0, max=4096, description='Longest side of web thumbnails in pixels, 0 disables thumbnails')
+    ssAngleSource = bpy.props.StringProperty(name='Angle Source', default='', description='Scene (shot) to copy camera angles from')
         
        
 def register():
@@ -0,0 +1,157 @@
+import json
+import math
+import os
+
+import numpy as np
+
+#-------------------------------------------------------
+#-------------- SNAPSHOT ANGLE LIBRARY -----------------
+#-------------------------------------------------------
+
+#an angle library is a plain dict of parallel arrays so a whole sweep can be
+#read, written and applied without touching one angle at a time:
+#   names    list of angle names
+#   location (N,3) float32 camera locations
+#   rotation (N,3) float32 XYZ euler rotations
+#   lens     (N,)  float32 focal lengths
+#   still    (N,)  bool render still toggles
+#   turn     (N,)  bool render turntable toggles
+#no bpy in here so libraries can be built and inspected headless
+
+LIBRARY_VERSION = 1
+SENSOR_WIDTH = 32.0 #blender's default camera sensor width in mm
+
+
+def emptyAngles(count=0):
+    return {'names': ["Angle.%.3d" % (i + 1) for i in range(count)],
+            'location': np.zeros((count, 3), dtype=np.float32),
+            'rotation': np.zeros((count, 3), dtype=np.float32),
+            'lens': np.full(count, 35.0, dtype=np.float32),
+            'still': np.ones(count, dtype=bool),
+            'turn': np.zeros(count, dtype=bool)}
+
+
+def angleCount(lib):
+    return len(lib['names'])
+
+
+def concatAngles(libA, libB):
+    lib = {'names': list(libA['names']) + list(libB['names'])}
+    for key in ('location', 'rotation', 'lens', 'still', 'turn'):
+        lib[key] = np.concatenate((libA[key], libB[key]))
+    return lib
+
+
+def lookAtEuler(locations, target):
+    #XYZ euler that points a camera (looking down its -Z, +Y up) from each location at target
+    locations = np.asarray(locations, dtype=np.float64).reshape(-1, 3)
+    direction = np.asarray(target, dtype=np.float64) - locations
+    length = np.sqrt((direction * direction).sum(axis=1))
+    length[length == 0] = 1.0
+    direction /= length[:, None]
+
+    euler = np.zeros_like(direction)
+    euler[:, 0] = np.arccos(np.clip(-direction[:, 2], -1.0, 1.0))
+    euler[:, 2] = np.arctan2(-direction[:, 0], direction[:, 1])
+    return euler
+
+
+def framingDistance(radius, lens, margin=1.2):
+    #distance at which a sphere of radius fills the frame for a given focal length
+    halfFov = math.atan((SENSOR_WIDTH * 0.5) / max(lens, 0.001))
+    return (radius * margin) / math.sin(halfFov)
+
+
+def orbitAngles(center, radius, count, lens=50.0, elevation=math.radians(20),
+                arcStart=0.0, arcEnd=2 * math.pi, margin=1.2, prefix="Orbit"):
+    #build count angles on a circle (or arc) around center, all framing a sphere of radius
+    count = max(int(count), 1)
+    fullCircle = abs(abs(arcEnd - arcStart) - 2 * math.pi) < 1e-6
+    azimuth = np.linspace(arcStart, arcEnd, count, endpoint=not fullCircle or count == 1)
+
+    distance = framingDistance(radius, lens, margin)
+    center = np.asarray(center, dtype=np.float64)
+    ring = distance * math.cos(elevation)
+
+    locations = np.empty((count, 3))
+    locations[:, 0] = center[0] + ring * np.sin(azimuth)
+    locations[:, 1] = center[1] - ring * np.cos(azimuth)
+    locations[:, 2] = center[2] + distance * math.sin(elevation)
+
+    lib = emptyAngles(count)
+    lib['names'] = ["%s.%.3d" % (prefix, i + 1) for i in range(count)]
+    lib['location'][:] = locations
+    lib['rotation'][:] = lookAtEuler(locations, center)
+    lib['lens'][:] = lens
+    return lib
+
+
+def boundsSphere(corners):
+    #center and radius of the sphere enclosing an (N,3) array of bound box corners
+    corners = np.asarray(corners, dtype=np.float64).reshape(-1, 3)
+    lo = corners.min(axis=0)
+    hi = corners.max(axis=0)
+    center = (lo + hi) * 0.5
+    radius = float(np.sqrt(((hi - lo) ** 2).sum()) * 0.5)
+    return center, max(radius, 0.001)
+
+
+#-------------- LIBRARY FILES ---------------------------
+
+def saveAngleLibrary(filepath, lib):
+    ext = os.path.splitext(filepath)[1].lower()
+
+    if ext == '.npz':
+        np.savez_compressed(filepath,
+                            version=LIBRARY_VERSION,
+                            names=np.array(lib['names'], dtype=str),
+                            location=lib['location'],
+                            rotation=lib['rotation'],
+                            lens=lib['lens'],
+                            still=lib['still'],
+                            turn=lib['turn'])
+    else:
+        angles = []
+        for i, name in enumerate(lib['names']):
+            angles.append({'name': name,
+                           'location': [float(v) for v in lib['location'][i]],
+                           'rotation': [float(v) for v in lib['rotation'][i]],
+                           'lens': float(lib['lens'][i]),
+                           'still': bool(lib['still'][i]),
+                           'turn': bool(lib['turn'][i])})
+        with open(filepath, 'w') as file:
+            json.dump({'version': LIBRARY_VERSION, 'angles': angles}, file, indent=1)
+
+    return filepath
+
+
+def loadAngleLibrary(filepath):
+    ext = os.path.splitext(filepath)[1].lower()
+
+    if ext == '.npz':
+        with np.load(filepath) as data:
+            count = len(data['names'])
+            lib = emptyAngles(count)
+            lib['names'] = [str(n) for n in data['names']]
+            lib['location'][:] = data['location'].reshape(count, 3)
+            lib['rotation'][:] = data['rotation'].reshape(count, 3)
+            lib['lens'][:] = data['lens']
+            if 'still' in data:
+                lib['still'][:] = data['still']
+            if 'turn' in data:
+                lib['turn'][:] = data['turn']
+        return lib
+
+    with open(filepath, 'r') as file:
+        data = json.load(file)
+
+    angles = data['angles'] if isinstance(data, dict) else data
+    lib = emptyAngles(len(angles))
+    for i, angle in enumerate(angles):
+        lib['names'][i] = angle.get('name', lib['names'][i])
+        lib['location'][i] = angle['location']
+        lib['rotation'][i] = angle['rotation']
+        lib['lens'][i] = angle.get('lens', 35.0)
+        lib['still'][i] = angle.get('still', True)
+        lib['turn'][i] = angle.get('turn', False)
+    return lib
@@ -0,0 +1,177 @@
+import os
+import re
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+#-------------------------------------------------------
+#-------------- SNAPSHOT CONTACT SHEETS ----------------
+#-------------------------------------------------------
+
+#post-render stage turning finished snapshot stills into one labeled contact
+#sheet per asset/version/deviation plus web sized thumbnails. images are
+#(h, w, 4) float32 arrays, top row first. loading and saving are passed in
+#as callbacks (blender's image api is main thread only) while the resampling
+#runs in a thread pool. only a few images are ever in flight at once.
+
+#renders are named asset_version_###_angle.ext
+STILL_NAME = re.compile(r'^(?P<asset>.+?)_(?P<version>[^_]+)_(?P<deviation>\d{3})_(?P<angle>.+)$')
+STILL_EXT = ('.png', '.jpg', '.jpeg')
+
+#5x7 column font, bit 0 is the top row
+FONT = {
+    '0': (0x3E,0x51,0x49,0x45,0x3E), '1': (0x00,0x42,0x7F,0x40,0x00), '2': (0x42,0x61,0x51,0x49,0x46),
+    '3': (0x21,0x41,0x45,0x4B,0x31), '4': (0x18,0x14,0x12,0x7F,0x10), '5': (0x27,0x45,0x45,0x45,0x39),
+    '6': (0x3C,0x4A,0x49,0x49,0x30), '7': (0x01,0x71,0x09,0x05,0x03), '8': (0x36,0x49,0x49,0x49,0x36),
+    '9': (0x06,0x49,0x49,0x29,0x1E), 'A': (0x7E,0x11,0x11,0x11,0x7E), 'B': (0x7F,0x49,0x49,0x49,0x36),
+    'C': (0x3E,0x41,0x41,0x41,0x22), 'D': (0x7F,0x41,0x41,0x22,0x1C), 'E': (0x7F,0x49,0x49,0x49,0x41),
+    'F': (0x7F,0x09,0x09,0x09,0x01), 'G': (0x3E,0x41,0x49,0x49,0x7A), 'H': (0x7F,0x08,0x08,0x08,0x7F),
+    'I': (0x00,0x41,0x7F,0x41,0x00), 'J': (0x20,0x40,0x41,0x3F,0x01), 'K': (0x7F,0x08,0x14,0x22,0x41),
+    'L': (0x7F,0x40,0x40,0x40,0x40), 'M': (0x7F,0x02,0x0C,0x02,0x7F), 'N': (0x7F,0x04,0x08,0x10,0x7F),
+    'O': (0x3E,0x41,0x41,0x41,0x3E), 'P': (0x7F,0x09,0x09,0x09,0x06), 'Q': (0x3E,0x41,0x51,0x21,0x5E),
+    'R': (0x7F,0x09,0x19,0x29,0x46), 'S': (0x46,0x49,0x49,0x49,0x31), 'T': (0x01,0x01,0x7F,0x01,0x01),
+    'U': (0x3F,0x40,0x40,0x40,0x3F), 'V': (0x1F,0x20,0x40,0x20,0x1F), 'W': (0x3F,0x40,0x38,0x40,0x3F),
+    'X': (0x63,0x14,0x08,0x14,0x63), 'Y': (0x07,0x08,0x70,0x08,0x07), 'Z': (0x61,0x51,0x49,0x45,0x43),
+    '_': (0x40,0x40,0x40,0x40,0x40), '-': (0x08,0x08,0x08,0x08,0x08), '.': (0x00,0x60,0x60,0x00,0x00),
+    ':': (0x00,0x36,0x36,0x00,0x00), '/': (0x20,0x10,0x08,0x04,0x02), '(': (0x00,0x1C,0x22,0x41,0x00),
+    ')': (0x00,0x41,0x22,0x1C,0x00), ' ': (0x00,0x00,0x00,0x00,0x00)}
+
+GLYPHS = dict((ch, ((np.array(cols)[None, :] >> np.arange(7)[:, None]) & 1).astype(bool)) for ch, cols in FONT.items())
+
+
+def drawText(canvas, x, y, text, color=(1, 1, 1, 1), scale=2):
+    #stamp text into canvas with its top left corner at x, y; clipped to the canvas
+    h, w = canvas.shape[:2]
+    for ch in text.upper():
+        glyph = GLYPHS.get(ch, GLYPHS['-'])
+        if scale > 1:
+            glyph = glyph.repeat(scale, axis=0).repeat(scale, axis=1)
+        gh, gw = glyph.shape
+        if x >= w:
+            break
+        gh = min(gh, h - y)
+        gw = min(gw, w - x)
+        if gh > 0 and gw > 0:
+            canvas[y:y + gh, x:x + gw][glyph[:gh, :gw]] = color
+        x += 6 * scale
+    return x
+
+
+def fitSize(width, height, maxSize):
+    scale = min(1.0, float(maxSize) / max(width, height))
+    return max(1, int(round(width * scale))), max(1, int(round(height * scale)))
+
+
+def areaWeights(size, outSize):
+    #(outSize, size) matrix averaging the source pixels each output pixel covers
+    edges = np.linspace(0, size, outSize + 1)
+    lo = edges[:-1, None]
+    hi = edges[1:, None]
+    src = np.arange(size)[None, :]
+    cover = np.clip(np.minimum(hi, src + 1) - np.maximum(lo, src), 0, None)
+    return (cover / cover.sum(axis=1, keepdims=True)).astype(np.float32)
+
+
+def areaResize(pixels, outWidth, outHeight):
+    h, w = pixels.shape[:2]
+    if (w, h) == (outWidth, outHeight):
+        return pixels
+    if h % outHeight == 0 and w % outWidth == 0:
+        #whole factor, plain box filter
+        fy, fx = h // outHeight, w // outWidth
+        return pixels.reshape(outHeight, fy, outWidth, fx, -1).mean(axis=(1, 3))
+    rows = areaWeights(h, outHeight)
+    cols = areaWeights(w, outWidth)
+    return np.einsum('yh,hwc,xw->yxc', rows, pixels, cols, optimize=True)
+
+
+def stillGroups(paths):
+    #{(asset, version, deviation): [(angle, path), ...]} for snapshot named stills
+    groups = {}
+    for path in sorted(paths):
+        stem, ext = os.path.splitext(os.path.basename(path))
+        match = STILL_NAME.match(stem)
+        if ext.lower() not in STILL_EXT or not match:
+            continue
+        key = (match.group('asset'), match.group('version'), match.group('deviation'))
+        groups.setdefault(key, []).append((match.group('angle'), path))
+    return groups
+
+
+class ContactSheet(object):
+
+    def __init__(self, count, cellSize, columns=6, title='', pad=8, labelScale=2, bg=(0.08, 0.08, 0.08, 1)):
+        self.columns = max(1, min(columns, count))
+        self.rows = (count + self.columns - 1) // self.columns
+        self.cellW, self.cellH = cellSize
+        self.pad = pad
+        self.labelScale = labelScale
+        self.labelH = 7 * labelScale + pad
+        self.titleH = (7 * labelScale * 2 + pad * 2) if title else pad
+
+        width = self.columns * (self.cellW + pad) + pad
+        height = self.titleH + self.rows * (self.cellH + self.labelH + pad)
+        self.canvas = np.empty((height, width, 4), dtype=np.float32)
+        self.canvas[:] = bg
+        if title:
+            drawText(self.canvas, pad, pad, title, scale=labelScale * 2)
+
+    def paste(self, index, tile, label=''):
+        row, col = divmod(index, self.columns)
+        x = self.pad + col * (self.cellW + self.pad)
+        y = self.titleH + row * (self.cellH + self.labelH + self.pad)
+        th, tw = tile.shape[:2]
+        #center the tile in its cell
+        ox = x + (self.cellW - tw) // 2
+        oy = y + (self.cellH - th) // 2
+        self.canvas[oy:oy + th, ox:ox + tw] = tile
+        if label:
+            drawText(self.canvas, x, y + self.cellH + self.pad // 2, label, color=(0.8, 0.8, 0.8, 1), scale=self.labelScale)
+
+
+def prepareTiles(pixels, cellSize, thumbSize):
+    #runs in the pool: one sheet tile and one web thumbnail per still
+    h, w = pixels.shape[:2]
+    tile = areaResize(pixels, *fitSize(w, h, max(cellSize)))
+    thumb = areaResize(pixels, *fitSize(w, h, thumbSize)) if thumbSize else None
+    return tile, thumb
+
+
+def buildContactSheet(stills, loadImage, saveImage, sheetPath, thumbDir=None, title='',
+                      columns=6, cellSize=(320, 320), thumbSize=480, workers=4):
+    #stills: [(label, path), ...]. loadImage(path) -> pixels, saveImage(path, pixels) -> None.
+    #at most workers * 2 decoded images are alive at any time
+    if not stills:
+        return None, []
+
+    sheet = ContactSheet(len(stills), cellSize, columns, title)
+    thumbs = []
+    inFlight = deque()
+
+    def finish():
+        index, label, path, future = inFlight.popleft()
+        tile, thumb = future.result()
+        sheet.paste(index, tile, label)
+        if thumb is not None and thumbDir:
+            thumbPath = os.path.join(thumbDir, os.path.splitext(os.path.basename(path))[0] + '.jpg')
+            saveImage(thumbPath, thumb)
+            thumbs.append(thumbPath)
+
+    if thumbDir and not os.path.isdir(thumbDir):
+        os.makedirs(thumbDir)
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        for index, (label, path) in enumerate(stills):
+            pixels = loadImage(path)
+            if pixels is None:
+                continue
+            inFlight.append((index, label, path, pool.submit(prepareTiles, pixels, cellSize, thumbSize)))
+            del pixels
+            if len(inFlight) >= workers * 2:
+                finish()
+        while inFlight:
+            finish()
+
+    saveImage(sheetPath, sheet.canvas)
+    return sheetPath, thumbs
@@ -2,6 +2,12 @@ import bpy
 import os
 import random
 import math
+import ast
+import numpy as np
+from mathutils import Vector
+import tempfile
+import time
+from . import snapshot_angles, snapshot_turntable, snapshot_sheets, snapshot_budget
 
 #-------------------------------------------------------
 #-------------- RENDER ---------------------------------
@@ -18,6 +24,84 @@ class OBJECT_OT_ssAddCamera(bpy.types.Operator):
         #maybe change clipping end to 10000 upon creation              
         return {'FINISHED'} 
 
+def upgradeLegacyAngles(angles):
+    #angles saved before camLoc/camRot became vectors hold stringified lists
+    for angle in angles:
+        for key in ('camLoc', 'camRot'):
+            raw = angle.get(key)
+            if isinstance(raw, str):
+                del angle[key]
+                setattr(angle, key, ast.literal_eval(raw))
+        raw = angle.get('camFL')
+        if isinstance(raw, int):
+            del angle['camFL']
+            angle.camFL = float(raw)
+
+
+def readCamAngles(angles):
+    #pull a whole ss_camAngles collection into an angle library in one pass
+    upgradeLegacyAngles(angles)
+    count = len(angles)
+    lib = snapshot_angles.emptyAngles(count)
+    
+    loc = np.empty(count * 3, dtype=np.float32)
+    rot = np.empty(count * 3, dtype=np.float32)
+    still = np.empty(count, dtype=bool)
+    turn = np.empty(count, dtype=bool)
+    angles.foreach_get('camLoc', loc)
+    angles.foreach_get('camRot', rot)
+    angles.foreach_get('camFL', lib['lens'])
+    angles.foreach_get('toggle_still', still)
+    angles.foreach_get('toggle_turn', turn)
+    
+    lib['names'] = [angle.angleName for angle in angles]
+    lib['location'][:] = loc.reshape(count, 3)
+    lib['rotation'][:] = rot.reshape(count, 3)
+    lib['still'][:] = still
+    lib['turn'][:] = turn
+    return lib
+
+
+def writeCamAngles(angles, lib, replace=True):
+    #append (or replace with) every angle of a library, setting values in bulk
+    if replace:
+        angles.clear()
+        merged = lib
+    else:
+        merged = snapshot_angles.concatAngles(readCamAngles(angles), lib)
+        
+    start = len(angles)
+    for i, name in enumerate(lib['names']):
+        angle = angles.add()
+        angle.name = "ssAng.%.3d" % (start + i + 1)
+        angle.angleName = name
+        
+    angles.foreach_set('camLoc', merged['location'].ravel())
+    angles.foreach_set('camRot', merged['rotation'].ravel())
+    angles.foreach_set('camFL', merged['lens'])
+    angles.foreach_set('toggle_still', merged['still'])
+    angles.foreach_set('toggle_turn', merged['turn'])
+    return len(lib['names'])
+
+
+def applyCamAngle(camOb, lib, i):
+    camOb.location = lib['location'][i]
+    camOb.rotation_euler = lib['rotation'][i]
+    camOb.data.lens = float(lib['lens'][i])
+
+
+def scalerBoundCorners(focusOb):
+    #world space bound box corners of an object and all its children, no ops needed
+    corners = []
+    stack = [focusOb]
+    while stack:
+        ob = stack.pop()
+        mtx = ob.matrix_world
+        corners.extend([list(mtx * Vector(c)) for c in ob.bound_box])
+        stack.extend(ob.children)
+    return np.array(corners, dtype=np.float64)
+    
+
 class OBJECT_OT_ssAngleAdd(bpy.types.Operator):
     bl_idname = "render.ss_angle_add"
     bl_label = "Add Camera Angle"
@@ -33,8 +117,8 @@ class OBJECT_OT_ssAngleAdd(bpy.types.Operator):
             angNo = len(scn.ss_camAngles)
             angle.name = "ssAng.%.3d" % angNo
             angle.angleName = "Angle.%.3d" % angNo
-            angle.camLoc = str(list(scn.camera.location))
-            angle.camRot = str(list(scn.camera.rotation_euler))
+            angle.camLoc = scn.camera.location
+            angle.camRot = scn.camera.rotation_euler
             angle.camFL = scn.camera.data.lens
                        
         return {'FINISHED'}
@@ -49,8 +133,8 @@ class OBJECT_OT_ssAngleReset(bpy.types.Operator):
     def execute(self, context):
         scn = bpy.context.scene
         
-        scn.ss_camAngles[self.angleN].camLoc = str(list(scn.camera.location))
-        scn.ss_camAngles[self.angleN].camRot = str(list(scn.camera.rotation_euler))
+        scn.ss_camAngles[self.angleN].camLoc = scn.camera.location
+        scn.ss_camAngles[self.angleN].camRot = scn.camera.rotation_euler
         scn.ss_camAngles[self.angleN].camFL = scn.camera.data.lens
                        
         return {'FINISHED'}    
@@ -78,10 +162,16 @@ class OBJECT_OT_ssAnglePreview(bpy.types.Operator):
     
     def execute(self, context):
         scn = bpy.context.scene
+        angle = scn.ss_camAngles[self.angleN]
+        upgradeLegacyAngles([angle])
+        
+        scn.camera.location = angle.camLoc
+        scn.camera.rotation_euler = angle.camRot
+        scn.camera.data.lens = angle.camFL
         
-        scn.camera.location = eval(scn.ss_camAngles[self.angleN].camLoc)
-        scn.camera.rotation_euler = eval(scn.ss_camAngles[self.angleN].camRot)
-        scn.camera.data.lens = scn.ss_camAngles[self.angleN].camFL
+        #no screen when running in background mode
+        if bpy.context.screen == None:
+            return {'FINISHED'}
         
         view = None
         for area in bpy.context.screen.areas:
@@ -92,6 +182,121 @@ class OBJECT_OT_ssAnglePreview(bpy.types.Operator):
             bpy.ops.view3d.viewnumpad(type='CAMERA')
                        
         return {'FINISHED'}
+
+
+class OBJECT_OT_ssAngleGenerate(bpy.types.Operator):
+    bl_idname = "render.ss_angle_generate"
+    bl_label = "Generate Camera Angles"
+    bl_description = "Generate an orbit or arc of camera angles framing the scaler object"
+    bl_options = {'REGISTER', 'UNDO'}
+    
+    genTypes = [('ORBIT','Orbit','Full circle around the scaler'),('ARC','Arc','Partial arc around the scaler')]
+    
+    genType = bpy.props.EnumProperty(name='Type', items=genTypes)
+    count = bpy.props.IntProperty(name='Angles', default=8, min=1, max=1000, description='Number of angles to generate')
+    elevation = bpy.props.FloatProperty(name='Elevation', default=math.radians(20), min=math.radians(-89), max=math.radians(89), subtype='ANGLE')
+    arcStart = bpy.props.FloatProperty(name='Arc Start', default=math.radians(-45), subtype='ANGLE')
+    arcEnd = bpy.props.FloatProperty(name='Arc End', default=math.radians(45), subtype='ANGLE')
+    lens = bpy.props.FloatProperty(name='Focal Length', default=50, min=1, max=5000)
+    margin = bpy.props.FloatProperty(name='Margin', default=1.2, min=0.1, max=10, description='Framing margin around the scaler bounds')
+    replace = bpy.props.BoolProperty(name='Replace', default=False, description='Replace existing angles instead of appending')
+    
+    def invoke(self, context, event):
+        return context.window_manager.invoke_props_dialog(self)
+    
+    def execute(self, context):
+        scn = bpy.context.scene
+        ktScn = scn.kt_scene_props
+        
+        if ktScn.ssScaler not in scn.objects:
+            self.report({'INFO'}, 'Scaler is not an object')
+            return {'CANCELLED'}
+        
+        center, radius = snapshot_angles.boundsSphere(scalerBoundCorners(scn.objects[ktScn.ssScaler]))
+        
+        if self.genType == 'ORBIT':
+            arcStart, arcEnd = 0.0, 2 * math.pi
+        else:
+            arcStart, arcEnd = self.arcStart, self.arcEnd
+            
+        lib = snapshot_angles.orbitAngles(center, radius, self.count, lens=self.lens, elevation=self.elevation,
+                                          arcStart=arcStart, arcEnd=arcEnd, margin=self.margin, prefix=self.genType.title())
+        added = writeCamAngles(scn.ss_camAngles, lib, replace=self.replace)
+        self.report({'INFO'}, str(added) + ' camera angles generated')
+        
+        return {'FINISHED'}
+
+
+class OBJECT_OT_ssAngleExport(bpy.types.Operator):
+    bl_idname = "render.ss_angle_export"
+    bl_label = "Export Camera Angles"
+    bl_description = "Save the camera angles to a .json or .npz angle library"
+    
+    filepath = bpy.props.StringProperty(subtype="FILE_PATH")
+    
+    def invoke(self, context, event):
+        if not self.filepath:
+            self.filepath = "ss_angles.json"
+        context.window_manager.fileselect_add(self)
+        return {'RUNNING_MODAL'}
+    
+    def execute(self, context):
+        scn = bpy.context.scene
+        lib = readCamAngles(scn.ss_camAngles)
+        snapshot_angles.saveAngleLibrary(bpy.path.abspath(self.filepath), lib)
+        self.report({'INFO'}, str(len(lib['names'])) + ' camera angles exported')
+        
+        return {'FINISHED'}
+
+
+class OBJECT_OT_ssAngleImport(bpy.types.Operator):
+    bl_idname = "render.ss_angle_import"
+    bl_label = "Import Camera Angles"
+    bl_description = "Load camera angles from a .json or .npz angle library"
+    
+    filepath = bpy.props.StringProperty(subtype="FILE_PATH")
+    replace = bpy.props.BoolProperty(name='Replace', default=False, description='Replace existing angles instead of appending')
+    
+    def invoke(self, context, event):
+        context.window_manager.fileselect_add(self)
+        return {'RUNNING_MODAL'}
+    
+    def execute(self, context):
+        scn = bpy.context.scene
+        filepath = bpy.path.abspath(self.filepath)
+        
+        if not os.path.isfile(filepath):
+            self.report({'INFO'}, 'Angle library not found')
+            return {'CANCELLED'}
+        
+        lib = snapshot_angles.loadAngleLibrary(filepath)
+        added = writeCamAngles(scn.ss_camAngles, lib, replace=self.replace)
+        self.report({'INFO'}, str(added) + ' camera angles imported')
+        
+        return {'FINISHED'}
+
+
+class OBJECT_OT_ssAngleCopyScene(bpy.types.Operator):
+    bl_idname = "render.ss_angle_copy_scene"
+    bl_label = "Copy Camera Angles"
+    bl_description = "Copy camera angles from another scene (shot) into this one"
+    
+    replace = bpy.props.BoolProperty(name='Replace', default=False, description='Replace existing angles instead of appending')
+    
+    def execute(self, context):
+        scn = bpy.context.scene
+        ktScn = scn.kt_scene_props
+        
+        if ktScn.ssAngleSource not in bpy.data.scenes or ktScn.ssAngleSource == scn.name:
+            self.report({'INFO'}, 'Pick another scene to copy angles from')
+            return {'CANCELLED'}
+        
+        lib = readCamAngles(bpy.data.scenes[ktScn.ssAngleSource].ss_camAngles)
+        added = writeCamAngles(scn.ss_camAngles, lib, replace=self.replace)
+        self.report({'INFO'}, str(added) + ' camera angles copied from ' + ktScn.ssAngleSource)
+        
+        return {'FINISHED'}
+
     
 class OBJECT_OT_ssSetScaler(bpy.types.Operator):
     bl_idname = "render.ss_set_scaler"
@@ -289,6 +494,7 @@ def getBoundBoxDimensions(focusOb):
 def spinnerSetup(spinnerNames):
     scn = bpy.context.scene
     spinnerOb = []
+    spinnerMtx = {} #original transforms and parents so the spinners can be handed back after rendering
     
     for ob in scn.objects:
         if ob.name in spinnerNames:
@@ -300,6 +506,7 @@ def spinnerSetup(spinnerNames):
             ob.select = False #at this point only the original spinner ctrl is selected and active
                  
     for ob in spinnerOb:
+        spinnerMtx[ob.name] = (ob.matrix_world.copy(), ob.parent.name if ob.parent else None, ob.matrix_parent_inverse.copy())
         bpy.ops.object.duplicate(linked=False)
         actOb = scn.objects.active
         actOb.name = "ss_spinner_" + ob.name
@@ -311,21 +518,253 @@ def spinnerSetup(spinnerNames):
         bpy.ops.object.parent_set(type='OBJECT',keep_transform=True)
         
         ob.select = False    
+        
+    return spinnerMtx
+
+
+#SNAPSHOT TEMPLATE CACHE
+#the template scene is appended once and kept hidden (dot prefixed) between renders.
+#a baseline of everything a render touches is stored on the scene itself and restored
+#before and after each render, instead of deleting the scene and purging 'ss_' data
+
+SS_TEMPLATE = 'kt_ssSetup'
+SS_CACHE = '.kt_ssSetup'
+SS_RENDER = ['resolution_x', 'resolution_y', 'resolution_percentage', 'use_overwrite', 'filepath'] #render settings a render changes
+SS_IMAGE = ['file_format', 'color_mode', 'quality']
+SS_FFMPEG = ['format', 'codec', 'video_bitrate', 'minrate', 'maxrate', 'buffersize', 'use_lossless_output']
+
+def recordSnapshotBaseline(ssScn):
+    obs = {}
+    for ob in ssScn.objects:
+        rec = {'location': list(ob.location), 'rotation': list(ob.rotation_euler), 'scale': list(ob.scale), 'hide_render': int(ob.hide_render)}
+        if ob.type == 'FONT':
+            rec['body'] = ob.data.body
+        if ob.type == 'CAMERA':
+            rec['clip'] = [ob.data.clip_start, ob.data.clip_end]
+        if ob.animation_data and ob.animation_data.action:
+            keys = [] #co and both handles per key, flattened
+            for f in ob.animation_data.action.fcurves:
+                for k in f.keyframe_points:
+                    keys.extend(list(k.co) + list(k.handle_left) + list(k.handle_right))
+            if keys:
+                rec['keys'] = keys
+        obs[ob.name] = rec
+        
+    render = {}
+    for attr in SS_RENDER:
+        render[attr] = getattr(ssScn.render, attr)
+    for attr in SS_IMAGE:
+        render['image_' + attr] = getattr(ssScn.render.image_settings, attr)
+    for attr in SS_FFMPEG:
+        render['ffmpeg_' + attr] = getattr(ssScn.render.ffmpeg, attr)
+    for key, value in render.items():
+        if isinstance(value, bool):
+            render[key] = int(value)
+        
+    ssScn['kt_ssBaseline'] = {'objects': obs, 'render': render, 'angles': len(ssScn.ss_camAngles)}
+
+def resetSnapshotScene(ssScn):
+    base = ssScn['kt_ssBaseline']
+    baseObs = base['objects']
+    
+    for ob in list(ssScn.objects):
+        if ob.name not in baseObs: #linked user objects and spinner duplicates from the last render
+            action = ob.animation_data.action if ob.animation_data else None
+            ssScn.objects.unlink(ob)
+            if ob.users == 0:
+                bpy.data.objects.remove(ob)
+                if action and action.users == 0:
+                    bpy.data.actions.remove(action)
+            continue
+        
+        rec = baseObs[ob.name]
+        ob.location = rec['location']
+        ob.rotation_euler = rec['rotation']
+        ob.scale = rec['scale']
+        ob.hide_render = bool(rec['hide_render'])
+        if 'body' in rec:
+            ob.data.body = rec['body']
+        if 'clip' in rec:
+            ob.data.clip_start, ob.data.clip_end = rec['clip']
+        if 'keys' in rec:
+            keys = [k for f in ob.animation_data.action.fcurves for k in f.keyframe_points]
+            values = rec['keys']
+            for i, k in enumerate(keys):
+                v = values[i*6:i*6 + 6]
+                if len(v) < 6:
+                    break
+                k.co = v[0:2]
+                k.handle_left = v[2:4]
+                k.handle_right = v[4:6]
+                
+    render = base['render']
+    for attr in SS_RENDER:
+        setattr(ssScn.render, attr, type(getattr(ssScn.render, attr))(render[attr]))
+    for attr in SS_IMAGE:
+        setattr(ssScn.render.image_settings, attr, type(getattr(ssScn.render.image_settings, attr))(render['image_' + attr]))
+    for attr in SS_FFMPEG:
+        setattr(ssScn.render.ffmpeg, attr, type(getattr(ssScn.render.ffmpeg, attr))(render['ffmpeg_' + attr]))
+                
+    while len(ssScn.ss_camAngles) > base['angles']:
+        ssScn.ss_camAngles.remove(len(ssScn.ss_camAngles) - 1)
+
+def releaseSnapshotScene(ssScn, spinnerMtx):
+    #hand the spinners back to their original parents where they were, then drop everything the render added
+    for name, (mtx, parentName, parentInv) in spinnerMtx.items():
+        ob = bpy.data.objects.get(name)
+        if ob:
+            ob.parent = bpy.data.objects.get(parentName) if parentName else None
+            ob.matrix_parent_inverse = parentInv
+            ob.matrix_world = mtx
+    resetSnapshotScene(ssScn)
+
+    
+def renderTurnFrames(scn, ktScn, seqBase, movPath, openGL=False):
+    #render a turntable as a resumable frame sequence, then mux it into movPath
+    ext = snapshot_turntable.FRAME_EXT[ktScn.ssTurnFormat]
+    start, end = scn.frame_start, scn.frame_end
+    
+    frames, duplicates = snapshot_turntable.symmetryFrames(start, end, ktScn.ssTurnSymmetry)
+    todo = snapshot_turntable.missingFrames(seqBase, frames, ext)
+    chunks = snapshot_turntable.chunkFrames(todo, ktScn.ssTurnChunk)
+    
+    scn.render.image_settings.file_format = ktScn.ssTurnFormat
+    scn.render.use_overwrite = False
+    scn.render.filepath = seqBase
+    
+    if chunks and (openGL or ktScn.ssTurnWorkers <= 1):
+        #in-process, one chunk at a time so finished chunks survive a crash
+        for chunkStart, chunkEnd in chunks:
+            scn.frame_start = chunkStart
+            scn.frame_end = chunkEnd
+            if openGL:
+                bpy.ops.render.opengl(animation=True)
+            else:
+                bpy.ops.render.render(animation=True)
+        scn.frame_start, scn.frame_end = start, end
+        
+    elif chunks:
+        #background blender workers render chunks from a copy of the snapshot file
+        blendPath = os.path.join(tempfile.gettempdir(), 'kt_ssSetup_turn.blend')
+        bpy.ops.wm.save_as_mainfile(filepath=blendPath, copy=True, check_existing=False)
+        commands = [snapshot_turntable.workerCommand(bpy.app.binary_path, blendPath, scn.name, seqBase, ktScn.ssTurnFormat, c) for c in chunks]
+        failed = snapshot_turntable.runWorkers(commands, ktScn.ssTurnWorkers)
+        os.remove(blendPath)
+        if failed:
+            return False, str(len(failed)) + ' turntable chunks failed, render again to resume'
+    
+    snapshot_turntable.fillDuplicates(seqBase, duplicates, ext)
+    
+    if not snapshot_turntable.encodeSequence(ktScn.ssEncoder, bpy.app.binary_path, seqBase, start, end, ext, scn.render.fps, movPath):
+        return False, 'Turntable frames kept but encoding failed: ' + seqBase
+    return True, movPath
+    
+
+#RENDER BUDGET
+
+def calibrateBudget(scn, ktScn):
+    #short low resolution renders at two sample counts to fit a time per sample model
+    origSamples = scn.cycles.samples
+    origPct = scn.render.resolution_percentage
+    calPct = min(origPct, snapshot_budget.CALIBRATION_PERCENT)
+    scn.render.resolution_percentage = calPct
+    
+    times = []
+    for samples in snapshot_budget.CALIBRATION_SAMPLES:
+        scn.cycles.samples = samples
+        start = time.time()
+        bpy.ops.render.render(animation=False, write_still=False)
+        times.append(time.time() - start)
+        
+    scn.cycles.samples = origSamples
+    scn.render.resolution_percentage = origPct
+    
+    pixelRatio = (float(origPct) / calPct) ** 2
+    budget = snapshot_budget.SampleBudget(snapshot_budget.CALIBRATION_SAMPLES, times, pixelRatio, ktScn.ssBudgetSeconds,
+                                          ktScn.ssBudgetMinSamples, ktScn.ssBudgetMaxSamples)
+    print ('snapshot budget: %.3fs overhead, %.5fs per sample' % (budget.overhead, budget.perSample))
+    return budget
+    
+
+#CONTACT SHEETS
+
+def loadStill(path):
+    if not os.path.isfile(path):
+        return None
+    img = bpy.data.images.load(path)
+    w, h = img.size
+    pixels = np.array(img.pixels[:], dtype=np.float32).reshape(h, w, 4)[::-1] #blender stores rows bottom up
+    bpy.data.images.remove(img)
+    return pixels
+
+def saveJpeg(path, pixels):
+    h, w = pixels.shape[:2]
+    img = bpy.data.images.new("ss_sheet_tmp", w, h, alpha=True)
+    img.pixels = np.ascontiguousarray(pixels[::-1], dtype=np.float32).ravel().tolist()
+    img.filepath_raw = path
+    img.file_format = 'JPEG'
+    img.save()
+    bpy.data.images.remove(img)
+
+def makeContactSheets(groups, outDir, ktScn):
+    #one sheet per (asset, version, deviation) group of [(angle, path), ...] stills
+    sheets = []
+    for (asset, version, deviation), stills in sorted(groups.items()):
+        title = asset + "_" + version + "_" + deviation
+        sheetPath = os.path.join(outDir, title + "_sheet.jpg")
+        thumbDir = os.path.join(outDir, "thumbs") if ktScn.ssThumbSize > 0 else None
+        sheetPath, thumbs = snapshot_sheets.buildContactSheet(stills, loadStill, saveJpeg, sheetPath, thumbDir, title,
+                                                              columns=ktScn.ssSheetColumns,
+                                                              cellSize=(ktScn.ssSheetCell, ktScn.ssSheetCell),
+                                                              thumbSize=ktScn.ssThumbSize)
+        if sheetPath:
+            sheets.append(sheetPath)
+    return sheets
 
+
+class OBJECT_OT_ssContactSheet(bpy.types.Operator):
+    bl_idname = "render.ss_contact_sheet"
+    bl_label = "Build Contact Sheets"
+    bl_description = "Build contact sheets and thumbnails from the snapshot stills in the render output folder"
     
+    def execute(self, context):
+        scn = bpy.context.scene
+        ktScn = scn.kt_scene_props
+        outDir = os.path.dirname(bpy.path.abspath(scn.render.filepath))
+        
+        if not os.path.isdir(outDir):
+            self.report({'INFO'}, 'Render output folder does not exist')
+            return {'CANCELLED'}
+        
+        paths = [os.path.join(outDir, f) for f in os.listdir(outDir)]
+        groups = snapshot_sheets.stillGroups([p for p in paths if not p.endswith('_sheet.jpg')])
+        sheets = makeContactSheets(groups, outDir, ktScn)
+        self.report({'INFO'}, str(len(sheets)) + ' contact sheets written to ' + outDir)
+        
+        return {'FINISHED'}
+    
+
 class OBJECT_OT_ssAngleDoRender(bpy.types.Operator):
     bl_idname = "render.ss_do_render"
     bl_label = "Render Snapshot"
     bl_description = "Render enabled Snapshot camera angles"
            
     def append(self):
+        if SS_CACHE in bpy.data.scenes and 'kt_ssBaseline' in bpy.data.scenes[SS_CACHE]:
+            return bpy.data.scenes[SS_CACHE] #already loaded this session (or saved with the file)
+        
         blend = 'ss_scene_A.blend'
         path = bpy.utils.script_paths('addons/katietools/snapshot')
         pathStr = ''.join(path) #convert list object to string
         filepath = str(pathStr + '/' + blend)
         
         with bpy.data.libraries.load(filepath) as (data_from, data_to):
-            data_to.scenes = ["kt_ssSetup"]              
+            data_to.scenes = [SS_TEMPLATE]
+            
+        ssScn = data_to.scenes[0]
+        ssScn.name = SS_CACHE
+        recordSnapshotBaseline(ssScn)
+        return ssScn
     
     def execute(self, context):
         scn = bpy.context.scene
@@ -369,12 +808,12 @@ class OBJECT_OT_ssAngleDoRender(bpy.types.Operator):
                             selObToLink = []
                             origScnName = scn.name
                             origScn = bpy.data.scenes[origScnName]
-                            scnSS = 'kt_ssSetup'
                             
                             ssDim = getBoundBoxDimensions(scalerOb)
                             #self.report({'INFO'}, str(ssDim))
                             
-                            self.append() #APPEND THE SNAPSHOT SCENE ------------------------------------
+                            ssScn = self.append() #APPEND (OR REUSE) THE SNAPSHOT SCENE ------------------------------------
+                            resetSnapshotScene(ssScn)
                             
                             bpy.ops.object.select_all(action='DESELECT')
                                     
@@ -383,23 +822,14 @@ class OBJECT_OT_ssAngleDoRender(bpy.types.Operator):
                                 scn.objects.active = scn.objects[s]
                                 bpy.ops.object.select_grouped(extend=True,type="CHILDREN_RECURSIVE")
                             
-                            bpy.ops.object.make_links_scene(scene=scnSS)#link selection to ss scene
+                            bpy.ops.object.make_links_scene(scene=ssScn.name)#link selection to ss scene
                             
-                            bpy.context.screen.scene = bpy.data.scenes[scnSS] #change 'active' scene to Snapshot Scene
+                            bpy.context.screen.scene = ssScn #change 'active' scene to Snapshot Scene
                             
                             scn = bpy.context.scene # REDEFINE 'SCN'
                             ground = scn.objects["ss_groundPlane"]
                             
-                            origCamAngles = origScn.ss_camAngles
-                            
-                            for i, cam in enumerate(origScn.ss_camAngles): #recreate camera angles from original scene
-                                angle = scn.ss_camAngles.add()
-                                angNo = len(scn.ss_camAngles)
-                                angle.name = origCamAngles[i].name
-                                angle.angleName = origCamAngles[i].angleName
-                                angle.camLoc = origCamAngles[i].camLoc
-                                angle.camRot = origCamAngles[i].camRot
-                                angle.camFL = origCamAngles[i].camFL 
+                            camLib = readCamAngles(origScn.ss_camAngles) #read every angle once, no per-angle parsing
                               
                             for ob in scn.objects:
                                 if 'ss_scaler' in ob.name: #get scaler object from appended scene
@@ -454,7 +884,7 @@ class OBJECT_OT_ssAngleDoRender(bpy.types.Operator):
                                 zTrans = (-6.55 * txtGrpScale)                  
                                 bpy.ops.transform.translate(value=(0,0,zTrans)) #position text overlay objects for square ratio 
                             
-                            spinnerSetup(spinnerNames)
+                            spinnerMtx = spinnerSetup(spinnerNames)
                             
                             origFR = origScn.kt_scene_props.ssAnimRange      
                             for ob in scn.objects:
@@ -475,32 +905,64 @@ class OBJECT_OT_ssAngleDoRender(bpy.types.Operator):
                                 ground.hide_render = True          
                                 
                             renders = []
+                            stills = []
+                            
+                            #--------------------SAMPLE BUDGET FROM A QUICK CALIBRATION-----------------------------
+                            budget = None
+                            origSamples = scn.cycles.samples if scn.render.engine == "CYCLES" else None
+                            if ktScn.ssBudget and ktScn.ssRenType == "Engine" and origSamples is not None and len(camLib['names']) > 0:
+                                applyCamAngle(ssCam, camLib, 0)
+                                budget = calibrateBudget(scn, ktScn)
                             
                             #--------------------LOOP THOUGH AND RENDER EACH CAM ANGLE-----------------------------
-                            for i, cam in enumerate(scn.ss_camAngles):  #loop through current scene's camAngles
-                                cam.toggle_still = origScn.ss_camAngles[i-1].toggle_still
-                                cam.toggle_turn = origScn.ss_camAngles[i-1].toggle_turn
+                            for i, angleName in enumerate(camLib['names']):
                                 scn.objects['ss_text_A'].data.body = ktScn.ssAssetName + "_" + ktScn.ssAssetVersion + "_" + "%03d"%ktScn.ssDeviation
-                                scn.objects['ss_text_B'].data.body = scn.ss_camAngles[i-1].angleName
+                                scn.objects['ss_text_B'].data.body = angleName
                                 scn.objects['ss_text_C'].data.body = 'Kent Trammell'
-                                bpy.ops.render.ss_angle_preview(angleN=i-1)
+                                applyCamAngle(ssCam, camLib, i)
+                                useOpenGL = ktScn.ssRenType == "OpenGL"
                                 
-                                if cam.toggle_still == True:
+                                if budget:
+                                    samples, predicted, fits = budget.pick()
+                                    if not fits and ktScn.ssBudgetFallback and bpy.context.screen != None:
+                                        useOpenGL = True #even the minimum samples blow the budget
+                                        samples = 'OPENGL'
+                                    else:
+                                        scn.cycles.samples = samples
+                                
+                                if camLib['still'][i]:
                                     scn.frame_current = 1        
                                     scn.render.image_settings.file_format = origFF  
                                     scn.render.image_settings.color_mode = origCM
                                     scn.render.image_settings.quality = origQ
-                                    fileName = ktScn.ssAssetName + "_" + ktScn.ssAssetVersion + "_" + "%03d"%ktScn.ssDeviation + "_" + scn.ss_camAngles[i-1].angleName + scn.render.file_extension
+                                    fileName = ktScn.ssAssetName + "_" + ktScn.ssAssetVersion + "_" + "%03d"%ktScn.ssDeviation + "_" + angleName + scn.render.file_extension
                                     filePath = origScn.render.filepath + fileName
                                     scn.render.filepath = filePath
                                     
-                                    if ktScn.ssRenType == "OpenGL":
+                                    start = time.time()
+                                    if useOpenGL:
                                         bpy.ops.render.opengl(animation=False, write_still=True)
                                     else:    
                                         bpy.ops.render.render(animation=False, write_still=True)
+                                    if budget:
+                                        budget.record(angleName, samples, predicted, time.time() - start)
                                     renders.append(filePath)
+                                    stills.append((angleName, bpy.path.abspath(filePath)))
                                                                     
-                                if cam.toggle_turn == True:
+                                if camLib['turn'][i] and ktScn.ssTurnMode == 'FRAMES':
+                                    fileName = ktScn.ssAssetName + "_" + ktScn.ssAssetVersion + "_" + "%03d"%ktScn.ssDeviation + "_" + angleName
+                                    filePath = bpy.path.abspath(origScn.render.filepath + fileName + ".mov")
+                                    seqBase = os.path.join(bpy.path.abspath(origScn.render.filepath), fileName + "_frames", fileName + "_")
+                                    if not os.path.isdir(os.path.dirname(seqBase)):
+                                        os.makedirs(os.path.dirname(seqBase))
+                                    
+                                    turnDone, turnMsg = renderTurnFrames(scn, ktScn, seqBase, filePath, openGL=useOpenGL)
+                                    if turnDone:
+                                        renders.append(filePath)
+                                    else:
+                                        self.report({'WARNING'}, turnMsg)
+                                        
+                                elif camLib['turn'][i]:
                                     scn.render.image_settings.file_format = "FFMPEG"
                                     scn.render.ffmpeg.format = 'QUICKTIME'
                                     scn.render.ffmpeg.codec = 'H264'
@@ -509,19 +971,30 @@ class OBJECT_OT_ssAngleDoRender(bpy.types.Operator):
                                     scn.render.ffmpeg.maxrate = 12000
                                     scn.render.ffmpeg.buffersize = 2500
                                     scn.render.ffmpeg.use_lossless_output = True
-                                    fileName = ktScn.ssAssetName + "_" + ktScn.ssAssetVersion + "_" + "%03d"%ktScn.ssDeviation + "_" + scn.ss_camAngles[i-1].angleName + ".mov"
+                                    fileName = ktScn.ssAssetName + "_" + ktScn.ssAssetVersion + "_" + "%03d"%ktScn.ssDeviation + "_" + angleName + ".mov"
                                     filePath = origScn.render.filepath + fileName
                                     scn.render.filepath = filePath
                                     
-                                    if ktScn.ssRenType == "OpenGL":
+                                    if useOpenGL:
                                         bpy.ops.render.opengl(animation=True)
                                     else:    
                                         bpy.ops.render.render(animation=True)
                                     renders.append(filePath)                   
                                        
-                            bpy.ops.scene.delete()    
+                            if origSamples is not None:
+                                scn.cycles.samples = origSamples
+                            if budget and budget.rows: #predicted vs actual seconds per angle, for tuning
+                                budgetLog = bpy.path.abspath(origScn.render.filepath + ktScn.ssAssetName + "_" + ktScn.ssAssetVersion + "_" + "%03d"%ktScn.ssDeviation + "_budget.csv")
+                                budget.writeLog(budgetLog)
+                                for row in budget.rows:
+                                    print ('snapshot budget: %s samples=%s predicted=%ss actual=%ss' % row)
+                                       
+                            releaseSnapshotScene(ssScn, spinnerMtx) #keep the snapshot scene cached for the next render
                             bpy.context.screen.scene = origScn #change 'active' scene to original
-                            bpy.ops.data.clean_data(key='ss_') #clean remaining data from snapshot scene
+                            
+                            if ktScn.ssContactSheet and stills: #post-render review sheet for this version/deviation
+                                groupKey = (ktScn.ssAssetName, ktScn.ssAssetVersion, "%03d"%ktScn.ssDeviation)
+                                makeContactSheets({groupKey: stills}, os.path.dirname(stills[0][1]), ktScn)
                             
                             if len(renders) > 0:
                                 origScn.kt_scene_props.ssDeviation = origScn.kt_scene_props.ssDeviation + 1    
@@ -764,4 +1237,4 @@ class OBJECT_OT_rvSelSha(bpy.types.Operator):
         if bpy.context.selected_objects:              
             scnOb.active = bpy.context.selected_objects[0]
         self.report({'INFO'}, str(len(bpy.context.selected_objects)) + " objects selected")
-        return {'FINISHED'}     
\ No newline at end of file
+        return {'FINISHED'}     
\ No newline at end of file
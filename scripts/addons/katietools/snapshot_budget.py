@@ -0,0 +1,60 @@
+import csv
+
+import numpy as np
+
+#-------------------------------------------------------
+#-------------- SNAPSHOT RENDER BUDGET -----------------
+#-------------------------------------------------------
+
+#time per frame is modelled as overhead + perSample * samples. two short
+#calibration renders at low resolution fit the model, which is then scaled
+#up by the pixel ratio to the full frame and corrected as real renders finish
+
+CALIBRATION_SAMPLES = (4, 16)
+CALIBRATION_PERCENT = 25
+
+
+def fitSampleModel(samples, times):
+    #least squares line through (samples, seconds), never negative
+    samples = np.asarray(samples, dtype=np.float64)
+    times = np.asarray(times, dtype=np.float64)
+    if len(samples) < 2 or np.ptp(samples) == 0:
+        return 0.0, max(float(times.mean()) / max(float(samples.mean()), 1.0), 1e-6)
+    perSample, overhead = np.polyfit(samples, times, 1)
+    return max(float(overhead), 0.0), max(float(perSample), 1e-6)
+
+
+class SampleBudget(object):
+
+    def __init__(self, samples, times, pixelRatio, target, minSamples=1, maxSamples=4096):
+        overhead, perSample = fitSampleModel(samples, times)
+        self.overhead = overhead
+        self.perSample = perSample * pixelRatio
+        self.target = float(target)
+        self.minSamples = int(minSamples)
+        self.maxSamples = int(maxSamples)
+        self.correction = 1.0 #running actual/predicted ratio
+        self.rows = []
+
+    def predict(self, samples):
+        return (self.overhead + self.perSample * samples) * self.correction
+
+    def pick(self):
+        #(samples, predicted seconds, fits target) for the next frame
+        budget = self.target / self.correction - self.overhead
+        samples = int(np.clip(np.floor(budget / self.perSample), self.minSamples, self.maxSamples))
+        predicted = self.predict(samples)
+        return samples, predicted, predicted <= self.target
+
+    def record(self, name, samples, predicted, actual):
+        self.rows.append((name, samples, round(predicted, 3), round(actual, 3)))
+        if predicted > 0 and actual > 0 and samples != 'OPENGL':
+            #smooth so a single slow angle doesn't swing the next pick too far
+            self.correction *= (actual / predicted) ** 0.5
+
+    def writeLog(self, path):
+        with open(path, 'w', newline='') as file:
+            writer = csv.writer(file)
+            writer.writerow(('angle', 'samples', 'predicted_s', 'actual_s'))
+            writer.writerows(self.rows)
+        return path
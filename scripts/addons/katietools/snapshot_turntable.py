@@ -0,0 +1,173 @@
+import os
+import shutil
+import subprocess
+import tempfile
+import time
+
+#-------------------------------------------------------
+#-------------- SNAPSHOT TURNTABLE FRAMES --------------
+#-------------------------------------------------------
+
+#turntables render to a numbered frame sequence first and are muxed into a
+#movie once every frame is on disk, so a crash only costs the frames in flight.
+#no bpy in here, the same helpers drive in-process and background renders
+
+FRAME_EXT = {'PNG': '.png', 'OPEN_EXR': '.exr'}
+
+
+def framePath(basePath, frame, ext):
+    #matches blender's own #### padding for animation output
+    return "%s%04d%s" % (basePath, frame, ext)
+
+
+def missingFrames(basePath, frames, ext):
+    #frames without a finished (non-empty) file on disk
+    missing = []
+    for f in frames:
+        path = framePath(basePath, f, ext)
+        if not os.path.isfile(path) or os.path.getsize(path) == 0:
+            missing.append(f)
+    return missing
+
+
+def chunkFrames(frames, chunkSize):
+    #split a sorted frame list into contiguous runs of at most chunkSize frames
+    chunks = []
+    chunkSize = max(int(chunkSize), 1)
+    for f in sorted(frames):
+        if chunks and f == chunks[-1][1] + 1 and (f - chunks[-1][0]) < chunkSize:
+            chunks[-1][1] = f
+        else:
+            chunks.append([f, f])
+    return [tuple(c) for c in chunks]
+
+
+def symmetryFrames(start, end, folds):
+    #a spinner doing one revolution over start..end whose silhouette repeats folds
+    #times only needs its first 1/folds of frames rendered. returns the frames to
+    #render and a {duplicate: source} map, or every frame if the range doesn't divide
+    frames = list(range(start, end + 1))
+    count = len(frames)
+    if folds <= 1 or count % folds != 0:
+        return frames, {}
+
+    period = count // folds
+    unique = frames[:period]
+    duplicates = {}
+    for f in frames[period:]:
+        duplicates[f] = start + (f - start) % period
+    return unique, duplicates
+
+
+def fillDuplicates(basePath, duplicates, ext):
+    #hard link (or copy) rendered source frames into the symmetric duplicate slots
+    filled = 0
+    for dup, src in sorted(duplicates.items()):
+        dupPath = framePath(basePath, dup, ext)
+        srcPath = framePath(basePath, src, ext)
+        if os.path.isfile(dupPath) or not os.path.isfile(srcPath):
+            continue
+        try:
+            os.link(srcPath, dupPath)
+        except (OSError, AttributeError):
+            shutil.copyfile(srcPath, dupPath)
+        filled += 1
+    return filled
+
+
+#-------------- OUT OF PROCESS WORKERS ------------------
+
+def workerCommand(blenderPath, blendPath, sceneName, basePath, fileFormat, chunk):
+    start, end = chunk
+    return [blenderPath, '-b', blendPath,
+            '-S', sceneName,
+            '-o', basePath + '####',
+            '-F', 'EXR' if fileFormat == 'OPEN_EXR' else fileFormat,
+            '-x', '1',
+            '-s', str(start), '-e', str(end), '-a']
+
+
+def runWorkers(commands, workers, poll=0.25):
+    #run commands with at most workers processes alive at once, returns failed commands
+    pending = list(commands)
+    running = []
+    failed = []
+    workers = max(int(workers), 1)
+
+    while pending or running:
+        while pending and len(running) < workers:
+            cmd = pending.pop(0)
+            running.append((cmd, subprocess.Popen(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.STDOUT)))
+
+        for item in running[:]:
+            cmd, proc = item
+            if proc.poll() is not None:
+                running.remove(item)
+                if proc.returncode != 0:
+                    failed.append(cmd)
+        if running:
+            time.sleep(poll)
+
+    return failed
+
+
+#-------------- ENCODING --------------------------------
+
+STANDIN_SCRIPT = '''import bpy, sys
+args = sys.argv[sys.argv.index("--") + 1:]
+folder, files, outPath, fps = args[0], args[1].split("|"), args[2], int(args[3])
+scn = bpy.context.scene
+scn.sequence_editor_create()
+strip = scn.sequence_editor.sequences.new_image("frames", folder + files[0], 1, 1)
+for f in files[1:]:
+    strip.elements.append(f)
+scn.frame_start = 1
+scn.frame_end = len(files)
+scn.render.fps = fps
+scn.render.resolution_percentage = 100
+scn.render.resolution_x = strip.elements[0].orig_width or scn.render.resolution_x
+scn.render.resolution_y = strip.elements[0].orig_height or scn.render.resolution_y
+scn.render.image_settings.file_format = "FFMPEG"
+scn.render.ffmpeg.format = "QUICKTIME"
+scn.render.ffmpeg.codec = "H264"
+scn.render.ffmpeg.video_bitrate = 9000
+scn.render.ffmpeg.minrate = 9000
+scn.render.ffmpeg.maxrate = 12000
+scn.render.ffmpeg.buffersize = 2500
+scn.render.filepath = outPath
+bpy.ops.render.render(animation=True)
+'''
+
+
+def encodeCommand(encoder, blenderPath, basePath, start, end, ext, fps, outPath):
+    #prefer an external ffmpeg, fall back to a background blender muxing through the sequencer
+    #returns the command and the stand-in script it runs (None for ffmpeg), the caller removes the script
+    ffmpeg = shutil.which(encoder) if encoder else None
+    if ffmpeg:
+        return [ffmpeg, '-y', '-loglevel', 'error',
+                '-framerate', str(fps),
+                '-start_number', str(start),
+                '-i', basePath + '%04d' + ext,
+                '-frames:v', str(end - start + 1),
+                '-c:v', 'libx264', '-pix_fmt', 'yuv420p', '-b:v', '9000k',
+                outPath], None
+
+    #a script per call, concurrent encodes must not share one
+    handle, script = tempfile.mkstemp(prefix='kt_ss_encode_', suffix='.py')
+    with os.fdopen(handle, 'w') as file:
+        file.write(STANDIN_SCRIPT)
+    folder, stem = os.path.split(basePath)
+    files = [os.path.basename(framePath(stem, f, ext)) for f in range(start, end + 1)]
+    return [blenderPath, '-b', '--factory-startup', '-P', script, '--',
+            folder + os.sep, '|'.join(files), outPath, str(fps)], script
+
+
+def encodeSequence(encoder, blenderPath, basePath, start, end, ext, fps, outPath):
+    if missingFrames(basePath, range(start, end + 1), ext):
+        return False
+    cmd, script = encodeCommand(encoder, blenderPath, basePath, start, end, ext, fps, outPath)
+    try:
+        return subprocess.call(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.STDOUT) == 0
+    finally:
+        if script:
+            os.remove(script)
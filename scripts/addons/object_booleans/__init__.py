@@ -0,0 +1,479 @@
+bl_info = {
+    "name": "Boolean Operators",
+    "location": "View3D > Toolbar",
+    "description": "Add Boolean Tools for running boolean operations on the selected objects.",
+    "author": "Jonathan Williamson",
+    "version": (0,4),
+    "blender": (2, 6, 6),
+    "wiki_url": "http://wiki.blender.org/index.php/Extensions:2.6/Py/Scripts/3D_interaction/booleanoperators",
+    "tracker_url": "http://projects.blender.org/tracker/index.php?func=detail&aid=34502&group_id=153&atid=467",
+    "category": "3D View",
+    }
+
+# reload the engine along with the addon
+if "bpy" in locals():
+    import imp
+    imp.reload(bsp_boolean)
+else:
+    from . import bsp_boolean
+
+import bpy
+import zlib
+from collections import OrderedDict
+import numpy as np
+
+
+###------ Boolean Helpers -------###
+
+def worldBounds(ob):
+    """World space (min, max) corners of an object's evaluated bounding box"""
+    corners = np.array([tuple(corner) for corner in ob.bound_box])
+    matrix = np.array(ob.matrix_world)
+    corners = corners @ matrix[:3, :3].T + matrix[:3, 3]
+    return corners.min(axis=0), corners.max(axis=0)
+
+
+def overlaps(a, b):
+    """True when two (min, max) boxes touch"""
+    return bool(np.all(a[0] <= b[1]) and np.all(b[0] <= a[1]))
+
+
+def tempObject(scene, name, mesh, matrix=None):
+    ob = bpy.data.objects.new(name, mesh)
+    if matrix is not None:
+        ob.matrix_world = matrix
+    scene.objects.link(ob)
+    return ob
+
+
+def removeObject(scene, ob, removeMesh=False):
+    mesh = ob.data
+    scene.objects.unlink(ob)
+    bpy.data.objects.remove(ob)
+    if removeMesh and mesh.users == 0:
+        bpy.data.meshes.remove(mesh)
+
+
+def booleanPair(scene, a, b, operation, temps):
+    """Evaluates a boolean between two objects into a new temporary object"""
+    mod = a.modifiers.new("Bool", 'BOOLEAN')
+    mod.operation = operation
+    mod.object = b
+    mesh = a.to_mesh(scene, True, 'PREVIEW')
+    a.modifiers.remove(mod)
+    result = tempObject(scene, "BoolTemp", mesh, a.matrix_world)
+    temps.add(result)
+    return result
+
+
+def reduceTree(scene, objects, operation, temps):
+    """
+    Combines the objects pairwise, level by level, instead of folding them
+    into one ever growing mesh.  Intermediate objects are released as soon
+    as the next level is built.
+    """
+    level = list(objects)
+    while len(level) > 1:
+        nextLevel = []
+        for i in range(0, len(level) - 1, 2):
+            nextLevel.append(booleanPair(scene, level[i], level[i + 1], operation, temps))
+        if len(level) % 2:
+            nextLevel.append(level[-1])
+        for ob in level:
+            if ob in temps and ob not in nextLevel:
+                temps.discard(ob)
+                removeObject(scene, ob, True)
+        level = nextLevel
+    return level[0]
+
+
+def joinObjects(scene, objects, temps):
+    """Concatenates the evaluated meshes in world space, for parts that can't touch"""
+    if len(objects) == 1:
+        return objects[0]
+    verts = []
+    loopVerts = []
+    loopTotal = []
+    offset = 0
+    for ob in objects:
+        mesh = ob.to_mesh(scene, True, 'PREVIEW')
+        co = np.empty(len(mesh.vertices) * 3)
+        mesh.vertices.foreach_get('co', co)
+        matrix = np.array(ob.matrix_world)
+        verts.append(co.reshape(-1, 3) @ matrix[:3, :3].T + matrix[:3, 3])
+        corners = np.empty(len(mesh.loops), dtype=np.int32)
+        mesh.loops.foreach_get('vertex_index', corners)
+        loopVerts.append(corners + offset)
+        totals = np.empty(len(mesh.polygons), dtype=np.int32)
+        mesh.polygons.foreach_get('loop_total', totals)
+        loopTotal.append(totals)
+        offset += len(mesh.vertices)
+        bpy.data.meshes.remove(mesh)
+    loopTotal = np.concatenate(loopTotal)
+
+    mesh = bpy.data.meshes.new("BoolJoin")
+    mesh.vertices.add(offset)
+    mesh.vertices.foreach_set('co', np.concatenate(verts).ravel())
+    mesh.loops.add(len(np.concatenate(loopVerts)))
+    mesh.loops.foreach_set('vertex_index', np.concatenate(loopVerts))
+    mesh.polygons.add(len(loopTotal))
+    mesh.polygons.foreach_set('loop_start', (np.cumsum(loopTotal) - loopTotal).astype(np.int32))
+    mesh.polygons.foreach_set('loop_total', loopTotal)
+    mesh.update(calc_edges=True)
+    result = tempObject(scene, "BoolJoin", mesh)
+    temps.add(result)
+    return result
+
+
+def unionOperands(scene, objects, temps):
+    """
+    Union of any number of objects.  Each group of overlapping objects is
+    reduced as a balanced tree, groups that can't touch are just joined.
+    """
+    bounds = [worldBounds(ob) for ob in objects]
+    groups = [reduceTree(scene, [objects[i] for i in group], 'UNION', temps)
+              for group in bsp_boolean.overlapGroups(bounds)]
+    return joinObjects(scene, groups, temps)
+
+
+def objectSoup(scene, ob, evaluated=True):
+    """World space triangle soup of an object for the BSP engine, empty for objects without a mesh"""
+    mesh = ob.to_mesh(scene, True, 'PREVIEW') if evaluated else ob.data
+    if mesh is None:
+        return np.empty((0, 3, 3))
+    co = np.empty(len(mesh.vertices) * 3)
+    mesh.vertices.foreach_get('co', co)
+    loopVerts = np.empty(len(mesh.loops), dtype=np.int32)
+    mesh.loops.foreach_get('vertex_index', loopVerts)
+    loopTotal = np.empty(len(mesh.polygons), dtype=np.int32)
+    mesh.polygons.foreach_get('loop_total', loopTotal)
+    if evaluated:
+        bpy.data.meshes.remove(mesh)
+    matrix = np.array(ob.matrix_world)
+    verts = co.reshape(-1, 3) @ matrix[:3, :3].T + matrix[:3, 3]
+    return bsp_boolean.toSoup(verts, bsp_boolean.triangulate(np.cumsum(loopTotal) - loopTotal, loopTotal, loopVerts))
+
+
+def bspBoolean(scene, activeObj, operands, operation):
+    """
+    Runs the boolean through the BSP engine and swaps the result in as the
+    active object's mesh.  Like the modifier, the active object's own mesh
+    data is used and the operands as they evaluate.  Operands without
+    triangles (empties, cameras, flat curves) are left out.
+    """
+    soups = [soup for soup in (objectSoup(scene, ob) for ob in operands) if len(soup)]
+    verts, tris = bsp_boolean.combine(objectSoup(scene, activeObj, False), soups, operation)
+    inverse = np.linalg.inv(np.array(activeObj.matrix_world))
+    buffers = {'co': (verts @ inverse[:3, :3].T + inverse[:3, 3]).astype(np.float32).ravel(),
+               'loopVerts': tris.ravel(),
+               'loopTotal': np.full(len(tris), 3, dtype=np.int32),
+               'materialIndex': np.zeros(len(tris), dtype=np.int32),
+               'smooth': np.zeros(len(tris), dtype=bool),
+               'uvs': [],
+               'materials': [material.name if material else None for material in activeObj.data.materials]}
+    replaceMesh(activeObj, buffers)
+
+
+###------ Boolean Result Cache -------###
+
+def meshBuffers(mesh):
+    """Plain array copy of a mesh: geometry, face settings, uvs and material names"""
+    co = np.empty(len(mesh.vertices) * 3, dtype=np.float32)
+    mesh.vertices.foreach_get('co', co)
+    loopVerts = np.empty(len(mesh.loops), dtype=np.int32)
+    mesh.loops.foreach_get('vertex_index', loopVerts)
+    loopTotal = np.empty(len(mesh.polygons), dtype=np.int32)
+    mesh.polygons.foreach_get('loop_total', loopTotal)
+    materialIndex = np.empty(len(mesh.polygons), dtype=np.int32)
+    mesh.polygons.foreach_get('material_index', materialIndex)
+    smooth = np.empty(len(mesh.polygons), dtype=bool)
+    mesh.polygons.foreach_get('use_smooth', smooth)
+    uvs = []
+    for layer in mesh.uv_layers:
+        uv = np.empty(len(mesh.loops) * 2, dtype=np.float32)
+        layer.data.foreach_get('uv', uv)
+        uvs.append((layer.name, uv))
+    materials = [material.name if material else None for material in mesh.materials]
+    return {'co': co, 'loopVerts': loopVerts, 'loopTotal': loopTotal, 'materialIndex': materialIndex,
+            'smooth': smooth, 'uvs': uvs, 'materials': materials}
+
+
+def buffersSize(buffers):
+    return sum(buffers[key].nbytes for key in ('co', 'loopVerts', 'loopTotal', 'materialIndex', 'smooth')) + \
+           sum(uv.nbytes for name, uv in buffers['uvs'])
+
+
+def meshFromBuffers(name, buffers):
+    """Builds a new mesh datablock from meshBuffers arrays"""
+    mesh = bpy.data.meshes.new(name)
+    loopTotal = buffers['loopTotal']
+    mesh.vertices.add(len(buffers['co']) // 3)
+    mesh.vertices.foreach_set('co', buffers['co'])
+    mesh.loops.add(len(buffers['loopVerts']))
+    mesh.loops.foreach_set('vertex_index', buffers['loopVerts'])
+    mesh.polygons.add(len(loopTotal))
+    mesh.polygons.foreach_set('loop_start', (np.cumsum(loopTotal) - loopTotal).astype(np.int32))
+    mesh.polygons.foreach_set('loop_total', loopTotal)
+    mesh.polygons.foreach_set('material_index', buffers['materialIndex'])
+    mesh.polygons.foreach_set('use_smooth', buffers['smooth'])
+    for materialName in buffers['materials']:
+        material = bpy.data.materials.get(materialName) if materialName else None
+        if material:
+            mesh.materials.append(material)
+    mesh.update(calc_edges=True)
+    for layerName, uv in buffers['uvs']:
+        mesh.uv_textures.new(layerName)
+        mesh.uv_layers[layerName].data.foreach_set('uv', uv)
+    return mesh
+
+
+def replaceMesh(ob, buffers):
+    """
+    Swaps a mesh built from buffers in as the object's data.  The old mesh
+    is removed once nothing uses it and the new one takes over its name.
+    """
+    oldMesh = ob.data
+    name = oldMesh.name
+    ob.data = meshFromBuffers(name, buffers)
+    if oldMesh.users == 0:
+        bpy.data.meshes.remove(oldMesh)
+    ob.data.name = name
+
+
+def geometryHash(mesh, matrix):
+    """Content hash of a mesh's vertex and polygon buffers and its world matrix"""
+    buffers = meshBuffers(mesh)
+    return (len(buffers['co']), len(buffers['loopTotal']),
+            zlib.crc32(buffers['co'].view(np.uint8)),
+            zlib.crc32(buffers['loopVerts'].view(np.uint8)),
+            zlib.crc32(buffers['loopTotal'].view(np.uint8)),
+            zlib.crc32(np.array(matrix, dtype=np.float64).view(np.uint8)))
+
+
+def objectHash(scene, ob, evaluated=True):
+    if not evaluated:
+        return geometryHash(ob.data, ob.matrix_world)
+    mesh = ob.to_mesh(scene, True, 'PREVIEW')
+    key = geometryHash(mesh, ob.matrix_world)
+    bpy.data.meshes.remove(mesh)
+    return key
+
+
+class BooleanCache(object):
+    """
+    Least recently used boolean results, kept under a size limit in bytes.
+    Results are held as arrays rather than datablocks, undo rolls back
+    datablocks created after the step being undone to.
+    """
+    def __init__(self):
+        self.entries = OrderedDict()
+        self.size = 0
+
+    def get(self, key):
+        if key not in self.entries:
+            return None
+        self.entries.move_to_end(key)
+        return self.entries[key]
+
+    def put(self, key, buffers, limit):
+        size = buffersSize(buffers)
+        if key in self.entries:
+            self.size -= buffersSize(self.entries.pop(key))
+        if size > limit:
+            return
+        self.entries[key] = buffers
+        self.size += size
+        while self.size > limit:
+            self.size -= buffersSize(self.entries.popitem(last=False)[1])
+
+    def clear(self):
+        self.entries.clear()
+        self.size = 0
+
+
+resultCache = BooleanCache()
+
+
+def booleanKey(scene, operation, activeObj, operands):
+    """
+    Cache key of a boolean.  The active object's modifier is applied to its
+    own mesh data, so that is hashed as is, operands as they evaluate.
+    """
+    return (operation, objectHash(scene, activeObj, False),
+            tuple(sorted(objectHash(scene, ob) for ob in operands)))
+
+
+###------ Create Boolean Operators -------###
+   
+class boolean(bpy.types.Operator):
+    """Boolean the currently selected objects"""
+    bl_idname = "mesh.boolean"
+    bl_label = "Boolean Operator"
+    bl_options = {'REGISTER', 'UNDO'}     
+            
+    modOp = bpy.props.StringProperty()
+            
+    def execute(self, context):
+         
+        modName = "Bool"
+    
+        scene = context.scene
+        activeObj = context.active_object
+        selected = context.selected_objects
+
+        if selected:
+            if len(selected) > 1:
+                operands = [ob for ob in selected if ob != activeObj]
+
+                # the same boolean on the same geometry was done before
+                limit = scene.booleanCacheSize * 1024 * 1024
+                key = booleanKey(scene, (self.modOp, scene.booleanEngine), activeObj, operands) if limit else None
+                cached = resultCache.get(key) if key else None
+                if cached is not None:
+                    replaceMesh(activeObj, cached)
+                    for ob in operands:
+                        removeObject(scene, ob)
+                    activeObj.select = True
+                    scene.objects.active = activeObj
+                    self.report({'INFO'}, "Reused cached result")
+                    return {"FINISHED"}
+
+                activeBounds = worldBounds(activeObj)
+                # operands that can't touch the active object don't change a difference
+                touching = [ob for ob in operands if overlaps(worldBounds(ob), activeBounds)]
+
+                if self.modOp == 'INTERSECT' and len(touching) < len(operands):
+                    self.report({'INFO'}, "Objects don't overlap, the intersection is empty")
+                    return {"CANCELLED"}
+
+                temps = set()
+                if scene.booleanEngine == 'BSP':
+                    if self.modOp != 'DIFFERENCE' or touching:
+                        bspBoolean(scene, activeObj, touching if self.modOp == 'DIFFERENCE' else operands, self.modOp)
+                else:
+                    # everything is brought down to a single operand, so the active object is booleaned once
+                    if self.modOp == 'UNION':
+                        operand = unionOperands(scene, operands, temps)
+                    elif self.modOp == 'DIFFERENCE':
+                        operand = unionOperands(scene, touching, temps) if touching else None
+                    else:
+                        operand = reduceTree(scene, operands, 'INTERSECT', temps)
+
+                    if operand is not None:
+                        mod = activeObj.modifiers.new(modName, 'BOOLEAN')
+                        mod.operation = self.modOp
+                        mod.object = operand
+                        bpy.ops.object.modifier_apply(apply_as='DATA', modifier=mod.name)
+                if key:
+                    resultCache.put(key, meshBuffers(activeObj.data), limit)
+
+                for ob in temps:
+                    removeObject(scene, ob, True)
+                for ob in operands:
+                    removeObject(scene, ob)
+                activeObj.select = True
+                scene.objects.active = activeObj
+            else:
+                self.report({'INFO'}, "Only 1 object selected")
+        else:
+            self.report({'INFO'}, "No objects selected")
+                
+        return {"FINISHED"}     
+
+
+###------- Create the Boolean Menu --------###          
+
+class booleanMenu(bpy.types.Menu):
+    bl_label = "Boolean Tools"
+    bl_idname = "object.boolean_menu"
+       
+    def draw(self, context):
+        layout = self.layout
+        
+        union = layout.operator("mesh.boolean", "Union")
+        union.modOp = 'UNION'
+        
+        intersect = layout.operator("mesh.boolean", "Intersect")
+        intersect.modOp = 'INTERSECT'
+        
+        difference = layout.operator("mesh.boolean", "Difference")
+        difference.modOp = 'DIFFERENCE'
+
+        layout.prop(context.scene, "booleanEngine", text="")
+
+
+###------- Create the Boolean Toolbar --------###          
+
+class booleanToolbar(bpy.types.Panel):
+    bl_label = "Boolean Tools"
+    bl_idname = "object.boolean_toolbar"
+    bl_space_type = 'VIEW_3D'
+    bl_region_type = 'TOOLS'
+    bl_context = 'objectmode'
+    
+    def draw(self, context):
+        layout = self.layout
+        
+        col = layout.column(align=True)
+        
+        col.label(text="Operation:", icon="MOD_BOOLEAN")
+        
+        row = col.row()
+        union = row.operator("mesh.boolean", "Union")
+        union.modOp = 'UNION'
+        
+        intersect = row.operator("mesh.boolean", "Intersect")
+        intersect.modOp = 'INTERSECT'
+        
+        difference = row.operator("mesh.boolean", "Difference")
+        difference.modOp = 'DIFFERENCE'
+
+        col.prop(context.scene, "booleanEngine", text="")
+        col.prop(context.scene, "booleanCacheSize")
+    
+###------- Define the Hotkeys and Register Operators ---------###
+
+addon_keymaps = []
+    
+            
+def register():
+    bpy.types.Scene.booleanCacheSize = bpy.props.IntProperty(
+        name="Result Cache (MB)",
+        description="Memory kept for repeating identical booleans instantly, 0 turns the cache off",
+        default=256, min=0)
+    bpy.types.Scene.booleanEngine = bpy.props.EnumProperty(
+        name="Engine",
+        items=[('MODIFIER', "Modifier", "Blender's boolean modifier"),
+               ('BSP', "BSP", "Built in BSP engine, triangulates the result and drops UVs, smoothing and material indices")],
+        default='MODIFIER')
+
+    bpy.utils.register_class(boolean)
+    bpy.utils.register_class(booleanMenu)
+    bpy.utils.register_class(booleanToolbar)
+    
+    wm = bpy.context.window_manager
+    
+    # create the boolean menu hotkey
+    km = wm.keyconfigs.addon.keymaps.new(name='Object Mode', space_type='EMPTY')
+    kmi = km.keymap_items.new('wm.call_menu', 'B', 'PRESS', ctrl=True, shift=True)
+    kmi.properties.name = 'object.boolean_menu'
+
+    addon_keymaps.append(km)
+    
+def unregister():
+    bpy.utils.unregister_class(boolean)
+    bpy.utils.unregister_class(booleanMenu)
+    bpy.utils.unregister_class(booleanToolbar)
+    del bpy.types.Scene.booleanCacheSize
+    del bpy.types.Scene.booleanEngine
+    resultCache.clear()
+    
+    
+    # remove keymaps when add-on is deactivated
+    wm = bpy.context.window_manager
+    for km in addon_keymaps:
+        wm.keyconfigs.addon.keymaps.remove(km)
+    del addon_keymaps[:]
+    
+if __name__ == "__main__":
+    register()
\ No newline at end of file
@@ -0,0 +1,518 @@
+"""
+Standalone BSP mesh booleans on numpy arrays.
+
+Nothing in here imports bpy, so it runs headless and in worker processes:
+put this folder on sys.path and import bsp_boolean, or run the file for a
+benchmark.  Meshes are (verts (V,3), tris (F,3)) and work is done on
+triangle soups, (T,3,3) arrays of corner positions.
+"""
+
+import time
+import numpy as np
+
+
+###------ Planes and Splitting -------###
+
+def triangulate(loopStart, loopTotal, loopVerts):
+    """Fans polygons into (F,3) vertex index triangles"""
+    fans = np.maximum(loopTotal - 2, 0)
+    first = np.repeat(loopStart, fans)
+    k = np.arange(fans.sum()) - np.repeat(np.cumsum(fans) - fans, fans)
+    return np.stack((loopVerts[first], loopVerts[first + k + 1], loopVerts[first + k + 2]), axis=-1)
+
+
+def toSoup(verts, tris):
+    return np.asarray(verts, dtype=np.float64)[np.asarray(tris).reshape(-1, 3)]
+
+
+def triangleNormals(soup):
+    # written out, np.cross and reductions over an axis of 3 cost more than the math on small batches
+    u = soup[:, 1] - soup[:, 0]
+    v = soup[:, 2] - soup[:, 0]
+    return np.stack((u[:, 1] * v[:, 2] - u[:, 2] * v[:, 1],
+                     u[:, 2] * v[:, 0] - u[:, 0] * v[:, 2],
+                     u[:, 0] * v[:, 1] - u[:, 1] * v[:, 0]), axis=-1)
+
+
+def planeDistances(soup, normal, offset):
+    """(T,3) signed distance of every corner"""
+    return (soup.reshape(-1, 3) @ normal).reshape(-1, 3) - offset
+
+
+def dropDegenerate(soup, ids, eps):
+    """Removes triangles with next to no area, they have no plane to split by"""
+    normals = triangleNormals(soup)
+    keep = (normals * normals).sum(axis=1) > (eps * eps) ** 2
+    return soup[keep], ids[keep]
+
+
+def defaultEpsilon(*soups):
+    """Plane thickness relative to the size of the inputs"""
+    points = np.concatenate([soup.reshape(-1, 3) for soup in soups if len(soup)] or [np.zeros((1, 3))])
+    return 1e-6 * max(float((points.max(axis=0) - points.min(axis=0)).max()), 1.0)
+
+
+def splitSpanning(soup, ids, dist, side):
+    """
+    Cuts triangles that span a plane into their front and back pieces.
+    Every triangle is clipped against both half spaces at once: per edge it
+    keeps its start corner when that is on the kept side and the crossing
+    point when the edge crosses, which leaves at most 4 corners to fan.
+    """
+    count = len(soup)
+    nxt = [1, 2, 0]
+    crossing = side * side[:, nxt] < 0
+    t = dist / np.where(crossing, dist - dist[:, nxt], 1.0)
+    points = soup + t[..., None] * (soup[:, nxt] - soup)
+    # per triangle: corner 0, crossing 0, corner 1, crossing 1, corner 2, crossing 2
+    slots = np.stack((soup, points), axis=2).reshape(count, 6, 3)
+
+    pieces = []
+    for keepSide in (1, -1):
+        mask = np.stack((side * keepSide >= 0, crossing), axis=2).reshape(count, 6)
+        order = np.argsort(~mask, axis=1, kind='stable')[:, :4]
+        polygon = np.take_along_axis(slots, order[..., None], axis=1)
+        corners = mask.sum(axis=1)
+        quads = corners == 4
+        pieces.append((np.concatenate((polygon[corners >= 3][:, [0, 1, 2]], polygon[quads][:, [0, 2, 3]])),
+                       np.concatenate((ids[corners >= 3], ids[quads]))))
+    return pieces
+
+
+def partition(soup, ids, normal, offset, eps):
+    """
+    Sorts triangles against one plane, splitting those that span it.
+    Corners within eps of the plane count as on it.
+    Returns ((coplanar front), (coplanar back), (front), (back)) as (soup, ids) pairs.
+    """
+    dist = planeDistances(soup, normal, offset)
+    hasFront = (dist[:, 0] > eps) | (dist[:, 1] > eps) | (dist[:, 2] > eps)
+    hasBack = (dist[:, 0] < -eps) | (dist[:, 1] < -eps) | (dist[:, 2] < -eps)
+    # most batches lie on one side, skip the rest of the work for them
+    empty = (soup[:0], ids[:0])
+    if not hasBack.any() and hasFront.all():
+        return empty, empty, (soup, ids), empty
+    if not hasFront.any() and hasBack.all():
+        return empty, empty, empty, (soup, ids)
+
+    side = (dist > eps).astype(np.int8) - (dist < -eps)
+    front = hasFront & ~hasBack
+    back = hasBack & ~hasFront
+    coplanar = ~hasFront & ~hasBack
+    spanning = hasFront & hasBack
+    facing = triangleNormals(soup[coplanar]) @ normal > 0
+    if spanning.any():
+        (frontSplit, frontIds), (backSplit, backIds) = splitSpanning(soup[spanning], ids[spanning],
+                                                                     dist[spanning], side[spanning])
+    else:
+        (frontSplit, frontIds), (backSplit, backIds) = empty, empty
+    return ((soup[coplanar][facing], ids[coplanar][facing]),
+            (soup[coplanar][~facing], ids[coplanar][~facing]),
+            (np.concatenate((soup[front], frontSplit)), np.concatenate((ids[front], frontIds))),
+            (np.concatenate((soup[back], backSplit)), np.concatenate((ids[back], backIds))))
+
+
+def choosePlane(soup, eps, candidates=5, sample=64):
+    """
+    Tries the planes of a few of the triangles and keeps the one that splits
+    the fewest and balances front and back best, scored on a sample.
+    """
+    picks = soup[::max(len(soup) // candidates, 1)][:candidates]
+    normals = triangleNormals(picks)
+    normals /= np.sqrt((normals * normals).sum(axis=1))[:, None]
+    offsets = (normals * picks[:, 0]).sum(axis=1)
+    if len(picks) == 1:
+        return normals[0], offsets[0]
+    scored = soup[::max(len(soup) // sample, 1)]
+
+    dist = np.einsum('tkj,cj->ctk', scored, normals) - offsets[:, None, None]
+    hasFront = (dist > eps).any(axis=2)
+    hasBack = (dist < -eps).any(axis=2)
+    spanning = (hasFront & hasBack).sum(axis=1)
+    balance = np.abs((hasFront & ~hasBack).sum(axis=1) - (hasBack & ~hasFront).sum(axis=1))
+    best = np.argmin(spanning * 8 + balance)
+    return normals[best], offsets[best]
+
+
+###------ BSP Tree -------###
+
+class BSPTree(object):
+    """
+    A solid as a BSP tree of its triangles.  Nodes live in flat lists, a
+    child of -1 is an empty leaf: in front of the surface when it's a front
+    child, inside the solid when it's a back child.  Every walk over the
+    tree is an explicit stack, convex inputs make trees as deep as they
+    have faces.
+    """
+    def __init__(self, soup=None, eps=1e-6):
+        self.eps = eps
+        self.normal = []
+        self.offset = []
+        self.front = []
+        self.back = []
+        self.polygons = []
+        self.bounds = None
+        self.inverted = False
+        if soup is not None:
+            self.add(soup)
+
+    def newNode(self, normal, offset):
+        self.normal.append(normal)
+        self.offset.append(offset)
+        self.front.append(-1)
+        self.back.append(-1)
+        self.polygons.append(np.empty((0, 3, 3)))
+        return len(self.normal) - 1
+
+    def add(self, soup):
+        """Inserts triangles, growing new nodes where they land in empty leaves"""
+        soup = np.asarray(soup, dtype=np.float64).reshape(-1, 3, 3)
+        soup = dropDegenerate(soup, np.zeros(len(soup), dtype=np.int32), self.eps)[0]
+        if len(soup):
+            low, high = soupBounds(soup)
+            if self.bounds is not None:
+                low, high = np.minimum(low, self.bounds[0]), np.maximum(high, self.bounds[1])
+            self.bounds = (low - self.eps, high + self.eps)
+        stack = [(0 if self.normal else -1, -1, True, soup)]
+        while stack:
+            node, parent, isFront, batch = stack.pop()
+            if not len(batch):
+                continue
+            if node < 0:
+                node = self.newNode(*choosePlane(batch, self.eps))
+                if parent >= 0:
+                    (self.front if isFront else self.back)[parent] = node
+            ids = np.zeros(len(batch), dtype=np.int32)
+            coFront, coBack, front, back = partition(batch, ids, self.normal[node], self.offset[node], self.eps)
+            self.polygons[node] = np.concatenate((self.polygons[node], coFront[0], coBack[0]))
+            stack.append((self.front[node], node, True, front[0]))
+            stack.append((self.back[node], node, False, back[0]))
+
+    def clip(self, soup, ids):
+        """Removes the parts of the triangles inside this solid, ids follow the pieces"""
+        if not self.normal:
+            return soup, ids
+        # triangles clear of the bounding box are outside the solid without walking the tree,
+        # which is inside once the solid is inverted
+        low, high = self.bounds
+        clear = ((soup.min(axis=1) > high) | (soup.max(axis=1) < low)).any(axis=1)
+        kept = [(soup[:0], ids[:0]) if self.inverted else (soup[clear], ids[clear])]
+        stack = [(0, soup[~clear], ids[~clear])]
+        while stack:
+            node, batch, batchIds = stack.pop()
+            if not len(batch):
+                continue
+            coFront, coBack, front, back = partition(batch, batchIds, self.normal[node], self.offset[node], self.eps)
+            front = (np.concatenate((front[0], coFront[0])), np.concatenate((front[1], coFront[1])))
+            back = (np.concatenate((back[0], coBack[0])), np.concatenate((back[1], coBack[1])))
+            if self.front[node] >= 0:
+                stack.append((self.front[node],) + front)
+            else:
+                kept.append(front)
+            if self.back[node] >= 0:
+                stack.append((self.back[node],) + back)
+        return np.concatenate([piece[0] for piece in kept]), np.concatenate([piece[1] for piece in kept])
+
+    def clipTo(self, other):
+        """
+        Clips every node's triangles against another solid in a single walk
+        of its tree.  Triangles that were cut up but kept every piece are put
+        back whole, planes that only graze them would otherwise shred them.
+        """
+        soup, owner = self.allPolygons(withIds=True)
+        pieces, source = other.clip(soup, np.arange(len(soup)))
+        area = np.sqrt((triangleNormals(soup) ** 2).sum(axis=1))
+        keptArea = np.bincount(source, np.sqrt((triangleNormals(pieces) ** 2).sum(axis=1)), len(soup))
+        pieceCount = np.bincount(source, minlength=len(soup))
+        whole = (pieceCount > 1) & (np.abs(keptArea - area) <= 1e-7 * area + self.eps * self.eps)
+        cut = ~whole[source]
+        soup = np.concatenate((pieces[cut], soup[whole]))
+        ids = np.concatenate((owner[source[cut]], owner[whole]))
+        order = np.argsort(ids, kind='stable')
+        bounds = np.searchsorted(ids[order], np.arange(len(self.polygons) + 1))
+        soup = soup[order]
+        self.polygons = [soup[bounds[i]:bounds[i + 1]] for i in range(len(self.polygons))]
+
+    def invert(self):
+        """Turns the solid inside out"""
+        self.polygons = [polygons[:, ::-1] for polygons in self.polygons]
+        self.normal = [-normal for normal in self.normal]
+        self.offset = [-offset for offset in self.offset]
+        self.front, self.back = self.back, self.front
+        self.inverted = not self.inverted
+
+    def allPolygons(self, withIds=False):
+        soup = np.concatenate(self.polygons) if self.polygons else np.empty((0, 3, 3))
+        if withIds:
+            return soup, np.repeat(np.arange(len(self.polygons)), [len(p) for p in self.polygons]).astype(np.int32)
+        return soup
+
+
+###------ Booleans -------###
+
+def booleanSoup(a, b, operation, eps):
+    """
+    Boolean of two closed triangle soups, returns a soup.  Each solid is
+    clipped by the other's tree and what survives of both is the result,
+    the trees aren't needed after so b's pieces are never inserted into a.
+    """
+    a = BSPTree(a, eps)
+    b = BSPTree(b, eps)
+    if operation == 'UNION':
+        a.clipTo(b)
+        b.clipTo(a)
+        b.invert()
+        b.clipTo(a)
+        b.invert()
+        return np.concatenate((a.allPolygons(), b.allPolygons()))
+    if operation == 'DIFFERENCE':
+        a.invert()
+        a.clipTo(b)
+        b.clipTo(a)
+        b.invert()
+        b.clipTo(a)
+        b.invert()
+    elif operation == 'INTERSECT':
+        a.invert()
+        b.clipTo(a)
+        b.invert()
+        a.clipTo(b)
+        b.clipTo(a)
+    else:
+        raise ValueError("Unknown boolean operation %r" % operation)
+    # a is still inside out, flipping everything turns it back and b with it
+    return np.concatenate((a.allPolygons(), b.allPolygons()))[:, ::-1]
+
+
+def soupBounds(soup):
+    points = soup.reshape(-1, 3)
+    return points.min(axis=0), points.max(axis=0)
+
+
+def overlapGroups(bounds):
+    """Indices of the boxes grouped by overlap, directly or through other boxes"""
+    low = np.array([box[0] for box in bounds])
+    high = np.array([box[1] for box in bounds])
+    overlap = np.all((low[:, None] <= high[None]) & (low[None] <= high[:, None]), axis=2)
+    # every box takes the lowest label among its neighbours until nothing changes
+    label = np.arange(len(bounds))
+    while True:
+        spread = np.where(overlap, label[None, :], len(bounds)).min(axis=1)
+        if np.array_equal(spread, label):
+            break
+        label = spread
+    return [list(np.nonzero(label == group)[0]) for group in np.unique(label)]
+
+
+def reduceTree(soups, operation, eps):
+    """Combines soups pairwise, level by level, rather than folding into one growing soup"""
+    level = list(soups)
+    while len(level) > 1:
+        nextLevel = [booleanSoup(level[i], level[i + 1], operation, eps) for i in range(0, len(level) - 1, 2)]
+        if len(level) % 2:
+            nextLevel.append(level[-1])
+        level = nextLevel
+    return level[0]
+
+
+def unionAll(soups, eps):
+    """Union of any number of soups, groups that can't touch are simply concatenated"""
+    soups = [soup for soup in soups if len(soup)]
+    if not soups:
+        return np.empty((0, 3, 3))
+    groups = overlapGroups([soupBounds(soup) for soup in soups])
+    return np.concatenate([reduceTree([soups[i] for i in group], 'UNION', eps) for group in groups])
+
+
+def weld(soup, tolerance):
+    """Merges corners closer than tolerance, returns (verts (V,3), tris (F,3) int32)"""
+    points = soup.reshape(-1, 3)
+    if not len(points):
+        return np.empty((0, 3)), np.empty((0, 3), dtype=np.int32)
+    keys = np.round(points / tolerance).astype(np.int64)
+    keys, first, index = np.unique(keys, axis=0, return_index=True, return_inverse=True)
+    tris = index.reshape(-1, 3)
+    tris = tris[(tris[:, 0] != tris[:, 1]) & (tris[:, 1] != tris[:, 2]) & (tris[:, 2] != tris[:, 0])]
+    return points[first], tris.astype(np.int32)
+
+
+def edgeUse(tris):
+    """Directed edges (3F,2) of the triangles and how many triangles use each one's undirected edge"""
+    edges = tris[:, [[0, 1], [1, 2], [2, 0]]].reshape(-1, 2).astype(np.int64)
+    keys = edges.min(axis=1) * (int(tris.max(initial=0)) + 1) + edges.max(axis=1)
+    keys, index, counts = np.unique(keys, return_inverse=True, return_counts=True)
+    return edges, counts[index.ravel()]
+
+
+def openEdges(tris):
+    """Directed edges (E,2) whose undirected edge isn't used by exactly two triangles"""
+    edges, uses = edgeUse(tris)
+    return edges[uses != 2]
+
+
+def pointsOnEdges(verts, edges, candidates, tolerance):
+    """
+    For every edge the candidate vertex lying on it closest to its start,
+    -1 where there is none.  Pairs are only formed where the vertex falls
+    in the edge's range along the widest axis, found by binary search.
+    """
+    points = verts[candidates]
+    axis = np.argmax(points.max(axis=0) - points.min(axis=0))
+    order = np.argsort(points[:, axis], kind='stable')
+    sortedPoints = points[order, axis]
+    a = verts[edges[:, 0]]
+    d = verts[edges[:, 1]] - a
+    start = np.searchsorted(sortedPoints, np.minimum(a[:, axis], a[:, axis] + d[:, axis]) - tolerance, 'left')
+    counts = np.searchsorted(sortedPoints, np.maximum(a[:, axis], a[:, axis] + d[:, axis]) + tolerance, 'right') - start
+    edge = np.repeat(np.arange(len(edges)), counts)
+    point = order[np.repeat(start, counts) + np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)]
+
+    offset = points[point] - a[edge]
+    length = np.sqrt((d * d).sum(axis=1))[edge]
+    t = (offset * d[edge]).sum(axis=1) / np.maximum(length * length, 1e-30)
+    away = offset - t[:, None] * d[edge]
+    # strictly between the ends, welded vertices are distinct even when closer than the tolerance
+    inside = (t > 0) & (t < 1) & (candidates[point] != edges[edge, 0]) & (candidates[point] != edges[edge, 1])
+    on = inside & ((away * away).sum(axis=1) < tolerance * tolerance)
+    edge, point, t = edge[on], point[on], t[on]
+
+    found = np.full(len(edges), -1)
+    first = np.lexsort((t, edge))
+    edge, point = edge[first], point[first]
+    head = np.ones(len(edge), dtype=bool)
+    head[1:] = edge[1:] != edge[:-1]
+    found[edge[head]] = candidates[point[head]]
+    return found
+
+
+def splitTJunctions(verts, tris, tolerance):
+    """
+    Splits triangle edges at welded vertices lying on them.  Pieces cut on
+    one side of a plane only leave T-junctions, open edges that welding
+    can't close.  Only open edges and their own vertices are tested, each
+    round splits every triangle once, at the vertex nearest the start of its
+    first open edge, until no vertex lies on an open edge.
+    """
+    tris = np.asarray(tris, dtype=np.int32).reshape(-1, 3)
+    for _ in range(64):
+        edges, uses = edgeUse(tris)
+        isOpen = np.nonzero(uses == 1)[0]
+        if not len(isOpen):
+            break
+        split = np.full(len(edges), -1)
+        split[isOpen] = pointsOnEdges(verts, edges[isOpen], np.unique(edges[isOpen]), tolerance)
+        split = split.reshape(-1, 3)
+        has = split >= 0
+        cut = np.nonzero(has.any(axis=1))[0]
+        if not len(cut):
+            break
+        # k is the corner the first split edge starts at, the triangle becomes (i, p, o) and (p, j, o)
+        k = np.argmax(has[cut], axis=1)
+        i = tris[cut, k]
+        j = tris[cut, (k + 1) % 3]
+        o = tris[cut, (k + 2) % 3]
+        p = split[cut, k]
+        keep = np.ones(len(tris), dtype=bool)
+        keep[cut] = False
+        tris = np.concatenate((tris[keep], np.stack((i, p, o), axis=-1), np.stack((p, j, o), axis=-1))).astype(np.int32)
+    return tris
+
+
+def combine(active, operands, operation, eps=None):
+    """
+    The active soup booleaned with any number of operand soups.  Union and
+    difference bring the operands down to one with unionAll, intersect
+    reduces everything as a balanced tree.  Empty soups are skipped, an empty
+    operand empties an intersection.  The welded result has its T-junctions
+    split so faces cut on one side of a coplanar contact close up again.
+    Returns (verts, tris).
+    """
+    eps = eps or defaultEpsilon(active, *operands)
+    empty = np.empty((0, 3, 3))
+    if operation == 'INTERSECT' and not all(len(soup) for soup in [active] + list(operands)):
+        return weld(empty, eps * 10)
+    operands = [soup for soup in operands if len(soup)]
+    if not operands:
+        soup = active
+    elif not len(active):
+        soup = unionAll(operands, eps) if operation == 'UNION' else empty
+    elif operation == 'INTERSECT':
+        soup = reduceTree([active] + list(operands), 'INTERSECT', eps)
+    else:
+        soup = booleanSoup(active, unionAll(operands, eps), operation, eps)
+    verts, tris = weld(soup, eps * 10)
+    return verts, splitTJunctions(verts, tris, eps)
+
+
+def boolean(vertsA, trisA, vertsB, trisB, operation, eps=None):
+    """Boolean of two indexed triangle meshes, returns (verts, tris)"""
+    return combine(toSoup(vertsA, trisA), [toSoup(vertsB, trisB)], operation, eps)
+
+
+###------ Headless Batches -------###
+
+def runJob(job):
+    """(vertsA, trisA, vertsB, trisB, operation) -> (verts, tris), for process pools"""
+    return boolean(*job)
+
+
+def batch(jobs, processes=None):
+    """Runs many booleans over a pool of worker processes, results come back in order"""
+    from concurrent.futures import ProcessPoolExecutor
+    with ProcessPoolExecutor(processes) as pool:
+        return list(pool.map(runJob, jobs))
+
+
+def sphere(center, radius, rings=24, segments=48):
+    """A closed uv sphere as (verts, tris), for testing"""
+    theta = np.linspace(0, np.pi, rings + 1)[1:-1]
+    phi = np.linspace(0, 2 * np.pi, segments, endpoint=False)
+    t, p = np.meshgrid(theta, phi, indexing='ij')
+    body = np.stack((np.sin(t) * np.cos(p), np.sin(t) * np.sin(p), np.cos(t)), axis=-1).reshape(-1, 3)
+    verts = np.vstack((body, [[0, 0, 1], [0, 0, -1]])) * radius + center
+    top, bottom = len(body), len(body) + 1
+    i = np.arange(rings - 2)[:, None] * segments
+    j = np.arange(segments)[None, :]
+    j1 = (j + 1) % segments
+    quads = np.stack(np.broadcast_arrays(i + j, i + segments + j, i + segments + j1, i + j1), axis=-1).reshape(-1, 4)
+    last = (rings - 2) * segments
+    tris = np.vstack((quads[:, [0, 1, 2]], quads[:, [0, 2, 3]],
+                      np.stack(np.broadcast_arrays(top, j.ravel(), j1.ravel()), axis=-1),
+                      np.stack(np.broadcast_arrays(bottom, last + j1.ravel(), last + j.ravel()), axis=-1)))
+    return verts, tris.astype(np.int32)
+
+
+def box(low, high):
+    """A closed box as (verts, tris), for testing"""
+    corners = np.array([[x, y, z] for x in (0, 1) for y in (0, 1) for z in (0, 1)])
+    verts = np.where(corners, high, low).astype(np.float64)
+    quads = np.array([[0, 1, 3, 2], [4, 6, 7, 5], [0, 4, 5, 1], [2, 3, 7, 6], [0, 2, 6, 4], [1, 5, 7, 3]])
+    return verts, np.vstack((quads[:, [0, 1, 2]], quads[:, [0, 2, 3]])).astype(np.int32)
+
+
+def signedVolume(verts, tris):
+    corners = verts[tris]
+    return np.einsum('ij,ij->i', corners[:, 0], np.cross(corners[:, 1], corners[:, 2])).sum() / 6.0
+
+
+def benchmark(rings=24, segments=48):
+    """
+    Times each operation on two overlapping spheres and on two unit boxes
+    offset along x, whose faces overlap in the same planes.  Returns
+    {(case, operation): (seconds, triangles, volume, open edges)}, a
+    watertight result has no open edges.
+    """
+    cases = {'spheres': (sphere(np.zeros(3), 1.0, rings, segments), sphere(np.array([0.8, 0.3, 0.2]), 0.9, rings, segments)),
+             'coplanar': (box(np.zeros(3), np.ones(3)), box(np.array([0.5, 0, 0]), np.array([1.5, 1, 1])))}
+    report = {}
+    for case, (a, b) in cases.items():
+        for operation in ('UNION', 'INTERSECT', 'DIFFERENCE'):
+            start = time.time()
+            verts, tris = boolean(a[0], a[1], b[0], b[1], operation)
+            report[case, operation] = (time.time() - start, len(tris), signedVolume(verts, tris), len(openEdges(tris)))
+    return report
+
+
+if __name__ == "__main__":
+    for (case, operation), (seconds, count, volume, holes) in sorted(benchmark().items()):
+        print("%-8s %-10s %.3fs  %6d tris  volume %.4f  %d open edges" % (case, operation, seconds, count, volume, holes))
@@ -1,6 +1,6 @@
 #script by Your Alex Telford | www.blendercookie.com
 #Description:
-#Rotates the pivot of an object without effecting the object itself, caution: slow on heavy objects.
+#Rotates the pivot of an object without effecting the object itself.
 bl_info = {
     "name": "Rotate Pivot",
     "author": "Alex Telford",
@@ -15,7 +15,9 @@ bl_info = {
     
 #import modules
 import bpy
+import numpy as np
 from bpy.props import *
+from mathutils import Matrix
 
 class rotatePivotInit(bpy.types.Panel):
     bl_label = "Rotate Pivot"
@@ -65,48 +67,59 @@ class OBJECT_OT_rotatePivot(bpy.types.Operator):
     bl_label = "Rotate"
     
     def execute(self, context):
-        obj = context.object
         scn = context.scene
         
         ###Run Script
-        #active
-        active = bpy.context.scene.objects.active
-        selection = bpy.context.selected_objects
-        bpy.ops.object.mode_set(mode='OBJECT')
-        bpy.ops.object.select_all(action='DESELECT')
-        pivotPoint = context.space_data.pivot_point
-        context.space_data.pivot_point = "CURSOR"
-        for ob in selection:
-            if ob != active:
-                print(ob)
-                bpy.context.scene.objects.active = ob
-                ob.select = True
-                if scn.applyRotationFirst == True:
-                    bpy.ops.object.transform_apply(location=False, rotation=True, scale=False)
-                rotatePivot(active.rotation_euler)
-                bpy.ops.object.select_all(action='DESELECT')
-        context.space_data.pivot_point = pivotPoint
-        #warnings use this context if you need them, here we just print the stuff
-        self.report({'INFO'}, "Done!")
+        #active is the source, every other selected object gets its rotation
+        active = scn.objects.active
+        targets = [ob for ob in context.selected_objects if ob != active]
+        count = rotatePivot(targets, active.rotation_euler, scn.applyRotationFirst)
+        #warnings use this context if you need them
+        self.report({'INFO'}, "Done! Rotated %i pivots" % count)
         
         return{'FINISHED'}
     
 ###functions
-def rotatePivot(rotation):
-    #rotate selected object based on a vector
-    bpy.ops.object.mode_set(mode='OBJECT')
-    bpy.ops.transform.rotate(value=rotation.x, axis=(1,0,0), constraint_orientation='GLOBAL')
-    bpy.ops.object.mode_set(mode='EDIT')
-    bpy.ops.transform.rotate(value=-rotation.x, axis=(1,0,0), constraint_orientation='GLOBAL')
-    bpy.ops.object.mode_set(mode='OBJECT')
-    bpy.ops.transform.rotate(value=rotation.y, axis=(0,1,0), constraint_orientation='GLOBAL')
-    bpy.ops.object.mode_set(mode='EDIT')
-    bpy.ops.transform.rotate(value=-rotation.y, axis=(0,1,0), constraint_orientation='GLOBAL')
-    bpy.ops.object.mode_set(mode='OBJECT')
-    bpy.ops.transform.rotate(value=rotation.z, axis=(0,0,1), constraint_orientation='GLOBAL')
-    bpy.ops.object.mode_set(mode='EDIT')
-    bpy.ops.transform.rotate(value=-rotation.z, axis=(0,0,1), constraint_orientation='GLOBAL')
-    bpy.ops.object.mode_set(mode='OBJECT')
+def rotatePivot(objects, rotation, applyRotation=False):
+    #give every mesh object the euler rotation without moving its geometry, no operators or mode switches.
+    #the mesh is counter transformed with one matrix multiply, shared meshes only once. returns the number of objects changed
+    rot = np.array(rotation.to_matrix().to_4x4())
+    corrected = {}
+    count = 0
+    for ob in objects:
+        if ob.type != 'MESH':
+            continue
+        matrix = np.array(ob.matrix_world)
+        key = ob.data.as_pointer()
+        if key in corrected:
+            #mesh already counter transformed for another user, keep this one where it was
+            new = matrix @ np.linalg.inv(corrected[key])
+        else:
+            new = pivotMatrix(ob.matrix_world, rot, applyRotation)
+            correction = np.linalg.inv(new) @ matrix
+            transformVerts(ob.data, correction)
+            corrected[key] = correction
+        ob.matrix_world = Matrix(new.tolist())
+        count += 1
+    return count
+
+def pivotMatrix(matrix, rot, applyRotation):
+    #new world matrix, same location and scale, rotation replaced by (or added to) rot about the object's own origin
+    loc, quat, scale = matrix.decompose()
+    new = np.diag([scale.x, scale.y, scale.z, 1.0])
+    if not applyRotation:
+        new = np.array(quat.to_matrix().to_4x4()) @ new
+    new = rot @ new
+    new[:3, 3] = loc
+    return new
+
+def transformVerts(me, matrix):
+    #apply a 4x4 matrix to every vertex of a mesh
+    co = np.empty(len(me.vertices) * 3)
+    me.vertices.foreach_get('co', co)
+    co = co.reshape(-1, 3) @ matrix[:3, :3].T + matrix[:3, 3]
+    me.vertices.foreach_set('co', co.ravel())
+    me.update()
 
 def register():
     ###initialize classes
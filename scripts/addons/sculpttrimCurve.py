@@ -22,8 +22,6 @@ Description:
     This script will create a panel in the sculpt menu that will all triming objects by creating a boolean based on a grease pencil stroke or a curve.
 Warning:
     This script is currently in a public Beta release, there are bugs and I recommend you take a backup of your work, I take no responsibility in any part either direct or in-direct at the loss of any work. Use at your own risk.
-KNOWN BUGS:
-    On line 290-ish I extrude away from the camera, this needs to be reworked as it is un-predictable.
 """
 bl_info = {
     "name": "Sculpt trim curve",
@@ -39,11 +37,25 @@ bl_info = {
     
 # import modules
 import bpy
+import time
+import zlib
 from bpy.props import *
 from math import *
 from mathutils import *
+import numpy as np
 
 
+# props are created while the panel class body runs, so their callback comes first
+def previewUpdate(self, context):
+    """
+    previewUpdate(Scene self, Context context)
+    Property update callback, keeps a visible preview in step with the options.
+    """
+    if context.scene.TCinitPreview:
+        updatePreview(context)
+    else:
+        removePreview(context.scene)
+
 class initialize(bpy.types.Panel):
     """
     Creates the panel with controls, inherits from bpy.types.Panel
@@ -69,17 +81,25 @@ class initialize(bpy.types.Panel):
         bpy.types.Scene.TCinitCurveType = bpy.props.EnumProperty(
         items = [('1', 'Grease Pencil', 'grease'), 
                  ('2', 'Curve', 'curve')],
-        name = "curveType")
+        name = "curveType",
+        update = previewUpdate)
+        # every stroke or just the last one
+        bpy.types.Scene.TCinitBatch = BoolProperty(
+            name = "Batch Strokes", 
+            description = "Cut with every stroke in the active layer in one boolean, otherwise only the last stroke",
+            default = True,
+            update = previewUpdate)
         # create initial value boxes
-        bpy.types.Scene.TCinitDepth = FloatProperty(name = "Depth", description = "depth from view", default = 5.00, min = -100, max = 100)
-        bpy.types.Scene.TCinitDivision = FloatProperty(name = "Division", description = "Division Spacing", default = 0.5, min = -100, max = 100)
-        bpy.types.Scene.TCinitExtrusion = FloatProperty(name = "Extrusion", description = "Extrusion Depth", default = 5, min = -100, max = 100)
+        bpy.types.Scene.TCinitDepth = FloatProperty(name = "Depth", description = "depth from view", default = 5.00, min = -100, max = 100, update = previewUpdate)
+        bpy.types.Scene.TCinitDivision = FloatProperty(name = "Division", description = "Division Spacing", default = 0.5, min = -100, max = 100, update = previewUpdate)
+        bpy.types.Scene.TCinitExtrusion = FloatProperty(name = "Extrusion", description = "Extrusion Depth", default = 5, min = -100, max = 100, update = previewUpdate)
         # axis enum
         bpy.types.Scene.TCinitAxis = bpy.props.EnumProperty(
         items = [('1', '3D Cursor', 'cursor'),
                  ('2', 'X', 'x'), 
                  ('3', 'Y', 'y')],
-        name = "axisType")
+        name = "axisType",
+        update = previewUpdate)
         # apply modifier
         bpy.types.Scene.TCinitApplyMod = BoolProperty(
             name = "Apply Boolean", 
@@ -89,22 +109,33 @@ class initialize(bpy.types.Panel):
         bpy.types.Scene.TCinitCyclic = BoolProperty(
             name = "Cyclic", 
             description = "Disable extrusion and enable cyclic hole?",
-            default = False)
+            default = False,
+            update = previewUpdate)
         # reverse direction
         bpy.types.Scene.TCinitReverseDir = BoolProperty(
             name = "Reverse Direction", 
             description = "Reverse Direction",
-            default = False)
+            default = False,
+            update = previewUpdate)
         # reverse depth
         bpy.types.Scene.TCinitReverseDepth=  BoolProperty(
             name = "Reverse Depth", 
             description = "Reverse Depth of extrusion",
-            default = False)
+            default = False,
+            update = previewUpdate)
         # reverse trim
         bpy.types.Scene.TCinitReverseTrim = BoolProperty(
             name = "Reverse Trim", 
             description = "Reverse Trim",
-            default = False)
+            default = False,
+            update = previewUpdate)
+        # preview against a low resolution proxy
+        bpy.types.Scene.TCinitPreview = BoolProperty(
+            name = "Preview", 
+            description = "Show the trim on a low resolution proxy, the full mesh is only cut by Trim Curve",
+            default = False,
+            update = previewUpdate)
+        bpy.types.Scene.TCinitProxyResolution = IntProperty(name = "Proxy Resolution", description = "Voxel cells along the longest side of the preview proxy", default = 96, min = 8, max = 1024, update = previewUpdate)
         # return to mode enum
         bpy.types.Scene.TCinitReturnMode = bpy.props.EnumProperty(
         items = [('1', 'Sculpt', 'sculpt'), 
@@ -128,6 +159,8 @@ class initialize(bpy.types.Panel):
             # layout items
             col.label("Curve Type")
             col.prop(scn, 'TCinitCurveType', text = '')
+            if scn.TCinitCurveType == '1':
+                col.prop(scn, "TCinitBatch")
             # object
             col.label("Object")
             col.prop_search(obj, "TCinitObject",  scn, "objects", text = '', icon = 'MESH_DATA')
@@ -152,6 +185,11 @@ class initialize(bpy.types.Panel):
             col.prop(scn, "TCinitReverseDepth")
             col.prop(scn, "TCinitReverseTrim")
             col.prop(scn, "TCinitReturnMode")
+            # preview
+            col.prop(scn, "TCinitPreview")
+            if scn.TCinitPreview == True:
+                col.prop(scn, "TCinitProxyResolution")
+                col.operator("trim.preview")
             # execute button
             layout.operator("trim.curves")
         except:
@@ -167,249 +205,61 @@ class OBJECT_OT_trimCurve(bpy.types.Operator):
     
     def execute(self, context):
         """
-        We execute all the code here based on props
+        We execute all the code here based on props, this is the full resolution trim
         """
         # short code
         obj = context.object
         scn = context.scene
+        # (stage, seconds) for the report
+        timings = []
+        start = time.time()
         
         # Trim function #
-        # convert pencil to curve or return curve
         bpy.ops.object.mode_set(mode='OBJECT')
-        # 1 = pencil stroke
-        if scn.TCinitCurveType == '1':
-            # check if stroke exists
-            try:
-                bpy.ops.gpencil.convert(type='PATH')
-            except:
-                print('Stroke does not exist')
-                self.report({'WARNING'}, "No strokes found.")
-                return{'FINISHED'}
-            # loop through strokes
-            for ob in bpy.context.selected_objects:
-                    # all strokes start with GP_Layer
-                    if ob != bpy.context.scene.objects.active and ob.name.startswith("GP_Layer"):
-                        # create curve variable
-                        curve = ob
-                        bpy.ops.object.select_all(action='DESELECT') 
-                        # set curve resolution from default 12 to 1
-                        curve.select = True
-                        bpy.context.scene.objects.active = curve
-                        bpy.context.object.data.resolution_u = 1
-        else:
-            # check if curve exists
-            try:
-                # create curve variable
-                curve = bpy.data.objects[obj.TCinitCurve]
-            except:
-                print('curve does not exist')
-                self.report({'WARNING'}, "No curve selected.")
-                return{'FINISHED'}
-        
         # check if mesh exists
         try:
             # create mesh variable
             mesh = bpy.data.objects[obj.TCinitObject]
         except:
-            print('mesh does not exist')
             self.report({'WARNING'}, "No mesh selected.")
             return{'FINISHED'}
-            
-        # select curve
-        bpy.ops.object.select_all(action='DESELECT') 
-        curve.select = True
-        bpy.context.scene.objects.active = curve
-        # edit curve
-        bpy.ops.object.mode_set(mode='EDIT')
-        bpy.ops.curve.select_all(action='SELECT')
-        # if cyclic set to cyclic
-        if scn.TCinitCyclic == True:
-            for spline in curve.data.splines:
-                spline.use_cyclic_u = True
-        # object mode and convert to mesh
-        bpy.ops.object.mode_set(mode='OBJECT')
-        bpy.ops.object.convert(target='MESH', keep_original=False)
-        
-        # rotate curve pivot to view for local transformations #    
-            
-        # select curve
-        bpy.ops.object.select_all(action='DESELECT') 
-        curve.select = True
-        bpy.context.scene.objects.active = curve
-        # center origin
-        bpy.ops.object.origin_set(type='ORIGIN_GEOMETRY', center='MEDIAN')
-        # get cursor location, set to vector to break link
-        cursorInit = Vector(bpy.context.scene.cursor_location)
-        # add temporary empty
-        bpy.ops.object.empty_add(type='PLAIN_AXES', view_align=True)
-        # assign the emtpy to a variable
-        for ob in bpy.context.selected_objects:
-                if ob.name.startswith("Empty"):
-                    empty = ob
-        
-        # get pivot
-        pivotPoint = context.space_data.pivot_point
-        # set cursor location to curve
-        bpy.context.scene.cursor_location = curve.location
-        # rotate around cursor
-        context.space_data.pivot_point = "CURSOR"
-        # select none
-        bpy.ops.object.select_all(action='DESELECT')
-        # select curve
-        curve.select = True
-        bpy.context.scene.objects.active = curve
-        # apply rotation
-        bpy.ops.object.transform_apply(location=False, rotation=True, scale=False)
-        # rotate pivot of curve to rotation of empty
-        rotatePivot(empty.rotation_euler)
-        # set pivot point back to original
-        context.space_data.pivot_point = pivotPoint
-        # set cursor location back to original
-        bpy.context.scene.cursor_location = cursorInit
-        
-        # delete empty
-        bpy.ops.object.select_all(action='DESELECT')
-        empty.select = True
-        bpy.context.scene.objects.active = empty
-        bpy.ops.object.delete(use_global=False)
-        
-        # select curve
-        curve.select = True
-        bpy.context.scene.objects.active = curve
-        
-        # move curve towards camera #
-        # calculate correct xyz values based on view angle #
         
-        # enter edit mode
-        bpy.ops.object.mode_set(mode='EDIT')
-        bpy.ops.mesh.select_all(action='SELECT')
-        
-        # get initial curve location
-        Ci = Vector(curve.location)
-        
-        # Create transformation matrix
-        localTranslationForward = Matrix.Translation((0, 0, scn.TCinitDepth/2))
-        # move along local coordinates
-        curve.matrix_world = curve.matrix_world * localTranslationForward
+        # build the cutter #
+        parts = cutterData(context)
+        if isinstance(parts, str):
+            self.report({'WARNING'}, parts)
+            return{'FINISHED'}
+        timings.append(('cutter', time.time() - start))
+        start = time.time()
         
-        # extrude from camera enough times to make divisions #
-        # fill first face if cyclic
-        if scn.TCinitCyclic == True:
-           bpy.ops.mesh.fill(use_beauty=True)
-        # calculate number of extrusions required, minimum 1
-        extrusions = max(1,round(scn.TCinitDepth/scn.TCinitDivision))
-        # get depth of each extrusion
-        extrusionDepth = scn.TCinitDepth/extrusions
-        
-        # calculate translation for edit mode #
-        # new curve location
-        Co = Vector(curve.location)
-        # BUG option to reverse depth if required
-        if scn.TCinitReverseDepth == True:
-            # get local space transformations
-            distVecCam = world2local(Ci,Co,extrusionDepth)
-        else:
-            # get invertes local space transformations
-            distVecCam = world2local(Ci,Co,-extrusionDepth)
-        # extrude for each extrusion
-        i = 1
-        while i <= extrusions:
-            bpy.ops.mesh.extrude_region_move(MESH_OT_extrude_region={"mirror":False}, TRANSFORM_OT_translate={"value":distVecCam, "constraint_axis":(False, False, True), "constraint_orientation":'LOCAL'})
-            i += 1
-            # fill end cap if it is cyclic to retain whole mesh
-            if i == extrusions and scn.TCinitCyclic == True:
-               bpy.ops.mesh.fill(use_beauty=True)
-        # select all mesh
-        bpy.ops.mesh.select_all(action='SELECT')
-        # calculate extrusion depth from point
-        extrusions = max(1,round(scn.TCinitExtrusion/extrusionDepth))
-        
-        # Where are we extruding from #
-        i = 1
-        # are we reversing direction
-        if scn.TCinitReverseDir == True:
-            dir = -1
-        else:
-            dir = 1
-        # only do this if cyclic is false
-        if scn.TCinitCyclic == False:
-            if scn.TCinitAxis == '1':
-                # cursor #
-                # calculate local transforms
-                distVecCursor = world2local(curve.location,cursorInit,extrusionDepth) * dir
-                # set pivot to cursor
-                context.space_data.pivot_point = "CURSOR"
-                # extrude until extrusion depth
-                while i <= extrusions:
-                    bpy.ops.mesh.extrude_region_move(MESH_OT_extrude_region={"mirror":False}, TRANSFORM_OT_translate={"value":(0, 0, 0)})
-                    bpy.ops.transform.translate(value=distVecCursor, constraint_axis=(True, True, True), constraint_orientation='LOCAL')
-                    i += 1
-                # set pivot to original
-                context.space_data.pivot_point = pivotPoint
-            elif scn.TCinitAxis == '2':
-                # X #
-                # Create transformation matrices
-                localTranslationX = Matrix.Translation((10, 0, 0))
-                localTranslationXi = Matrix.Translation((-10, 0, 0))
-                # move to new location
-                curve.matrix_world = curve.matrix_world * localTranslationX
-                # store new location
-                localTargetX = Vector(curve.location)
-                # move back
-                curve.matrix_world = curve.matrix_world * localTranslationXi
-                # get local transform direction
-                distX = world2local(Ci,localTargetX, extrusionDepth) * dir
-                # extrude in this new direction
-                while i <= extrusions:
-                    bpy.ops.mesh.extrude_region_move(MESH_OT_extrude_region={"mirror":False}, TRANSFORM_OT_translate={"value":(0, 0, 0)})
-                    bpy.ops.transform.translate(value=distX, constraint_axis=(True, False, False), constraint_orientation='LOCAL')
-                    i += 1
-            elif scn.TCinitAxis == '2':
-                # Y #
-                # Create transformation matrix
-                localTranslationY = Matrix.Translation((0, 10, 0))
-                localTranslationYi = Matrix.Translation((0, -10, 0))
-                # move to new location
-                curve.matrix_world = curve.matrix_world * localTranslationY
-                # store new location
-                localTargetY = Vector(curve.location)
-                # move back
-                curve.matrix_world = curve.matrix_world * localTranslationYi
-                # extrude in this new direction
-                distY = world2local(Ci,localTargetY, extrusionDepth) * dir
-                while i <= extrusions:
-                    bpy.ops.mesh.extrude_region_move(MESH_OT_extrude_region={"mirror":False}, TRANSFORM_OT_translate={"value":(0, 0, 0)})
-                    bpy.ops.transform.translate(value=distY, constraint_axis=(False, True, False), constraint_orientation='LOCAL')
-                    i += 1
-        # set object mode
-        bpy.ops.object.mode_set(mode='OBJECT')
+        # every path in one cutter, so there is one boolean however many strokes there are
+        cutterMesh = fuseCutter(scn, "TrimCutter", parts)
+        cutter = bpy.data.objects.new("TrimCutter", cutterMesh)
+        scn.objects.link(cutter)
+        # the preview is done with
+        removePreview(scn)
+        timings.append(('mesh', time.time() - start))
+        start = time.time()
         
         # create boolean #
         # set mesh as active
+        bpy.ops.object.select_all(action='DESELECT')
+        mesh.select = True
         bpy.context.scene.objects.active = mesh
-        # add boolean modifier
-        bpy.ops.object.modifier_add(type='BOOLEAN')
-        # if reverse is true set to intersect
-        if scn.TCinitReverseTrim == True:
-            bpy.context.object.modifiers["Boolean"].operation = 'INTERSECT'
-        else:
-            bpy.context.object.modifiers["Boolean"].operation = 'DIFFERENCE'
-        bpy.context.object.modifiers["Boolean"].object = curve
+        # add boolean modifier, if reverse is true set to intersect
+        mod = mesh.modifiers.new("Boolean", 'BOOLEAN')
+        mod.operation = 'INTERSECT' if scn.TCinitReverseTrim == True else 'DIFFERENCE'
+        mod.object = cutter
 
         # apply boolean object
         if scn.TCinitApplyMod == True:
-            # set mesh as active
-            bpy.context.scene.objects.active = mesh
-            # apply all boolean modifiers
-            for mod in bpy.context.object.modifiers:
-                if mod.type == 'BOOLEAN':
-                    bpy.ops.object.modifier_apply(apply_as='DATA', modifier=mod.name)
-            # deselect mesh
-            bpy.ops.object.select_all(action='DESELECT') 
-            # select curve
-            curve.select = True 
-            # delete curve
-            bpy.ops.object.delete(use_global=False)
+            bpy.ops.object.modifier_apply(apply_as='DATA', modifier=mod.name)
+            timings.append(('boolean', time.time() - start))
+            start = time.time()
+            # remove the cutter
+            scn.objects.unlink(cutter)
+            bpy.data.objects.remove(cutter)
+            bpy.data.meshes.remove(cutterMesh)
         
         # return to mode
         if scn.TCinitReturnMode == '1':
@@ -418,59 +268,484 @@ class OBJECT_OT_trimCurve(bpy.types.Operator):
             bpy.ops.object.mode_set(mode='EDIT')
         else:
             bpy.ops.object.mode_set(mode='OBJECT')
-        # set pivot to cursor
-        context.space_data.pivot_point = "BOUNDING_BOX_CENTER"
+        timings.append(('cleanup', time.time() - start))
+        self.report({'INFO'}, "Trimmed with %d path(s): " % len(parts) + ", ".join("%s %.2fs" % stage for stage in timings))
+        return{'FINISHED'}
+
+class OBJECT_OT_trimPreview(bpy.types.Operator):
+    """
+    Booleans the cutter against a low resolution proxy of the mesh, drawn over it
+    """
+    bl_idname = "trim.preview"
+    bl_label = "Update Preview"
+    
+    def execute(self, context):
+        message = updatePreview(context)
+        if message:
+            self.report({'WARNING'}, message)
         return{'FINISHED'}
+
 # functions #
-def rotatePivot(rotation):
-    """
-    rotatePivot(Vector rotation)
-    This function will take a vector rotation and rotate the curently selected objects pivot to match without affecting their physical display
-    Make sure that you rotate around the cursor and have the entire mesh selected or this will not work.
-    This operates on an xyz euler.
-    """
-    # Rotate in object mode X
-    bpy.ops.object.mode_set(mode='OBJECT')
-    bpy.ops.transform.rotate(value=rotation.x, axis=(1,0,0), constraint_orientation='GLOBAL')
-    # rotate in edit mode X
-    bpy.ops.object.mode_set(mode='EDIT')
-    bpy.ops.mesh.select_all(action='SELECT')
-    bpy.ops.transform.rotate(value=-rotation.x, axis=(1,0,0), constraint_orientation='GLOBAL')
-    # Rotate in object mode Y
-    bpy.ops.object.mode_set(mode='OBJECT')
-    bpy.ops.transform.rotate(value=rotation.y, axis=(0,1,0), constraint_orientation='GLOBAL')
-    # rotate in edit mode Y
-    bpy.ops.object.mode_set(mode='EDIT')
-    bpy.ops.transform.rotate(value=-rotation.y, axis=(0,1,0), constraint_orientation='GLOBAL')
-    # Rotate in object mode Z
-    bpy.ops.object.mode_set(mode='OBJECT')
-    bpy.ops.transform.rotate(value=rotation.z, axis=(0,0,1), constraint_orientation='GLOBAL')
-    # rotate in edit mode Z
-    bpy.ops.object.mode_set(mode='EDIT')
-    bpy.ops.transform.rotate(value=-rotation.z, axis=(0,0,1), constraint_orientation='GLOBAL')
-    # return to object mode
-    bpy.ops.object.mode_set(mode='OBJECT')
+def cutterData(context):
+    """
+    cutterData(Context context)
+    Samples the stroke or curve and sweeps a cutter per path for the current props.
+    Returns [(verts, loopVerts, loopTotal), ...] or a warning string.
+    """
+    obj = context.object
+    scn = context.scene
+    # sample the stroke or curve points once, in world space
+    # 1 = pencil stroke
+    if scn.TCinitCurveType == '1':
+        paths = strokePaths(context)
+        # without batch only the last stroke cuts
+        if scn.TCinitBatch == False:
+            paths = paths[-1:]
+        # check if stroke exists
+        if not paths:
+            return "No strokes found."
+    else:
+        # check if curve exists
+        try:
+            curve = bpy.data.objects[obj.TCinitCurve]
+        except:
+            return "No curve selected."
+        paths = curvePaths(curve)
+        if not paths:
+            return "Curve has no points."
+    
+    # view axes, z points towards the viewer
+    viewRot = context.space_data.region_3d.view_rotation.to_matrix()
+    # which way the ribbon is swept when it isn't cyclic
+    sweepDir = None
+    if scn.TCinitCyclic == False:
+        sweepDir = sweepDirection(scn.TCinitAxis, viewRot, paths, scn.cursor_location)
+        if scn.TCinitReverseDir == True:
+            sweepDir = -sweepDir
+    
+    parts = []
+    for points, cyclic in paths:
+        # cyclic closes every path into a capped prism, paths that are already closed are capped the same way
+        # (swept sideways a closed ribbon would only enclose its own walls)
+        parts.append(sweepCutter(points, scn.TCinitCyclic or cyclic, viewRot, scn.TCinitDepth, scn.TCinitDivision,
+                                 scn.TCinitExtrusion, sweepDir, scn.TCinitReverseDepth))
+    return parts
+
+def overlapGroups(parts):
+    """
+    overlapGroups(list parts)
+    Groups the cutters whose bounding boxes overlap, directly or through other cutters.
+    Returns a list of index arrays, one per group.
+    """
+    low = np.array([part[0].min(axis=0) for part in parts])
+    high = np.array([part[0].max(axis=0) for part in parts])
+    overlap = np.all((low[:, None] <= high[None]) & (low[None] <= high[:, None]), axis=2)
+    # every cutter takes the lowest label among its neighbours until nothing changes
+    label = np.arange(len(parts))
+    while True:
+        spread = np.where(overlap, label[None, :], len(parts)).min(axis=1)
+        if np.array_equal(spread, label):
+            break
+        label = spread
+    return [np.nonzero(label == group)[0] for group in np.unique(label)]
+
+def fuseCutter(scn, name, parts):
+    """
+    fuseCutter(Scene scn, string name, list parts)
+    Fuses the cutters into one mesh so the target only needs a single boolean.
+    Cutters that can't touch are just concatenated, only the rest of an overlapping group is unioned in,
+    against the small cutter mesh rather than the target.
+    """
+    groups = overlapGroups(parts)
+    first = [group[0] for group in groups]
+    rest = [i for group in groups for i in group[1:]]
+    me = buildMesh(name, *joinMeshData([parts[i] for i in first]))
+    if not rest:
+        return me
+    
+    # one union modifier per overlapping cutter, evaluated in a single pass
+    fused = bpy.data.objects.new(name, me)
+    scn.objects.link(fused)
+    operands = []
+    for i in rest:
+        operand = bpy.data.objects.new(name + "Part", buildMesh(name + "Part", *parts[i]))
+        scn.objects.link(operand)
+        mod = fused.modifiers.new("Fuse", 'BOOLEAN')
+        mod.operation = 'UNION'
+        mod.object = operand
+        operands.append(operand)
+    scn.update()
+    result = fused.to_mesh(scn, True, 'PREVIEW')
+    # clean up
+    for ob in operands + [fused]:
+        data = ob.data
+        scn.objects.unlink(ob)
+        bpy.data.objects.remove(ob)
+        bpy.data.meshes.remove(data)
+    result.name = name
+    return result
+
+# preview #
+PREVIEW = "TrimPreview"
+PREVIEW_CUTTER = "TrimPreviewCutter"
+# mesh name -> (key, proxy mesh name)
+proxyCache = {}
+# key of what the preview currently shows
+previewState = {}
+
+def updatePreview(context):
+    """
+    updatePreview(Context context)
+    Booleans the cutter against a cached proxy of the mesh and shows it over the mesh.
+    The proxy is only rebuilt when the mesh or resolution change, the preview only when the cutter or options change.
+    Returns a warning string or None.
+    """
+    obj = context.object
+    scn = context.scene
+    try:
+        mesh = bpy.data.objects[obj.TCinitObject]
+    except:
+        return "No mesh selected."
+    parts = cutterData(context)
+    if isinstance(parts, str):
+        return parts
+    
+    proxy = proxyMesh(mesh, scn, scn.TCinitProxyResolution)
+    key = (proxy.name, scn.TCinitReverseTrim, tuple(np.array(mesh.matrix_world).ravel()),
+           tuple(arrayKey(array) for array in joinMeshData(parts)))
+    if previewState.get('key') == key and PREVIEW in scn.objects and PREVIEW_CUTTER in scn.objects:
+        return None
+    
+    # swap in the new cutter mesh
+    cutterMesh = fuseCutter(scn, PREVIEW_CUTTER, parts)
+    if PREVIEW_CUTTER in scn.objects:
+        cutter = scn.objects[PREVIEW_CUTTER]
+        oldMesh = cutter.data
+        cutter.data = cutterMesh
+        bpy.data.meshes.remove(oldMesh)
+    else:
+        cutter = bpy.data.objects.new(PREVIEW_CUTTER, cutterMesh)
+        cutter.draw_type = 'WIRE'
+        scn.objects.link(cutter)
+    
+    # proxy with a live boolean, drawn in front of the real mesh
+    if PREVIEW in scn.objects:
+        preview = scn.objects[PREVIEW]
+        oldProxy = preview.data
+        preview.data = proxy
+        # a replaced proxy is no longer in proxyCache, nothing else would free it
+        if oldProxy != proxy and oldProxy.users == 0:
+            bpy.data.meshes.remove(oldProxy)
+    else:
+        preview = bpy.data.objects.new(PREVIEW, proxy)
+        preview.show_x_ray = True
+        preview.show_wire = True
+        scn.objects.link(preview)
+    preview.matrix_world = mesh.matrix_world
+    mod = preview.modifiers.get("TrimPreview") or preview.modifiers.new("TrimPreview", 'BOOLEAN')
+    mod.operation = 'INTERSECT' if scn.TCinitReverseTrim == True else 'DIFFERENCE'
+    mod.object = cutter
+    previewState['key'] = key
+    return None
 
-def world2local(a,b, depth):
-    """
-    world2local(Vector  a,Vector b, float depth)
-    This function will create a vector to translate between points a and b based on a depth.
-    """
-    # calculate angles based on 3 dimensional trigonometry
-    thetaA = atan( (a.z-b.z)/( sqrt( pow(a.x-b.x,2) + pow(a.y-b.y,2) ) ) )
-    thetaB = atan( (a.y-b.y)/(a.x-b.x) )
-    # calculate the vector
-    distVec = Vector([cos(thetaB) * cos(thetaA) * depth,
-    sin(thetaB) * cos(thetaA) * depth,
-    sin(thetaA) * depth])
-    # return the vector
-    return distVec
+def removePreview(scn):
+    """
+    removePreview(Scene scn)
+    Deletes the preview objects, the cached proxy meshes are kept.
+    """
+    for name in (PREVIEW, PREVIEW_CUTTER):
+        if name in scn.objects:
+            ob = scn.objects[name]
+            me = ob.data
+            scn.objects.unlink(ob)
+            bpy.data.objects.remove(ob)
+            if name == PREVIEW_CUTTER:
+                bpy.data.meshes.remove(me)
+    previewState.clear()
+
+def clearProxies():
+    """
+    clearProxies()
+    Deletes the cached proxy meshes that nothing else uses.
+    """
+    for key, name in proxyCache.values():
+        if name in bpy.data.meshes and bpy.data.meshes[name].users == 0:
+            bpy.data.meshes.remove(bpy.data.meshes[name])
+    proxyCache.clear()
+
+def arrayKey(array):
+    """
+    arrayKey(array array)
+    Cheap content key of an array.
+    """
+    array = np.ascontiguousarray(array)
+    return (array.shape, zlib.crc32(array.view(np.uint8)))
+
+def proxyMesh(mesh, scn, resolution):
+    """
+    proxyMesh(Object mesh, Scene scn, int resolution)
+    Vertex clustered copy of the evaluated mesh, cached until the evaluated geometry or the resolution change.
+    The key hashes the evaluated arrays, so sculpting, multires and any modifier setting are picked up.
+    """
+    evaluated = mesh.to_mesh(scn, True, 'PREVIEW')
+    verts = np.empty(len(evaluated.vertices) * 3)
+    evaluated.vertices.foreach_get('co', verts)
+    loopStart = np.empty(len(evaluated.polygons), dtype=np.int32)
+    loopTotal = np.empty(len(evaluated.polygons), dtype=np.int32)
+    loopVerts = np.empty(len(evaluated.loops), dtype=np.int32)
+    evaluated.polygons.foreach_get('loop_start', loopStart)
+    evaluated.polygons.foreach_get('loop_total', loopTotal)
+    evaluated.loops.foreach_get('vertex_index', loopVerts)
+    bpy.data.meshes.remove(evaluated)
+    
+    key = (arrayKey(verts), arrayKey(loopTotal), arrayKey(loopVerts), resolution)
+    cached = proxyCache.get(mesh.name)
+    if cached and cached[0] == key and cached[1] in bpy.data.meshes:
+        return bpy.data.meshes[cached[1]]
+    
+    verts, tris = clusterMesh(verts.reshape(-1, 3), loopStart, loopTotal, loopVerts, resolution)
+    proxy = buildMesh(mesh.name + "_trimProxy", verts, tris.ravel(), np.full(len(tris), 3, dtype=np.int32))
+    # an old proxy still on the preview is freed by updatePreview once the preview has the new one
+    if cached and cached[1] in bpy.data.meshes and bpy.data.meshes[cached[1]].users == 0:
+        bpy.data.meshes.remove(bpy.data.meshes[cached[1]])
+    proxyCache[mesh.name] = (key, proxy.name)
+    return proxy
+
+def clusterMesh(verts, loopStart, loopTotal, loopVerts, resolution):
+    """
+    clusterMesh(array verts, array loopStart, array loopTotal, array loopVerts, int resolution)
+    Decimates by vertex clustering on a voxel grid with resolution cells along the longest side.
+    Every vertex moves to the mean of its cell, collapsed and duplicate triangles are dropped.
+    Returns (verts, tris).
+    """
+    # fan the polygons into triangles
+    fans = np.maximum(loopTotal - 2, 0)
+    first = np.repeat(loopStart, fans)
+    k = np.arange(fans.sum()) - np.repeat(np.cumsum(fans) - fans, fans)
+    tris = np.stack((loopVerts[first], loopVerts[first + k + 1], loopVerts[first + k + 2]), axis=-1)
+    if len(verts) == 0 or len(tris) == 0:
+        return verts, tris
+    
+    low = verts.min(axis=0)
+    cell = max(float((verts.max(axis=0) - low).max()), 1e-9) / resolution
+    q = ((verts - low) / cell).astype(np.int64)
+    dims = q.max(axis=0) + 1
+    cells, cluster = np.unique(q[:, 0] + dims[0] * (q[:, 1] + dims[1] * q[:, 2]), return_inverse=True)
+    cluster = cluster.ravel()
+    counts = np.bincount(cluster, minlength=len(cells)).astype(np.float64)
+    proxyVerts = np.stack([np.bincount(cluster, weights=verts[:, axis], minlength=len(cells)) / counts for axis in range(3)], axis=-1)
+    
+    t = cluster[tris]
+    t = t[(t[:, 0] != t[:, 1]) & (t[:, 1] != t[:, 2]) & (t[:, 2] != t[:, 0])]
+    ordered = np.sort(t, axis=1)
+    n = len(cells)
+    firstTri = np.unique((ordered[:, 0] * n + ordered[:, 1]) * n + ordered[:, 2], return_index=True)[1]
+    return proxyVerts, t[np.sort(firstTri)].astype(np.int32)
+
+def strokePaths(context):
+    """
+    strokePaths(Context context)
+    Returns [(array points, bool cyclic), ...] in world space for every stroke in the active grease pencil layer's current frame.
+    """
+    obj = context.object
+    gp = obj.grease_pencil if obj and obj.grease_pencil else context.scene.grease_pencil
+    if not gp or not gp.layers.active or not gp.layers.active.active_frame:
+        return []
+    paths = []
+    for stroke in gp.layers.active.active_frame.strokes:
+        if len(stroke.points) < 2:
+            continue
+        points = np.empty(len(stroke.points) * 3)
+        stroke.points.foreach_get('co', points)
+        paths.append((points.reshape(-1, 3), False))
+    return paths
+
+def curvePaths(curve):
+    """
+    curvePaths(Object curve)
+    Returns [(array points, bool cyclic), ...] in world space for every spline, beziers are sampled at the curve resolution.
+    Nurbs use their control points.
+    """
+    matrix = np.array(curve.matrix_world)
+    paths = []
+    for spline in curve.data.splines:
+        if spline.type == 'BEZIER':
+            count = len(spline.bezier_points)
+            co = np.empty(count * 3)
+            left = np.empty(count * 3)
+            right = np.empty(count * 3)
+            spline.bezier_points.foreach_get('co', co)
+            spline.bezier_points.foreach_get('handle_left', left)
+            spline.bezier_points.foreach_get('handle_right', right)
+            points = sampleBezier(co.reshape(-1, 3), left.reshape(-1, 3), right.reshape(-1, 3), spline.resolution_u, spline.use_cyclic_u)
+        else:
+            co = np.empty(len(spline.points) * 4)
+            spline.points.foreach_get('co', co)
+            points = co.reshape(-1, 4)[:, :3]
+        if len(points) < 2:
+            continue
+        paths.append((points @ matrix[:3, :3].T + matrix[:3, 3], spline.use_cyclic_u))
+    return paths
+
+def sampleBezier(co, left, right, resolution, cyclic):
+    """
+    sampleBezier(array co, array left, array right, int resolution, bool cyclic)
+    Evaluates every segment of a bezier spline at resolution steps in one go.
+    """
+    resolution = max(1, resolution)
+    nxt = np.roll(np.arange(len(co)), -1)
+    if not cyclic:
+        nxt = nxt[:-1]
+    first = np.arange(len(nxt))
+    t = (np.arange(resolution) / float(resolution))[None, :, None]
+    p0 = co[first][:, None]
+    p1 = right[first][:, None]
+    p2 = left[nxt][:, None]
+    p3 = co[nxt][:, None]
+    points = ((1 - t)**3 * p0 + 3 * (1 - t)**2 * t * p1 + 3 * (1 - t) * t**2 * p2 + t**3 * p3).reshape(-1, 3)
+    if not cyclic:
+        points = np.vstack((points, co[-1:]))
+    return points
+
+def sweepDirection(axis, viewRot, paths, cursor):
+    """
+    sweepDirection(string axis, Matrix viewRot, list paths, Vector cursor)
+    Unit direction the cutter ribbon is swept in, '1' towards the 3D cursor, '2' view X, '3' view Y.
+    """
+    view = np.array(viewRot)
+    if axis == '1':
+        center = np.vstack([points for points, cyclic in paths]).mean(axis=0)
+        direction = np.array(cursor) - center
+        length = np.sqrt((direction**2).sum())
+        # cursor sitting on the curve, fall back to view X
+        if length > 1e-9:
+            return direction / length
+        return view[:, 0]
+    elif axis == '3':
+        return view[:, 1]
+    return view[:, 0]
+
+def gridQuads(index, cyclic=False):
+    """
+    gridQuads(array index, bool cyclic)
+    Quads over a (U, V) grid of vertex indices, wound u then v. cyclic wraps the u axis.
+    """
+    if cyclic:
+        index = np.vstack((index, index[:1]))
+    return np.stack((index[:-1, :-1], index[1:, :-1], index[1:, 1:], index[:-1, 1:]), axis=-1).reshape(-1, 4)
+
+def sweepCutter(points, cyclic, viewRot, depth, division, extrusion=0.0, sweepDir=None, reverseDepth=False):
+    """
+    sweepCutter(array points, bool cyclic, Matrix viewRot, float depth, float division, float extrusion, array sweepDir, bool reverseDepth)
+    Builds a closed cutter around a world space path, all offsets are computed as arrays.
+    The path is pushed depth/2 towards the viewer and swept away from it by depth in division sized steps.
+    cyclic caps both ends of that tube, otherwise the ribbon is also swept along sweepDir by extrusion.
+    Returns (verts, loopVerts, loopTotal) with outward facing normals.
+    """
+    points = np.asarray(points, dtype=np.float64)
+    view = np.array(viewRot)
+    towardsView = view[:, 2]
+    
+    # depth rings, the division count only changes array sizes
+    rings = max(1, int(round(abs(depth / division)))) if division else 1
+    step = depth / rings
+    depthOffsets = depth / 2.0 + (1 if reverseDepth else -1) * step * np.arange(rings + 1)
+    # (path, ring) grid
+    grid = points[:, None, :] + depthOffsets[None, :, None] * towardsView
+    
+    if cyclic:
+        index = np.arange(grid.shape[0] * grid.shape[1]).reshape(grid.shape[:2])
+        # wall, then one ngon cap at each end of the tube
+        walls = gridQuads(index, cyclic=True)
+        caps = [index[:, -1], index[::-1, 0]]
+        verts = grid.reshape(-1, 3)
+        loopVerts = np.concatenate([walls.ravel()] + caps)
+        loopTotal = np.concatenate((np.full(len(walls), 4), [len(cap) for cap in caps]))
+    else:
+        # sweep the ribbon sideways into a block
+        sweeps = max(1, int(round(abs(extrusion / step)))) if step else 1
+        sweepOffsets = np.linspace(0, extrusion, sweeps + 1)
+        block = grid[:, :, None, :] + sweepOffsets[None, None, :, None] * np.asarray(sweepDir, dtype=np.float64)
+        index = np.arange(block.shape[0] * block.shape[1] * block.shape[2]).reshape(block.shape[:3])
+        # the six sides of the (path, ring, sweep) block, each wound the same way round
+        quads = np.vstack((gridQuads(index[-1]), gridQuads(index[0].T),
+                           gridQuads(index[:, -1].T), gridQuads(index[:, 0]),
+                           gridQuads(index[:, :, -1]), gridQuads(index[:, :, 0].T)))
+        # only the block's surface is used, drop the inside vertices
+        used, quads = np.unique(quads, return_inverse=True)
+        verts = block.reshape(-1, 3)[used]
+        loopVerts = quads.ravel()
+        loopTotal = np.full(len(loopVerts) // 4, 4)
+    
+    loopVerts = loopVerts.astype(np.int32)
+    loopTotal = loopTotal.astype(np.int32)
+    # the winding above is consistent but its sign depends on the path direction, flip inside out cutters
+    if signedVolume(verts, loopVerts, loopTotal) < 0:
+        loopVerts = flipFaces(loopVerts, loopTotal)
+    return verts, loopVerts, loopTotal
+
+def signedVolume(verts, loopVerts, loopTotal):
+    """
+    signedVolume(array verts, array loopVerts, array loopTotal)
+    Volume enclosed by the faces, negative when they face inwards. Faces are fanned from their first corner.
+    """
+    loopStart = np.cumsum(loopTotal) - loopTotal
+    fans = np.maximum(loopTotal - 2, 0)
+    first = np.repeat(loopStart, fans)
+    k = np.arange(fans.sum()) - np.repeat(np.cumsum(fans) - fans, fans)
+    a = verts[loopVerts[first]]
+    b = verts[loopVerts[first + k + 1]]
+    c = verts[loopVerts[first + k + 2]]
+    return (a * np.cross(b, c)).sum() / 6.0
+
+def flipFaces(loopVerts, loopTotal):
+    """
+    flipFaces(array loopVerts, array loopTotal)
+    Reverses the corner order of every face.
+    """
+    loopStart = np.cumsum(loopTotal) - loopTotal
+    face = np.repeat(np.arange(len(loopTotal)), loopTotal)
+    corner = np.arange(len(loopVerts)) - loopStart[face]
+    return loopVerts[loopStart[face] + loopTotal[face] - 1 - corner]
+
+def joinMeshData(parts):
+    """
+    joinMeshData(list parts)
+    Concatenates [(verts, loopVerts, loopTotal), ...] into one set of arrays.
+    """
+    offsets = np.cumsum([0] + [len(verts) for verts, loopVerts, loopTotal in parts])
+    verts = np.vstack([part[0] for part in parts])
+    loopVerts = np.concatenate([part[1] + offset for part, offset in zip(parts, offsets)]).astype(np.int32)
+    loopTotal = np.concatenate([part[2] for part in parts]).astype(np.int32)
+    return verts, loopVerts, loopTotal
+
+def buildMesh(name, verts, loopVerts, loopTotal):
+    """
+    buildMesh(string name, array verts, array loopVerts, array loopTotal)
+    Creates a new mesh datablock in one foreach_set per attribute.
+    """
+    me = bpy.data.meshes.new(name)
+    me.vertices.add(len(verts))
+    me.vertices.foreach_set('co', np.asarray(verts, dtype=np.float32).ravel())
+    me.loops.add(len(loopVerts))
+    me.loops.foreach_set('vertex_index', loopVerts)
+    me.polygons.add(len(loopTotal))
+    me.polygons.foreach_set('loop_start', (np.cumsum(loopTotal) - loopTotal).astype(np.int32))
+    me.polygons.foreach_set('loop_total', loopTotal)
+    me.update(calc_edges=True)
+    return me
 # Register functions #
 def register():
     # initialize classes #
     bpy.utils.register_class(initialize)
     bpy.utils.register_class(OBJECT_OT_trimCurve)
+    bpy.utils.register_class(OBJECT_OT_trimPreview)
 def unregister():
+    # remove the preview and its cached proxies #
+    for scn in bpy.data.scenes:
+        removePreview(scn)
+    clearProxies()
     # uninitialize classes #
     bpy.utils.unregister_class(initialize)
-    bpy.utils.register_class(OBJECT_OT_trimCurve)
\ No newline at end of file
+    bpy.utils.unregister_class(OBJECT_OT_trimCurve)
+    bpy.utils.unregister_class(OBJECT_OT_trimPreview)
\ No newline at end of file